@@ -0,0 +1,23 @@
+"""Add full-text and trigram search indexes on products."""
+
+revision = "0003_product_search"
+down_revision = "0002_global_settings"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # Expression must match app.models.product.PRODUCT_SEARCH_DOCUMENT.
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_products_search ON products USING gin "
+        "(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, '')))"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_products_name_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_products_search")
@@ -0,0 +1,46 @@
+"""Add product_stock_summary rollup table."""
+
+revision = "0004_product_stock_summary"
+down_revision = "0003_product_search"
+branch_labels = None
+depends_on = None
+
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade() -> None:
+    op.create_table(
+        "product_stock_summary",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("total_available", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("total_reserved", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("branches_in_stock", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("delivery_available", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("NOW()")),
+    )
+
+    # Backfill; `flask rebuild-stock-summary` recomputes it with the app's configuration.
+    delivery_branch = int(os.environ.get("DELIVERY_SOURCE_BRANCH_ID") or 0)
+    op.execute(
+        sa.text(
+            """
+            INSERT INTO product_stock_summary
+                (product_id, total_available, total_reserved, branches_in_stock, delivery_available)
+            SELECT p.id,
+                   COALESCE(SUM(i.available_quantity), 0),
+                   COALESCE(SUM(i.reserved_quantity), 0),
+                   COUNT(*) FILTER (WHERE i.available_quantity > 0),
+                   COALESCE(SUM(i.available_quantity) FILTER (WHERE i.branch_id = :branch_id), 0)
+            FROM products p
+            LEFT JOIN inventory i ON i.product_id = p.id
+            GROUP BY p.id
+            """
+        ).bindparams(branch_id=delivery_branch)
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("product_stock_summary")
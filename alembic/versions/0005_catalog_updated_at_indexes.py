@@ -0,0 +1,20 @@
+"""Index updated_at columns backing the catalog version stamp."""
+
+revision = "0005_catalog_updated_at_indexes"
+down_revision = "0004_product_stock_summary"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+
+
+def upgrade() -> None:
+    op.create_index("ix_products_updated_at", "products", ["updated_at"])
+    op.create_index("ix_categories_updated_at", "categories", ["updated_at"])
+    op.create_index("ix_product_stock_summary_updated_at", "product_stock_summary", ["updated_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_product_stock_summary_updated_at", table_name="product_stock_summary")
+    op.drop_index("ix_categories_updated_at", table_name="categories")
+    op.drop_index("ix_products_updated_at", table_name="products")
@@ -0,0 +1,39 @@
+"""Add co-purchase matrix, related products and job watermarks."""
+
+revision = "0007_related_products"
+down_revision = "0006_inventory_updated_at_index"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade() -> None:
+    op.create_table(
+        "product_co_purchases",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("related_product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("orders_count", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.create_table(
+        "related_products",
+        sa.Column("product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("related_product_id", sa.Integer(), sa.ForeignKey("products.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("rank", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Integer(), nullable=False),
+    )
+    op.create_index("ix_related_products_rank", "related_products", ["product_id", "rank"])
+    op.create_table(
+        "job_watermarks",
+        sa.Column("name", sa.String(length=64), primary_key=True),
+        sa.Column("last_id", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=False, server_default=sa.text("NOW()")),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("job_watermarks")
+    op.drop_index("ix_related_products_rank", table_name="related_products")
+    op.drop_table("related_products")
+    op.drop_table("product_co_purchases")
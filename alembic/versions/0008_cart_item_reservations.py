@@ -0,0 +1,29 @@
+"""Add cart_items.reserved_until for time-bounded stock reservations."""
+
+revision = "0008_cart_item_reservations"
+down_revision = "0007_related_products"
+branch_labels = None
+depends_on = None
+
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade() -> None:
+    op.add_column("cart_items", sa.Column("reserved_until", sa.TIMESTAMP(), nullable=True))
+    # Existing lines get one full TTL from the upgrade as a grace period, so the first
+    # sweeper run does not abandon every live cart at once.
+    ttl_minutes = int(os.environ.get("CART_RESERVATION_TTL_MINUTES") or 60)
+    op.execute(
+        sa.text("UPDATE cart_items SET reserved_until = NOW() + :minutes * INTERVAL '1 minute'").bindparams(
+            minutes=ttl_minutes
+        )
+    )
+    op.create_index("ix_cart_items_reserved_until", "cart_items", ["reserved_until"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cart_items_reserved_until", table_name="cart_items")
+    op.drop_column("cart_items", "reserved_until")
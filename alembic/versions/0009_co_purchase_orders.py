@@ -0,0 +1,20 @@
+"""Track orders folded into the co-purchase matrix for the trailing re-scan."""
+
+revision = "0009_co_purchase_orders"
+down_revision = "0008_cart_item_reservations"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade() -> None:
+    op.create_table(
+        "co_purchase_orders",
+        sa.Column("order_id", sa.Integer(), sa.ForeignKey("orders.id", ondelete="CASCADE"), primary_key=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("co_purchase_orders")
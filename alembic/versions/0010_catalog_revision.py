@@ -0,0 +1,23 @@
+"""Commit-ordered catalog version counter for ETag / Last-Modified."""
+
+revision = "0010_catalog_revision"
+down_revision = "0009_co_purchase_orders"
+branch_labels = None
+depends_on = None
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade() -> None:
+    op.create_table(
+        "catalog_revision",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("version", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("changed_at", sa.TIMESTAMP(), nullable=False, server_default=sa.func.now()),
+    )
+    op.execute("INSERT INTO catalog_revision (id, version, changed_at) VALUES (1, 0, NOW())")
+
+
+def downgrade() -> None:
+    op.drop_table("catalog_revision")
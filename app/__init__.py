@@ -3,6 +3,11 @@
 from flask import Flask
 
 from .services.branch import BranchCoreService
+from .services.catalog.autocomplete import warm_autocomplete_index
+from .services.catalog.stock_bitmap import init_stock_bitmap
+from .services.catalog_cache import init_catalog_cache
+from .services.stock_summary_service import register_stock_summary_sync
+from .cli import register_commands
 from .config import AppConfig
 from .extensions import db, jwt, limiter
 from .middleware import register_middlewares
@@ -48,8 +53,13 @@ def create_app(config: AppConfig | None = None) -> Flask:
     register_cors(app)
     _register_blueprints(app)
     _register_options_short_circuit(app)
+    register_commands(app)
+    register_stock_summary_sync()
+    init_catalog_cache(app)
     with app.app_context():
         BranchCoreService.ensure_delivery_source_branch_exists(app.config.get("DELIVERY_SOURCE_BRANCH_ID", ""))
+    warm_autocomplete_index(app)
+    init_stock_bitmap(app)
 
     return app
 
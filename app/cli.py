@@ -0,0 +1,33 @@
+"""Flask CLI commands for maintenance jobs (run with ``flask --app run <command>``)."""
+
+from __future__ import annotations
+import click
+from flask import Flask
+
+
+def register_commands(app: Flask) -> None:
+    @app.cli.command("rebuild-stock-summary")
+    def rebuild_stock_summary() -> None:
+        """Recompute product_stock_summary from the inventory table."""
+        from app.services.stock_summary_service import StockSummaryService
+
+        rows = StockSummaryService.rebuild()
+        click.echo(f"Rebuilt stock summary for {rows} products")
+
+    @app.cli.command("rebuild-related-products")
+    @click.option("--full", is_flag=True, help="Discard existing counts and reprocess every order.")
+    def rebuild_related_products(full: bool) -> None:
+        """Fold new orders into the co-purchase matrix and refresh top-K related products."""
+        from app.services.related_products_service import RelatedProductsService
+
+        stats = RelatedProductsService.rebuild(full=full)
+        click.echo(f"Processed {stats['orders']} orders; refreshed related products for {stats['products']} products")
+
+    @app.cli.command("expire-cart-reservations")
+    @click.option("--batch-size", default=500, show_default=True, help="Carts released per transaction.")
+    def expire_cart_reservations(batch_size: int) -> None:
+        """Mark idle carts ABANDONED and release the stock they reserve."""
+        from app.services.cart_reservation_service import CartReservationService
+
+        stats = CartReservationService.expire_idle_carts(batch_size=batch_size)
+        click.echo(f"Abandoned {stats['carts']} carts; released {stats['items']} cart lines")
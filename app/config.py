@@ -34,6 +34,22 @@ class AppConfig:
     APP_ENV: str = field(default_factory=lambda: _env_or_default("APP_ENV", "production"))
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
     SQLALCHEMY_DATABASE_URI: str = field(init=False)
+    AUTOCOMPLETE_MAX_PRODUCTS: int = field(default_factory=lambda: int(_env_or_default("AUTOCOMPLETE_MAX_PRODUCTS", "50000")))
+    AUTOCOMPLETE_REFRESH_SECONDS: int = field(default_factory=lambda: int(_env_or_default("AUTOCOMPLETE_REFRESH_SECONDS", "300")))
+    FUZZY_SEARCH_MAX_DISTANCE: int = field(default_factory=lambda: int(_env_or_default("FUZZY_SEARCH_MAX_DISTANCE", "2")))
+    FUZZY_SEARCH_BUDGET_MS: int = field(default_factory=lambda: int(_env_or_default("FUZZY_SEARCH_BUDGET_MS", "25")))
+    CATALOG_CACHE_MAX_AGE: int = field(default_factory=lambda: int(_env_or_default("CATALOG_CACHE_MAX_AGE", "30")))
+    CATALOG_CACHE_STALE_WHILE_REVALIDATE: int = field(default_factory=lambda: int(_env_or_default("CATALOG_CACHE_STALE_WHILE_REVALIDATE", "300")))
+    CATALOG_CACHE_MAX_ENTRIES: int = field(default_factory=lambda: int(_env_or_default("CATALOG_CACHE_MAX_ENTRIES", "2048")))
+    CATALOG_CACHE_TTL_SECONDS: int = field(default_factory=lambda: int(_env_or_default("CATALOG_CACHE_TTL_SECONDS", "30")))
+    CATALOG_RESPONSE_CACHE_MAX_BYTES: int = field(default_factory=lambda: int(_env_or_default("CATALOG_RESPONSE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))))
+    CATALOG_CACHE_INVALIDATION: str = field(default_factory=lambda: _env_or_default("CATALOG_CACHE_INVALIDATION", "auto"))
+    CATALOG_CACHE_INVALIDATION_FILE: str = field(default_factory=lambda: _env_or_default("CATALOG_CACHE_INVALIDATION_FILE", ""))
+    RELATED_PRODUCTS_TOP_K: int = field(default_factory=lambda: int(_env_or_default("RELATED_PRODUCTS_TOP_K", "20")))
+    CATALOG_SEARCH_ENGINE: str = field(default_factory=lambda: _env_or_default("CATALOG_SEARCH_ENGINE", "sql"))
+    CATALOG_COLUMNAR_REBUILD_SECONDS: int = field(default_factory=lambda: int(_env_or_default("CATALOG_COLUMNAR_REBUILD_SECONDS", "600")))
+    STOCK_BITMAP_REBUILD_SECONDS: int = field(default_factory=lambda: int(_env_or_default("STOCK_BITMAP_REBUILD_SECONDS", "600")))
+    CART_RESERVATION_TTL_MINUTES: int = field(default_factory=lambda: int(_env_or_default("CART_RESERVATION_TTL_MINUTES", "60")))
     RATE_LIMIT_DEFAULTS: str = field(default_factory=lambda: _env_or_default("RATE_LIMIT_DEFAULTS", "200 per day, 50 per hour"))
 
     def __post_init__(self) -> None:
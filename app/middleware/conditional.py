@@ -0,0 +1,118 @@
+"""Conditional GET (ETag / Last-Modified / 304) decorator for cacheable public reads."""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import timezone
+from functools import wraps
+from typing import Callable, Hashable
+
+from flask import current_app, make_response, request
+
+from app.services.catalog_cache import catalog_cache
+
+
+class ResponseBytesCache:
+    """Byte-bounded LRU of encoded 200 response bodies.
+
+    Keys embed the version stamp, so entries for older catalog versions simply stop being
+    requested and age out; nothing has to be invalidated explicitly.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[bytes, str]] = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: Hashable) -> tuple[bytes, str] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, body: bytes, mimetype: str, max_bytes: int) -> None:
+        if len(body) > max_bytes // 8:
+            # One oversized page should not flush the whole cache.
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous[0])
+            self._entries[key] = (body, mimetype)
+            self._bytes += len(body)
+            while self._bytes > max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+response_cache = ResponseBytesCache()
+
+
+def conditional_get(version_fn: Callable) -> Callable:
+    """Answer If-None-Match / If-Modified-Since from version_fn() before running the view.
+
+    version_fn returns an object with ``stamp`` (str) and ``last_modified`` (datetime | None).
+    The weak ETag covers the stamp plus the full query string, so every page and filter
+    combination validates independently. The encoded body of a 200 is kept under the same
+    digest, so a repeat request for an unchanged page skips the view and serialization.
+    """
+
+    def decorator(view: Callable) -> Callable:
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = version_fn()
+            digest = hashlib.sha1(
+                f"{version.stamp}|{request.full_path}".encode("utf-8")
+            ).hexdigest()[:20]
+            last_modified = version.last_modified
+            if last_modified is not None and last_modified.tzinfo is None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc)
+
+            # The cache generation also moves when this worker's view of the data is reset
+            # without a new version stamp (e.g. a rolled-back write).
+            body_key = (digest, catalog_cache.generation)
+            max_bytes = int(current_app.config.get("CATALOG_RESPONSE_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+            cached = response_cache.get(body_key) if max_bytes > 0 else None
+            if _is_not_modified(digest, last_modified):
+                response = current_app.response_class(status=304)
+            elif cached is not None:
+                body, mimetype = cached
+                response = current_app.response_class(body, mimetype=mimetype)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                if max_bytes > 0 and not response.is_streamed:
+                    response_cache.put(body_key, response.get_data(), response.mimetype, max_bytes)
+            response.set_etag(digest, weak=True)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers["Cache-Control"] = (
+                f"public, max-age={current_app.config.get('CATALOG_CACHE_MAX_AGE', 30)}, "
+                f"stale-while-revalidate={current_app.config.get('CATALOG_CACHE_STALE_WHILE_REVALIDATE', 300)}"
+            )
+            return response
+
+        return wrapper
+
+    return decorator
+
+def _is_not_modified(digest: str, last_modified) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(digest)
+    if request.if_modified_since and last_modified is not None:
+        # HTTP dates have second resolution.
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
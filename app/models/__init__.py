@@ -3,6 +3,7 @@ from .address import Address
 from .audit import Audit
 from .branch import Branch
 from .cart import Cart, CartItem
+from .catalog_revision import CatalogRevision
 from .category import Category
 from .delivery_slot import DeliverySlot
 from .global_settings import GlobalSettings
@@ -11,6 +12,8 @@ from .inventory import Inventory
 from .order import Order, OrderDeliveryDetails, OrderItem, OrderPickupDetails
 from .payment_token import PaymentToken
 from .product import Product
+from .product_relation import CoPurchaseOrder, JobWatermark, ProductCoPurchase, RelatedProduct
+from .product_stock_summary import ProductStockSummary
 from .registration_otp import RegistrationOTP
 from .password_reset_token import PasswordResetToken
 from .stock_request import StockRequest
@@ -35,18 +38,24 @@ __all__ = [
     "Branch",
     "Cart",
     "CartItem",
+    "CatalogRevision",
     "Category",
+    "CoPurchaseOrder",
     "DeliverySlot",
     "GlobalSettings",
     "IdempotencyKey",
     "Inventory",
+    "JobWatermark",
     "Order",
     "OrderDeliveryDetails",
     "OrderItem",
     "OrderPickupDetails",
     "PaymentToken",
     "Product",
+    "ProductCoPurchase",
+    "ProductStockSummary",
     "RegistrationOTP",
+    "RelatedProduct",
     "PasswordResetToken",
     "StockRequest",
     "User",
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, Enum as SQLEnum, ForeignKey, Integer, Numeric
+from sqlalchemy import TIMESTAMP, Column, Enum as SQLEnum, ForeignKey, Index, Integer, Numeric
 from sqlalchemy.orm import relationship
 
 from .base import Base, TimestampMixin
@@ -18,12 +18,15 @@ class Cart(Base, TimestampMixin):
 
 class CartItem(Base, TimestampMixin):
     __tablename__ = "cart_items"
+    __table_args__ = (Index("ix_cart_items_reserved_until", "reserved_until"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     cart_id = Column(Integer, ForeignKey("carts.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     unit_price = Column(Numeric(10, 2), nullable=False)
+    # Delivery-branch stock is held for this line until then; NULL once released.
+    reserved_until = Column(TIMESTAMP, nullable=True)
 
     cart = relationship("Cart", back_populates="items")
     product = relationship("Product")
@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from sqlalchemy import TIMESTAMP, BigInteger, Column, Integer, func
+
+from .base import Base
+
+class CatalogRevision(Base):
+    """Single-row counter bumped by every committing catalog write; backs HTTP validators."""
+
+    __tablename__ = "catalog_revision"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
+    changed_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
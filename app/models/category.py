@@ -1,12 +1,13 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, String, Text, Integer, Boolean ,text
+from sqlalchemy import Column, Index, String, Text, Integer, Boolean ,text
 from sqlalchemy.orm import relationship
 
 from .base import Base, SoftDeleteMixin, TimestampMixin
 
 class Category(Base, TimestampMixin, SoftDeleteMixin):
     __tablename__ = "categories"
+    __table_args__ = (Index("ix_categories_updated_at", "updated_at"),)
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(128), nullable=False, unique=True)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import Column, ForeignKey, Index, Integer, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from .base import Base, TimestampMixin
@@ -9,6 +9,7 @@ class Inventory(Base, TimestampMixin):
     __tablename__ = "inventory"
     __table_args__ = (
         UniqueConstraint("product_id", "branch_id", name="uq_inventory_product_branch"),
+        Index("ix_inventory_updated_at", "updated_at"),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from sqlalchemy import Column, ForeignKey, Index, Numeric, String, text, Integer, JSON, Boolean, Text
+from sqlalchemy import DDL, Column, ForeignKey, Index, Numeric, String, event, text, Integer, JSON, Boolean, Text
 from sqlalchemy.orm import relationship
 from .base import Base, SoftDeleteMixin, TimestampMixin
 
@@ -9,6 +9,7 @@ class Product(Base, TimestampMixin, SoftDeleteMixin):
     __table_args__ = (
         Index("ix_products_name", "name"),
         Index("ix_products_category_id", "category_id"),
+        Index("ix_products_updated_at", "updated_at"),
     )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -26,3 +27,44 @@ class Product(Base, TimestampMixin, SoftDeleteMixin):
 
     category = relationship("Category", back_populates="products")
     inventory = relationship("Inventory", back_populates="product", cascade="all, delete-orphan")
+
+
+# Full-text search document; must stay equivalent to the expression indexed in
+# the 0003_product_search migration so PostgreSQL can use ix_products_search.
+_SEARCH_DOCUMENT = "to_tsvector('simple', coalesce({t}name, '') || ' ' || coalesce({t}description, ''))"
+PRODUCT_SEARCH_DOCUMENT = _SEARCH_DOCUMENT.format(t="products.")
+PRODUCT_FTS_TABLE = "products_fts"
+
+_POSTGRES_SEARCH_DDL = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_products_search ON products USING gin ({_SEARCH_DOCUMENT.format(t='')})",
+    "CREATE INDEX IF NOT EXISTS ix_products_name_trgm ON products USING gin (name gin_trgm_ops)",
+)
+
+# SQLite fallback: an external-content FTS5 table kept in sync by triggers.
+_SQLITE_SEARCH_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {PRODUCT_FTS_TABLE} USING fts5("
+    "name, description, content='products', content_rowid='id', tokenize='trigram')",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO {PRODUCT_FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO {PRODUCT_FTS_TABLE}({PRODUCT_FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO {PRODUCT_FTS_TABLE}({PRODUCT_FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {PRODUCT_FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+)
+
+for _statement in _POSTGRES_SEARCH_DDL:
+    event.listen(Product.__table__, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+for _statement in _SQLITE_SEARCH_DDL:
+    event.listen(Product.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Product.__table__,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {PRODUCT_FTS_TABLE}").execute_if(dialect="sqlite"),
+)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from sqlalchemy import TIMESTAMP, Column, ForeignKey, Index, Integer, String, func
+
+from .base import Base
+
+class ProductCoPurchase(Base):
+    """Sparse co-occurrence matrix: orders containing both products, stored in both directions."""
+
+    __tablename__ = "product_co_purchases"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    related_product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    orders_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+class RelatedProduct(Base):
+    """Top-K co-purchased products per product, derived from product_co_purchases."""
+
+    __tablename__ = "related_products"
+    __table_args__ = (Index("ix_related_products_rank", "product_id", "rank"),)
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    related_product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    rank = Column(Integer, nullable=False)
+    score = Column(Integer, nullable=False)
+
+class JobWatermark(Base):
+    """Progress marker for incremental offline jobs (last processed id per job)."""
+
+    __tablename__ = "job_watermarks"
+
+    name = Column(String(64), primary_key=True)
+    last_id = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
+
+class CoPurchaseOrder(Base):
+    """Orders already folded into product_co_purchases, kept for the trailing re-scan window."""
+
+    __tablename__ = "co_purchase_orders"
+
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), primary_key=True)
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from sqlalchemy import TIMESTAMP, Column, ForeignKey, Index, Integer, func
+
+from .base import Base
+
+class ProductStockSummary(Base):
+    """Per-product stock rollup of the inventory table, maintained on every inventory write."""
+
+    __tablename__ = "product_stock_summary"
+    __table_args__ = (Index("ix_product_stock_summary_updated_at", "updated_at"),)
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    total_available = Column(Integer, nullable=False, default=0, server_default="0")
+    total_reserved = Column(Integer, nullable=False, default=0, server_default="0")
+    branches_in_stock = Column(Integer, nullable=False, default=0, server_default="0")
+    delivery_available = Column(Integer, nullable=False, default=0, server_default="0")
+    updated_at = Column(TIMESTAMP, nullable=False, server_default=func.now(), onupdate=func.now())
@@ -1,11 +1,15 @@
 from __future__ import annotations
-from flask import Blueprint, jsonify, request
+from datetime import datetime, timezone
+from flask import Blueprint, Response, jsonify, request, stream_with_context
 from flask_jwt_extended import jwt_required
 from app.middleware.auth import require_role
 from app.models.enums import Role
 from app.schemas.catalog import CategoryAdminRequest, ProductAdminRequest, ProductUpdateRequest
+from app.middleware.error_handler import DomainError
 from app.services.catalog import CatalogAdminService
+from app.services.catalog.product_import import detect_format
 from app.utils.request_params import toggle_flag
+from app.utils.request_utils import current_user_id
 from app.utils.responses import success_envelope 
 from app.schemas.admin_branches_query import ToggleCategoryQuery
 
@@ -77,3 +81,30 @@ def toggle_product(product_id: int):
     active = toggle_flag(request.args)
     product = CatalogAdminService.toggle_product(product_id, active)
     return jsonify(success_envelope(product))
+
+## IMPORT (Products, CSV or NDJSON upsert by SKU)
+@blueprint.post("/products/import")
+@jwt_required()
+@require_role(Role.MANAGER, Role.ADMIN)
+def import_products():
+    file = request.files.get("file")
+    if not file:
+        raise DomainError("NO_FILE", "Please attach a CSV or NDJSON file to import.", status_code=400)
+    fmt = detect_format(request.args.get("format"), file.filename)
+    summary = CatalogAdminService.import_products(file.stream, fmt, current_user_id())
+    return jsonify(success_envelope(summary))
+
+## EXPORT (Products, gzip NDJSON)
+@blueprint.get("/products/export")
+@jwt_required()
+@require_role(Role.MANAGER, Role.ADMIN)
+def export_products():
+    filename = f"catalog-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.ndjson"
+    response = Response(
+        stream_with_context(CatalogAdminService.export_catalog()),
+        mimetype="application/x-ndjson",
+    )
+    response.headers["Content-Encoding"] = "gzip"
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["Cache-Control"] = "no-store"
+    return response
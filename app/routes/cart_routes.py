@@ -5,7 +5,7 @@ from __future__ import annotations
 from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required
 
-from app.schemas.cart import CartItemUpsertRequest
+from app.schemas.cart import CartBulkAddRequest, CartItemUpsertRequest
 from app.services.cart_service import CartService
 from app.services.cart import helpers
 from app.utils.request_utils import current_user_id, parse_json_or_400
@@ -33,13 +33,23 @@ def add_item():
     return jsonify(success_envelope(cart)), 201
 
 
+## CREATE (Cart Items, bulk)
+@blueprint.post("/items/bulk")
+@jwt_required()
+def add_items():
+    user_id = current_user_id()
+    payload = CartBulkAddRequest.model_validate(parse_json_or_400())
+    result = CartService.add_items(user_id, payload.items)
+    return jsonify(success_envelope(result)), 201
+
+
 ## UPDATE (Cart Item)
 @blueprint.put("/items/<int:item_id>")
 @jwt_required()
 def update_item(item_id: int):
     user_id = current_user_id()
     payload = CartItemUpsertRequest.model_validate(parse_json_or_400())
-    cart_id = helpers.get_or_create_cart(user_id).id
+    cart_id = helpers.get_or_create_cart_id(user_id)
     cart = CartService.update_item(user_id, cart_id, item_id, payload.quantity)
     return jsonify(success_envelope(cart))
 
@@ -49,7 +59,7 @@ def update_item(item_id: int):
 @jwt_required()
 def delete_item(item_id: int):
     user_id = current_user_id()
-    cart_id = helpers.get_or_create_cart(user_id).id
+    cart_id = helpers.get_or_create_cart_id(user_id)
     cart = CartService.delete_item(user_id, cart_id, item_id)
     return jsonify(success_envelope(cart))
 
@@ -58,6 +68,6 @@ def delete_item(item_id: int):
 @jwt_required()
 def clear_cart():
     user_id = current_user_id()
-    cart_id = helpers.get_or_create_cart(user_id).id
+    cart_id = helpers.get_or_create_cart_id(user_id)
     cart = CartService.clear_cart(user_id, cart_id)
     return jsonify(success_envelope(cart))
@@ -5,10 +5,14 @@ from __future__ import annotations
 # PUBLIC: All endpoints in this file are intentionally unauthenticated for catalog browsing.
 from flask import Blueprint, jsonify, request
 
+from app.middleware.conditional import conditional_get
 from app.services.catalog import CatalogQueryService
-from app.utils.request_params import optional_int, safe_int
+from app.services.catalog.facets import parse_facets
+from app.services.catalog.fields import parse_fields
+from app.services.catalog.version import catalog_version
+from app.utils.request_params import optional_int, parse_bool, safe_int
 from app.utils.responses import success_envelope 
-from app.schemas.query_params import ProductSearchQuery
+from app.schemas.query_params import CatalogChangesQuery, ProductBatchQuery, ProductSearchQuery
 
 
 blueprint = Blueprint("catalog", __name__)
@@ -16,6 +20,7 @@ blueprint = Blueprint("catalog", __name__)
 
 ## READ (List Categories)
 @blueprint.get("/categories")
+@conditional_get(catalog_version)
 def list_categories():
     limit = safe_int(request.args, "limit", 50)
     offset = safe_int(request.args, "offset", 0)
@@ -25,44 +30,102 @@ def list_categories():
 
 ## READ (Category Products)
 @blueprint.get("/categories/<int:category_id>/products")
+@conditional_get(catalog_version)
 def category_products(category_id):
     limit = safe_int(request.args, "limit", 50)
     offset = safe_int(request.args, "offset", 0)
     branch_id = optional_int(request.args, "branchId")
-    products, total = CatalogQueryService.get_category_products(category_id, branch_id, limit, offset)
+    fields = parse_fields(request.args.get("fields"))
+    if "cursor" in request.args:
+        include_total = bool(parse_bool(request.args.get("include_total")))
+        products, total, next_cursor = CatalogQueryService.get_category_products_after(
+            category_id, branch_id, limit, request.args.get("cursor"), include_total, fields,
+        )
+        return jsonify(success_envelope(products, _cursor_meta(limit, total, next_cursor)))
+    products, total = CatalogQueryService.get_category_products(category_id, branch_id, limit, offset, fields)
     return jsonify(success_envelope(products, {"total": total, "limit": limit, "offset": offset}))
 
 
+## READ (Batch Get Products)
+@blueprint.get("/products")
+@conditional_get(catalog_version)
+def get_products():
+    params = ProductBatchQuery(ids=request.args.getlist("ids"), branchId=request.args.get("branchId"))
+    fields = parse_fields(request.args.get("fields"))
+    products, missing = CatalogQueryService.get_products(tuple(params.ids), params.branch_id, fields)
+    return jsonify(success_envelope(products, {"total": len(products), "missing": missing}))
+
+
 ## READ (Get Product)
 @blueprint.get("/products/<int:product_id>")
+@conditional_get(catalog_version)
 def get_product(product_id):
     branch_id = optional_int(request.args, "branchId")
-    product = CatalogQueryService.get_product(product_id, branch_id)
+    fields = parse_fields(request.args.get("fields"))
+    product = CatalogQueryService.get_product(product_id, branch_id, fields)
     return jsonify(success_envelope(product))
 
 
+## READ (Related Products)
+@blueprint.get("/products/<int:product_id>/related")
+def related_products(product_id):
+    limit = min(max(safe_int(request.args, "limit", 10), 1), 50)
+    branch_id = optional_int(request.args, "branchId")
+    fields = parse_fields(request.args.get("fields"))
+    products = CatalogQueryService.related_products(product_id, branch_id, limit, fields)
+    return jsonify(success_envelope(products, {"total": len(products), "limit": limit}))
+
+
 ## READ (Search Products)
 @blueprint.get("/products/search")
 def search_products():
     params = ProductSearchQuery(**request.args)
+    fields = parse_fields(params.fields)
+    if params.cursor is not None:
+        products, total, next_cursor = CatalogQueryService.search_products_after(
+            params.q, params.category_id, params.in_stock, params.branch_id,
+            params.limit, params.cursor, params.min_price, params.max_price,
+            params.organic_only, params.sort, params.include_total, fields,
+        )
+        meta = _cursor_meta(params.limit, total, next_cursor)
+        return jsonify(success_envelope(products, _with_facets(meta, params, params.q)))
     products, total = CatalogQueryService.search_products(
         params.q, params.category_id, params.in_stock, params.branch_id,
         params.limit, params.offset, params.min_price, params.max_price,
-        params.organic_only, params.sort,
+        params.organic_only, params.sort, fields,
     )
     has_next = total > (params.offset + params.limit)
     meta = {"total": total, "limit": params.limit, "offset": params.offset, "has_next": has_next}
-    return jsonify(success_envelope(products, meta))
+    # The first page falls back to a spelling-corrected query; facets follow the rows shown.
+    query = params.q
+    if query and not params.offset:
+        corrected = CatalogQueryService.corrected_query(
+            query, params.category_id, params.in_stock, params.branch_id,
+            params.min_price, params.max_price, params.organic_only,
+        )
+        if corrected:
+            meta["corrected_query"] = query = corrected
+    return jsonify(success_envelope(products, _with_facets(meta, params, query)))
     
 ## READ (Featured Products)
 @blueprint.get("/products/featured")
+@conditional_get(catalog_version)
 def featured_products():
     limit = safe_int(request.args, "limit", 10)
     branch_id = optional_int(request.args, "branchId")
-    products = CatalogQueryService.featured_products(limit, branch_id)
+    fields = parse_fields(request.args.get("fields"))
+    products = CatalogQueryService.featured_products(limit, branch_id, fields)
     return jsonify(success_envelope(products))
 
 
+## READ (Catalog Changes)
+@blueprint.get("/changes")
+def catalog_changes():
+    params = CatalogChangesQuery(**request.args)
+    products, watermark, has_more = CatalogQueryService.changes(params.since, params.branch_id, params.limit)
+    return jsonify(success_envelope(products, {"watermark": watermark, "has_more": has_more, "limit": params.limit}))
+
+
 ## READ (Autocomplete Products)
 @blueprint.get("/products/autocomplete")
 def autocomplete():
@@ -72,6 +135,24 @@ def autocomplete():
     return jsonify(success_envelope(payload))
 
 
+def _cursor_meta(limit: int, total: int | None, next_cursor: str | None) -> dict:
+    """Meta envelope for cursor mode; an empty ``cursor`` parameter requests the first page."""
+    meta = {"limit": limit, "next_cursor": next_cursor, "has_next": next_cursor is not None}
+    if total is not None:
+        meta["total"] = total
+    return meta
+
+
+def _with_facets(meta: dict, params: ProductSearchQuery, query: str | None) -> dict:
+    facets = parse_facets(params.facets)
+    if facets:
+        meta["facets"] = CatalogQueryService.search_facets(
+            query, params.category_id, params.in_stock, params.branch_id, facets,
+            params.min_price, params.max_price, params.organic_only,
+        )
+    return meta
+
+
 ## READ (Product Reviews)
 @blueprint.get("/products/<int:product_id>/reviews")
 def product_reviews(product_id):
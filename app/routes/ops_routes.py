@@ -19,6 +19,7 @@ from app.services.ops.custom_ops_service import (
     get_ops_performance,
     get_ops_alerts,
 )
+from app.services.catalog_cache import catalog_cache
 from app.services.stock_requests import StockRequestEmployeeService, StockRequestReviewService
 from app.schemas.stock_requests import StockRequestCreateRequest
 from app.utils.request_utils import current_user_id
@@ -109,6 +110,14 @@ def get_performance():
     performance_data = get_ops_performance(user_id)
     return jsonify(success_envelope(performance_data)), 200
 
+# Endpoint: GET /ops/catalog-cache
+## READ (Catalog Cache Metrics, this worker)
+@blueprint.get("/catalog-cache")
+@jwt_required()
+@require_role(Role.MANAGER, Role.ADMIN)
+def get_catalog_cache_stats():
+    return jsonify(success_envelope(catalog_cache.stats())), 200
+
 # Endpoint: GET /ops/alerts
 ## READ (Alerts)
 @blueprint.get("/alerts")
@@ -21,3 +21,16 @@ class CartResponse(DefaultModel):
     user_id: int = Field(gt=0)
     total_amount: Decimal = Field(ge=0, le=100000)
     items: list[CartItemResponse]
+
+class CartBulkAddRequest(DefaultModel):
+    items: list[CartItemUpsertRequest] = Field(min_length=1, max_length=100)
+
+class CartBulkLineResult(DefaultModel):
+    product_id: int = Field(gt=0)
+    quantity: int = Field(gt=0)
+    added: bool
+    error_code: str | None = None
+
+class CartBulkAddResponse(DefaultModel):
+    cart: CartResponse
+    results: list[CartBulkLineResult]
@@ -2,7 +2,7 @@ from __future__ import annotations
 from decimal import Decimal
 
 from .common import DefaultModel, Pagination
-from pydantic import Field
+from pydantic import Field, model_validator
 
 class CategoryResponse(DefaultModel):
     id: int
@@ -11,6 +11,10 @@ class CategoryResponse(DefaultModel):
     description: str | None
     is_active: bool = True
 
+class CategorySummaryResponse(CategoryResponse):
+    product_count: int = 0
+    in_stock_count: int = 0
+
 class ProductResponse(DefaultModel):
     id: int
     name: str
@@ -37,6 +41,24 @@ class ProductSearchResponse(DefaultModel):
     items: list[ProductResponse]
     pagination: Pagination
 
+class CategoryFacet(DefaultModel):
+    category_id: int
+    count: int
+
+class OrganicFacet(DefaultModel):
+    organic: int
+    non_organic: int
+
+class PriceBucketFacet(DefaultModel):
+    min: Decimal
+    max: Decimal | None = None
+    count: int
+
+class SearchFacets(DefaultModel):
+    category: list[CategoryFacet] | None = None
+    organic: OrganicFacet | None = None
+    price: list[PriceBucketFacet] | None = None
+
 class AutocompleteItem(DefaultModel):
     id: int
     name: str
@@ -61,3 +83,20 @@ class ProductUpdateRequest(DefaultModel):
     price: Decimal | None = Field(default=None, gt=0, le=10000)
     category_id: int | None = Field(default=None, gt=0)
     description: str | None = Field(default=None, min_length=0, max_length=500)
+
+class ProductImportRow(DefaultModel):
+    """One row of a bulk product import; the category is given by id or by name."""
+    sku: str = Field(min_length=2, max_length=20, pattern=r"^[A-Za-z0-9\-]+$")
+    name: str = Field(min_length=2, max_length=100, pattern=r"^[\w\s\-א-ת]+$")
+    price: Decimal = Field(gt=0, le=10000)
+    category_id: int | None = Field(default=None, gt=0)
+    category: str | None = Field(default=None, min_length=1, max_length=50)
+    description: str | None = Field(default=None, min_length=0, max_length=500)
+    unit: str | None = Field(default=None, max_length=24)
+    is_organic: bool = False
+
+    @model_validator(mode="after")
+    def _require_category(self):
+        if self.category_id is None and not self.category:
+            raise ValueError("category_id or category is required")
+        return self
@@ -1,4 +1,4 @@
-from pydantic import Field
+from pydantic import Field, field_validator
 from .common import DefaultModel
 from typing import Optional
 
@@ -8,8 +8,36 @@ class ProductSearchQuery(DefaultModel):
     offset: int = Field(default=0, ge=0)
     min_price: Optional[float] = Field(default=None, ge=0)
     max_price: Optional[float] = Field(default=None, ge=0)
-    sort: Optional[str] = Field(default=None, pattern=r"^(price|name|date)$")
+    sort: Optional[str] = Field(
+        default=None,
+        pattern=r"^(price|name|date|price_asc|price_desc|name_asc|name_desc|updated_at_desc|id_desc)$",
+    )
     category_id: Optional[int] = Field(default=None, ge=1)
     branch_id: Optional[int] = Field(default=None, ge=1)
     in_stock: Optional[bool] = None
     organic_only: Optional[bool] = None
+    cursor: Optional[str] = Field(default=None, max_length=512)
+    include_total: bool = False
+    facets: Optional[str] = Field(
+        default=None,
+        pattern=r"^(category|organic|price)(,(category|organic|price))*$",
+    )
+    fields: Optional[str] = Field(default=None, max_length=512)
+
+
+class ProductBatchQuery(DefaultModel):
+    ids: list[int] = Field(min_length=1, max_length=200)
+    branch_id: Optional[int] = Field(default=None, ge=1, alias="branchId")
+
+    @field_validator("ids", mode="before")
+    @classmethod
+    def split_ids(cls, value):
+        # Accept ids=1,2,3 as well as repeated ids=1&ids=2.
+        values = value if isinstance(value, list) else [value]
+        return [part for item in values for part in str(item).split(",") if part.strip()]
+
+
+class CatalogChangesQuery(DefaultModel):
+    since: Optional[str] = Field(default=None, max_length=4096)
+    limit: int = Field(default=500, ge=1, le=1000)
+    branch_id: Optional[int] = Field(default=None, ge=1, alias="branchId")
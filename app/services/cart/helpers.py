@@ -6,7 +6,7 @@ from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from ...extensions import db
-from ...models import Cart
+from ...models import Cart, CartItem, Product
 from ...schemas.cart import CartItemResponse, CartResponse
 
 def get_or_create_cart(user_id: int) -> Cart:
@@ -22,29 +22,38 @@ def get_or_create_cart(user_id: int) -> Cart:
     
     return cart
 
-def reload_cart(cart_id: int) -> Cart:
-    """Reload cart with items from database."""
-    return db.session.execute(
-        select(Cart).where(Cart.id == cart_id).options(selectinload(Cart.items))
-    ).scalar_one()
+def get_or_create_cart_id(user_id: int) -> int:
+    """Id of the user's cart, created if missing, without loading its items."""
+    cart_id = db.session.scalar(select(Cart.id).where(Cart.user_id == user_id).order_by(Cart.id).limit(1))
+    if cart_id is None:
+        cart_id = get_or_create_cart(user_id).id
+    return cart_id
 
-def to_response(cart: Cart) -> CartResponse:
-    """Convert cart model to response schema."""
+def load_response(cart_id: int, user_id: int) -> CartResponse:
+    """Cart response from a single items-with-product query."""
+    rows = db.session.execute(
+        select(
+            CartItem.id, CartItem.product_id, CartItem.quantity, CartItem.unit_price,
+            Product.name, Product.image_url,
+        )
+        .outerjoin(Product, Product.id == CartItem.product_id)
+        .where(CartItem.cart_id == cart_id)
+        .order_by(CartItem.id)
+    ).all()
     items = [
         CartItemResponse(
-            id=item.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            unit_price=Decimal(item.unit_price),
-            product_name=item.product.name if item.product else None,
-            product_image=item.product.image_url if item.product else None,
+            id=item_id,
+            product_id=product_id,
+            quantity=quantity,
+            unit_price=Decimal(unit_price),
+            product_name=name,
+            product_image=image_url,
         )
-        for item in cart.items
+        for item_id, product_id, quantity, unit_price, name, image_url in rows
     ]
-    total = sum(item.unit_price * item.quantity for item in items)
     return CartResponse(
-        id=cart.id,
-        user_id=cart.user_id,
-        total_amount=total,
+        id=cart_id,
+        user_id=user_id,
+        total_amount=sum(item.unit_price * item.quantity for item in items),
         items=items,
     )
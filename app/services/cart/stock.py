@@ -0,0 +1,129 @@
+"""Single-statement stock validation and reservation for cart writes."""
+
+from __future__ import annotations
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from flask import current_app
+from sqlalchemy import and_, case, exists, select
+
+from ...extensions import db
+from ...middleware.error_handler import DomainError
+from ...models import Inventory, Product
+from ...services.catalog.stock_bitmap import stock_bitmap
+from ...services.inventory_reservation_service import InventoryReservationService
+from ...services.stock_summary_service import StockSummaryService, delivery_branch_id
+from . import validators
+
+# Per-line ceiling, the same limit the cart schemas put on a single request.
+MAX_LINE_QUANTITY = 10000
+
+
+def utcnow() -> datetime:
+    """Naive UTC, the form reservation deadlines are stored in."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def reservation_deadline(now: datetime | None = None) -> datetime:
+    minutes = int(current_app.config.get("CART_RESERVATION_TTL_MINUTES", 60))
+    return (now or utcnow()) + timedelta(minutes=minutes)
+
+
+def reserve_delivery_stock(product_id: int, required_quantity: int, delta: int) -> Decimal:
+    """Adjust the delivery-branch reservation by ``delta`` if the product is active and the
+    branch has at least ``required_quantity`` available; returns the current price.
+
+    Stock other carts hold is not available for growth: a positive ``delta`` must also
+    fit in ``available_quantity - reserved_quantity``. Validation and reservation are one
+    conditional UPDATE ... RETURNING, so the common path costs a single round trip. Only
+    a rejected update reads further, to report why.
+    """
+    branch_id = _delivery_branch()
+    product = select(Product).where(Product.id == Inventory.product_id)
+    stmt = (
+        InventoryReservationService.statement(branch_id, reserved={product_id: delta})
+        .where(
+            Inventory.available_quantity >= required_quantity,
+            exists(product.where(Product.is_active.is_(True))),
+        )
+        .returning(product.with_only_columns(Product.price).scalar_subquery())
+    )
+    if delta > 0:
+        stmt = stmt.where(Inventory.available_quantity - Inventory.reserved_quantity >= delta)
+    price = db.session.execute(stmt).scalar_one_or_none()
+    if price is None:
+        _raise_unavailable(product_id)
+    # Core UPDATEs skip the flush hook that keeps the summary in step.
+    StockSummaryService.refresh([product_id], reservations_only=True)
+    return price
+
+
+def _raise_unavailable(product_id: int) -> None:
+    """Raise the same error the step-by-step validators would for this product."""
+    product = validators.validate_product(product_id)
+    validators.assert_in_stock_anywhere(product)
+    validators.get_delivery_source_branch_id()
+    raise DomainError(
+        "OUT_OF_STOCK_DELIVERY_BRANCH",
+        "Product is out of stock in the delivery warehouse",
+        status_code=409,
+    )
+
+
+def check_delivery_stock(requests: dict[int, tuple[int, int]]) -> tuple[dict[int, Decimal], dict[int, str]]:
+    """Grouped pre-check for many (required_quantity, delta) requests keyed by product id.
+
+    One query reads every product with its delivery-branch row. Returns the prices of
+    the products that pass and the error code of the ones that do not, using the same
+    rules and codes as :func:`reserve_delivery_stock`.
+    """
+    branch_id = _delivery_branch()
+    rows = db.session.execute(
+        select(Product.id, Product.price, Product.is_active, Inventory.available_quantity, Inventory.reserved_quantity)
+        .outerjoin(Inventory, and_(Inventory.product_id == Product.id, Inventory.branch_id == branch_id))
+        .where(Product.id.in_(sorted(requests)))
+    ).all()
+    found = {row[0]: row[1:] for row in rows}
+    prices: dict[int, Decimal] = {}
+    errors: dict[int, str] = {}
+    for product_id, (required, delta) in requests.items():
+        if product_id not in found:
+            errors[product_id] = "NOT_FOUND"
+            continue
+        price, is_active, available, reserved = found[product_id]
+        if not is_active:
+            errors[product_id] = "PRODUCT_INACTIVE"
+        elif available is None or available < required or (delta > 0 and available - reserved < delta):
+            in_stock = stock_bitmap.has_stock(product_id)
+            errors[product_id] = "OUT_OF_STOCK_DELIVERY_BRANCH" if in_stock else "OUT_OF_STOCK_ANYWHERE"
+        else:
+            prices[product_id] = price
+    return prices, errors
+
+
+def reserve_delivery_stock_many(requests: dict[int, tuple[int, int]]) -> set[int]:
+    """Apply many guarded reservations in one UPDATE; returns the products that got theirs.
+
+    Each row carries its own guard, so a product whose stock moved since the pre-check
+    is skipped rather than over-reserved.
+    """
+    if not requests:
+        return set()
+    branch_id = _delivery_branch()
+    required = case({pid: req for pid, (req, _) in requests.items()}, value=Inventory.product_id)
+    growth = case({pid: max(delta, 0) for pid, (_, delta) in requests.items()}, value=Inventory.product_id)
+    stmt = (
+        InventoryReservationService.statement(branch_id, reserved={pid: delta for pid, (_, delta) in requests.items()})
+        .where(
+            Inventory.available_quantity >= required,
+            Inventory.available_quantity - Inventory.reserved_quantity >= growth,
+        )
+        .returning(Inventory.product_id)
+    )
+    reserved = set(db.session.execute(stmt).scalars())
+    StockSummaryService.refresh(reserved, reservations_only=True)
+    return reserved
+
+
+def _delivery_branch() -> int:
+    branch_id = delivery_branch_id()
+    return branch_id if branch_id is not None else validators.get_delivery_source_branch_id()
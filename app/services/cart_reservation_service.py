@@ -0,0 +1,70 @@
+"""Expiry of idle cart reservations (run periodically via ``flask expire-cart-reservations``)."""
+
+from __future__ import annotations
+from datetime import datetime
+from sqlalchemy import exists, func, select, update
+
+from app.extensions import db
+from app.models import Cart, CartItem, CartStatus
+from app.services.audit_service import AuditService
+from app.services.cart import stock, validators
+from app.services.inventory_reservation_service import InventoryReservationService
+
+
+class CartReservationService:
+    @staticmethod
+    def expire_idle_carts(batch_size: int = 500, now: datetime | None = None) -> dict[str, int]:
+        """Mark carts whose every reservation has lapsed ABANDONED and release their stock.
+
+        Each batch locks its carts with FOR UPDATE SKIP LOCKED, so carts held by a
+        checkout (which locks its cart) are skipped rather than waited on, and several
+        sweepers can run side by side. Stock is released with one UPDATE per batch and
+        the batch commits on its own.
+        """
+        now = now or stock.utcnow()
+        session = db.session
+        branch_id = validators.get_delivery_source_branch_id()
+        expired = CartItem.reserved_until < now
+        lapsed = exists().where(CartItem.cart_id == Cart.id, expired)
+        live = exists().where(CartItem.cart_id == Cart.id, CartItem.reserved_until >= now)
+        carts = items = 0
+        while True:
+            cart_ids = session.scalars(
+                select(Cart.id)
+                .where(Cart.status == CartStatus.ACTIVE, lapsed, ~live)
+                .order_by(Cart.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True, of=Cart)
+            ).all()
+            if not cart_ids:
+                break
+            released = dict(
+                session.execute(
+                    select(CartItem.product_id, func.sum(CartItem.quantity))
+                    .where(CartItem.cart_id.in_(cart_ids), expired)
+                    .group_by(CartItem.product_id)
+                ).all()
+            )
+            InventoryReservationService.adjust(branch_id, reserved={pid: -qty for pid, qty in released.items()})
+            lines = session.execute(
+                update(CartItem)
+                .where(CartItem.cart_id.in_(cart_ids), expired)
+                .values(reserved_until=None)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            session.execute(
+                update(Cart)
+                .where(Cart.id.in_(cart_ids))
+                .values(status=CartStatus.ABANDONED)
+                .execution_options(synchronize_session=False)
+            )
+            AuditService.log_event(
+                entity_type="cart",
+                action="EXPIRE_RESERVATIONS",
+                new_value={"carts": len(cart_ids), "items": lines, "units": sum(released.values())},
+                context={"first_cart_id": cart_ids[0], "last_cart_id": cart_ids[-1]},
+            )
+            session.commit()
+            carts += len(cart_ids)
+            items += lines
+        return {"carts": carts, "items": items}
@@ -1,25 +1,26 @@
 from __future__ import annotations
 
-from sqlalchemy import select
+from sqlalchemy import and_, delete, func, insert, select, update
 from ..extensions import db
 from ..middleware.error_handler import DomainError
-from ..models import Cart, CartItem, Inventory
-from ..schemas.cart import CartResponse
+from ..models import Cart, CartItem, CartStatus
+from ..schemas.cart import CartBulkAddResponse, CartBulkLineResult, CartItemUpsertRequest, CartResponse
 from ..services.audit_service import AuditService
-from .cart import helpers, validators
+from ..services.inventory_reservation_service import InventoryReservationService
+from .cart import helpers, stock, validators
 
 
 class CartService:
     @staticmethod
-    def _adjust_reserved(product_id: int, delta: int) -> None:
-        """Increment (delta > 0) or decrement (delta < 0) reserved_quantity on the delivery branch inventory row."""
+    def _release_reserved(quantities: dict[int, int]) -> None:
+        """Return cart quantities (product_id -> quantity) to the delivery branch in one UPDATE."""
         branch_id = validators.get_delivery_source_branch_id()
-        inv = db.session.execute(
-            select(Inventory)
-            .where(Inventory.product_id == product_id, Inventory.branch_id == branch_id)
-        ).scalar_one_or_none()
-        if inv is not None:
-            inv.reserved_quantity = max(0, inv.reserved_quantity + delta)
+        InventoryReservationService.adjust(branch_id, reserved={pid: -qty for pid, qty in quantities.items()})
+
+    @staticmethod
+    def _reactivate(cart_id: int) -> None:
+        """An abandoned cart the customer touches again is active; expired lines stay released."""
+        db.session.execute(update(Cart).where(Cart.id == cart_id).values(status=CartStatus.ACTIVE))
 
     @staticmethod
     def _audit(cart_id: int, action: str, actor_user_id: int | None, **kwargs) -> None:
@@ -34,96 +35,218 @@ class CartService:
     @staticmethod
     def get_cart(user_id: int) -> CartResponse:
         """Get user's cart."""
-        cart = helpers.get_or_create_cart(user_id)
-        return helpers.to_response(cart)
+        return helpers.load_response(helpers.get_or_create_cart_id(user_id), user_id)
 
     @staticmethod
     def add_item(user_id: int, product_id: int, quantity: int) -> CartResponse:
-        """Add item to cart."""
+        """Add item to cart.
+
+        Reads the cart and any existing line for the product in one query, validates
+        and reserves stock in one conditional UPDATE, and commits once.
+        """
         if quantity <= 0:
             raise DomainError("INVALID_QUANTITY", "Quantity must be positive")
-        
-        product = validators.validate_product(product_id)
-        validators.assert_in_stock_anywhere(product)
-        
-        cart = helpers.get_or_create_cart(user_id)
-        existing = next((i for i in cart.items if i.product_id == product_id), None)
-        requested_quantity = quantity + existing.quantity if existing else quantity
-        validators.assert_in_stock_delivery_branch(product, requested_quantity)
-        
-        if existing:
-            existing.quantity += quantity
-            existing.unit_price = product.price
-            db.session.add(existing)
-        else:
-            item = CartItem(
-                cart_id=cart.id,
-                product_id=product_id,
-                quantity=quantity,
-                unit_price=product.price,
+
+        row = db.session.execute(
+            select(Cart.id, Cart.status, CartItem.id, CartItem.quantity, CartItem.reserved_until)
+            .outerjoin(CartItem, and_(CartItem.cart_id == Cart.id, CartItem.product_id == product_id))
+            .where(Cart.user_id == user_id)
+            .order_by(Cart.id, CartItem.id)
+            .limit(1)
+            # Serialises with the expiry sweeper, which skips carts locked here.
+            .with_for_update(of=Cart)
+        ).first()
+        cart_id, status, existing_id, existing_quantity, reserved_until = row if row else (None,) * 5
+        requested_quantity = quantity + (existing_quantity or 0)
+        if requested_quantity > stock.MAX_LINE_QUANTITY:
+            raise DomainError("QUANTITY_LIMIT", f"A cart line cannot exceed {stock.MAX_LINE_QUANTITY} units")
+        # A line whose reservation expired holds nothing, so all of it is reserved again.
+        delta = quantity if reserved_until is not None else requested_quantity
+        price = stock.reserve_delivery_stock(product_id, requested_quantity, delta)
+        deadline = stock.reservation_deadline()
+
+        if cart_id is None:
+            cart = Cart(user_id=user_id)
+            db.session.add(cart)
+            db.session.flush()
+            cart_id = cart.id
+        elif status == CartStatus.ABANDONED:
+            CartService._reactivate(cart_id)
+        if existing_id is not None:
+            db.session.execute(
+                update(CartItem)
+                .where(CartItem.id == existing_id)
+                .values(quantity=CartItem.quantity + quantity, unit_price=price, reserved_until=deadline)
             )
-            db.session.add(item)
-        CartService._adjust_reserved(product_id, quantity)
+        else:
+            db.session.add(CartItem(
+                cart_id=cart_id, product_id=product_id, quantity=quantity, unit_price=price, reserved_until=deadline,
+            ))
+        CartService._audit(
+            cart_id, "ADD_ITEM", user_id,
+            new_value={"product_id": str(product_id), "quantity": quantity}
+        )
         db.session.commit()
+        return helpers.load_response(cart_id, user_id)
+
+    @staticmethod
+    def add_items(user_id: int, lines: list[CartItemUpsertRequest]) -> CartBulkAddResponse:
+        """Add many items at once, e.g. a reorder or an imported shopping list.
+
+        Repeated products are merged. Lines that cannot be reserved are reported per
+        product instead of failing the request; the rest are validated in one grouped
+        query, reserved in one UPDATE, written in one batch and audited as one event.
+        """
+        quantities: dict[int, int] = {}
+        for line in lines:
+            quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+
+        rows = db.session.execute(
+            select(Cart.id, Cart.status, CartItem.id, CartItem.product_id, CartItem.quantity, CartItem.reserved_until)
+            .outerjoin(CartItem, and_(CartItem.cart_id == Cart.id, CartItem.product_id.in_(list(quantities))))
+            .where(Cart.user_id == user_id)
+            .order_by(Cart.id, CartItem.id)
+            .with_for_update(of=Cart)
+        ).all()
+        cart_id, status = (rows[0][0], rows[0][1]) if rows else (None, None)
+        existing: dict[int, tuple[int, int, bool]] = {}
+        for row_cart_id, _, item_id, product_id, quantity, reserved_until in rows:
+            if row_cart_id == cart_id and item_id is not None:
+                existing.setdefault(product_id, (item_id, quantity, reserved_until is not None))
+
+        requests: dict[int, tuple[int, int]] = {}
+        over_limit: dict[int, str] = {}
+        for product_id, quantity in quantities.items():
+            _, existing_quantity, held = existing.get(product_id, (None, 0, False))
+            required = quantity + existing_quantity
+            if required > stock.MAX_LINE_QUANTITY:
+                # Merged lines can pass the per-line schema limit; reject before reserving.
+                over_limit[product_id] = "QUANTITY_LIMIT"
+                continue
+            # A line whose reservation expired holds nothing, so all of it is reserved again.
+            requests[product_id] = (required, quantity if held else required)
+        prices, errors = stock.check_delivery_stock(requests) if requests else ({}, {})
+        errors.update(over_limit)
+        reserved = stock.reserve_delivery_stock_many({pid: requests[pid] for pid in prices})
+        for product_id in prices.keys() - reserved:
+            # Stock moved between the check and the guarded UPDATE.
+            errors[product_id] = "OUT_OF_STOCK_DELIVERY_BRANCH"
+
+        added = [pid for pid in quantities if pid in reserved]
+        if added:
+            if cart_id is None:
+                cart = Cart(user_id=user_id)
+                db.session.add(cart)
+                db.session.flush()
+                cart_id = cart.id
+            elif status == CartStatus.ABANDONED:
+                CartService._reactivate(cart_id)
+            deadline = stock.reservation_deadline()
+            updates = [
+                {"id": existing[pid][0], "quantity": requests[pid][0], "unit_price": prices[pid], "reserved_until": deadline}
+                for pid in added if pid in existing
+            ]
+            inserts = [
+                {"cart_id": cart_id, "product_id": pid, "quantity": quantities[pid],
+                 "unit_price": prices[pid], "reserved_until": deadline}
+                for pid in added if pid not in existing
+            ]
+            if updates:
+                db.session.execute(update(CartItem), updates)
+            if inserts:
+                db.session.execute(insert(CartItem), inserts)
+        elif cart_id is None:
+            cart_id = helpers.get_or_create_cart_id(user_id)
 
         CartService._audit(
-            cart.id, "ADD_ITEM", user_id,
-            new_value={"product_id": str(product_id), "quantity": quantity}
+            cart_id, "ADD_ITEMS", user_id,
+            new_value={
+                "items": [{"product_id": str(pid), "quantity": quantities[pid]} for pid in added],
+                "rejected": len(errors),
+            },
         )
-        return helpers.to_response(helpers.reload_cart(cart.id))
+        db.session.commit()
+        results = [
+            CartBulkLineResult(product_id=pid, quantity=qty, added=pid in reserved, error_code=errors.get(pid))
+            for pid, qty in quantities.items()
+        ]
+        return CartBulkAddResponse(cart=helpers.load_response(cart_id, user_id), results=results)
 
     @staticmethod
     def update_item(user_id: int, cart_id: int, item_id: int, quantity: int) -> CartResponse:
         """Update cart item quantity."""
         if quantity <= 0:
             raise DomainError("INVALID_QUANTITY", "Quantity must be positive")
-        
-        cart = CartService._get_cart_for_user(cart_id, user_id)
-        item = db.session.get(CartItem, item_id)
 
-        if not item or item.cart_id != cart.id:
+        row = db.session.execute(
+            select(CartItem.product_id, CartItem.quantity, CartItem.reserved_until, Cart.status)
+            .join(Cart, Cart.id == CartItem.cart_id)
+            .where(CartItem.id == item_id, CartItem.cart_id == cart_id, Cart.user_id == user_id)
+            .with_for_update(of=Cart)
+        ).first()
+        if row is None:
+            CartService._get_cart_for_user(cart_id, user_id)
             raise DomainError("NOT_FOUND", "Cart item not found", status_code=404)
-        
-        product = validators.validate_product(item.product_id)
-        validators.assert_in_stock_anywhere(product)
-        validators.assert_in_stock_delivery_branch(product, quantity)
-
-        old_qty = item.quantity
-        item.quantity = quantity
-        db.session.add(item)
-        CartService._adjust_reserved(item.product_id, quantity - old_qty)
-        db.session.commit()
+        product_id, old_qty, reserved_until, status = row
+        held = old_qty if reserved_until is not None else 0
+        stock.reserve_delivery_stock(product_id, quantity, quantity - held)
 
+        if status == CartStatus.ABANDONED:
+            CartService._reactivate(cart_id)
+        db.session.execute(
+            update(CartItem)
+            .where(CartItem.id == item_id)
+            .values(quantity=quantity, reserved_until=stock.reservation_deadline())
+        )
         CartService._audit(
-            cart.id, "UPDATE_ITEM", user_id,
+            cart_id, "UPDATE_ITEM", user_id,
             old_value={"item_id": str(item_id), "quantity": old_qty},
             new_value={"item_id": str(item_id), "quantity": quantity},
         )
-        return helpers.to_response(helpers.reload_cart(cart.id))
+        db.session.commit()
+        return helpers.load_response(cart_id, user_id)
     
     @staticmethod
     def delete_item(user_id: int, cart_id: int, item_id: int) -> CartResponse:
         """Delete cart item."""
-        cart = CartService._get_cart_for_user(cart_id, user_id)
-        item = db.session.get(CartItem, item_id)
-        if not item or item.cart_id != cart.id:
+        row = db.session.execute(
+            select(CartItem.product_id, CartItem.quantity, CartItem.reserved_until)
+            .join(Cart, Cart.id == CartItem.cart_id)
+            .where(CartItem.id == item_id, CartItem.cart_id == cart_id, Cart.user_id == user_id)
+            # The expiry sweeper skips locked carts, so a hold read here cannot be released twice.
+            .with_for_update(of=Cart)
+        ).first()
+        if row is None:
+            CartService._get_cart_for_user(cart_id, user_id)
             raise DomainError("NOT_FOUND", "Cart item not found", status_code=404)
-        CartService._adjust_reserved(item.product_id, -item.quantity)
-        db.session.delete(item)
-        CartService._audit(cart.id, "DELETE_ITEM", user_id, old_value={"item_id": str(item_id)})
+        product_id, quantity, reserved_until = row
+        if reserved_until is not None:
+            CartService._release_reserved({product_id: quantity})
+        db.session.execute(delete(CartItem).where(CartItem.id == item_id))
+        CartService._audit(cart_id, "DELETE_ITEM", user_id, old_value={"item_id": str(item_id)})
         db.session.commit()
-        return helpers.to_response(helpers.reload_cart(cart.id))
+        return helpers.load_response(cart_id, user_id)
     
     @staticmethod
     def clear_cart(user_id: int, cart_id: int) -> CartResponse:
         """Clear all items from cart."""
-        cart = CartService._get_cart_for_user(cart_id, user_id)
-        for item in list(cart.items):
-            CartService._adjust_reserved(item.product_id, -item.quantity)
-            db.session.delete(item)
+        locked = db.session.scalar(
+            select(Cart.id).where(Cart.id == cart_id, Cart.user_id == user_id).with_for_update()
+        )
+        if locked is None:
+            raise DomainError("NOT_FOUND", "Cart not found", status_code=404)
+        released = dict(
+            db.session.execute(
+                select(CartItem.product_id, func.sum(CartItem.quantity))
+                .where(CartItem.cart_id == cart_id, CartItem.reserved_until.is_not(None))
+                .group_by(CartItem.product_id)
+            ).all()
+        )
+        CartService._release_reserved(released)
+        db.session.execute(delete(CartItem).where(CartItem.cart_id == cart_id))
+        CartService._audit(cart_id, "CLEAR", user_id)
         db.session.commit()
-        CartService._audit(cart.id, "CLEAR", user_id)
-        return helpers.to_response(helpers.reload_cart(cart.id))
+        return helpers.load_response(cart_id, user_id)
     
     @staticmethod
     def _get_cart_for_user(cart_id: int, user_id: int) -> Cart:
@@ -1,8 +1,11 @@
 from app.services.catalog.admin import CatalogAdminService
 from app.services.catalog.query import CatalogQueryService
 from app.services.catalog.mappers import (
+    ProductStock,
+    map_product_rows,
     map_products,
     matches_stock,
+    stock_columns,
     to_category_response,
     to_product_response,
 )
@@ -10,8 +13,11 @@ from app.services.catalog.mappers import (
 __all__ = [
     "CatalogAdminService",
     "CatalogQueryService",
+    "ProductStock",
+    "map_product_rows",
     "map_products",
     "matches_stock",
+    "stock_columns",
     "to_category_response",
     "to_product_response",
 ]
@@ -1,9 +1,12 @@
 """Catalog admin service facade."""
 
 from __future__ import annotations
+from typing import IO, Any, Iterator
 
 from app.schemas.catalog import CategoryResponse, ProductResponse
 from . import category_admin, product_admin
+from .export import iter_catalog_ndjson, iter_gzip
+from .product_import import import_products
 
 
 class CatalogAdminService:
@@ -49,3 +52,13 @@ class CatalogAdminService:
     @staticmethod
     def toggle_product(product_id: int, active: bool) -> ProductResponse:
         return product_admin.toggle_product(product_id, active)
+
+    @staticmethod
+    def export_catalog() -> Iterator[bytes]:
+        """Active catalog with per-branch stock as a gzip NDJSON byte stream."""
+        return iter_gzip(iter_catalog_ndjson())
+
+    @staticmethod
+    def import_products(stream: IO[bytes], fmt: str, actor_user_id: int | None) -> dict[str, Any]:
+        """Upsert products by SKU from a CSV or NDJSON stream; returns a row-level summary."""
+        return import_products(stream, fmt, actor_user_id)
@@ -0,0 +1,178 @@
+"""In-process prefix index serving product autocomplete without a DB round trip."""
+
+from __future__ import annotations
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+from flask import current_app
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import db
+from app.models import OrderItem, Product
+from .fuzzy import FuzzyTokenIndex
+from .search import tokenize
+
+
+class AutocompleteIndex:
+    """Sorted (token, product_id) array over active product names, weighted by units sold.
+
+    Every name token is indexed so "mi" finds "Organic Milk". A prefix lookup is a
+    bisect into the sorted array followed by a top-k pass over the matching slice.
+    The same vocabulary feeds a FuzzyTokenIndex used to correct misspelled queries.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._keys: list[tuple[str, int]] = []
+        self._products: dict[int, tuple[str, int]] = {}
+        self._built_at: float | None = None
+        self._max_products = 0
+        self._fuzzy = FuzzyTokenIndex()
+
+    @property
+    def size(self) -> int:
+        return len(self._products)
+
+    def build(self) -> None:
+        """(Re)load the index from the database, keeping the most popular products within budget."""
+        max_products = int(current_app.config.get("AUTOCOMPLETE_MAX_PRODUCTS", 50000))
+        popularity = (
+            select(OrderItem.product_id, func.sum(OrderItem.quantity).label("units"))
+            .group_by(OrderItem.product_id)
+            .subquery()
+        )
+        weight = func.coalesce(popularity.c.units, 0)
+        rows = db.session.execute(
+            select(Product.id, Product.name, weight)
+            .outerjoin(popularity, popularity.c.product_id == Product.id)
+            .where(Product.is_active.is_(True))
+            .order_by(weight.desc(), Product.id.desc())
+            .limit(max_products)
+        ).all()
+        products = {row[0]: (row[1], int(row[2])) for row in rows}
+        keys = sorted((token, pid) for pid, (name, _) in products.items() for token in set(tokenize(name)))
+        fuzzy = FuzzyTokenIndex(int(current_app.config.get("FUZZY_SEARCH_MAX_DISTANCE", 2)))
+        for token, pid in keys:
+            fuzzy.add(token, products[pid][1] + 1)
+        with self._lock:
+            self._products = products
+            self._keys = keys
+            self._fuzzy = fuzzy
+            self._max_products = max_products
+            self._built_at = time.monotonic()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._products = {}
+            self._keys = []
+            self._fuzzy = FuzzyTokenIndex()
+            self._built_at = None
+
+    def upsert(self, product_id: int, name: str, is_active: bool) -> None:
+        """Apply a single product change; inactive products are dropped."""
+        with self._lock:
+            if self._built_at is None:
+                return
+            previous = self._products.get(product_id)
+            weight = previous[1] if previous else 0
+            self._remove_locked(product_id)
+            if not is_active:
+                return
+            if previous is None and len(self._products) >= self._max_products:
+                return
+            self._products[product_id] = (name, weight)
+            for token in set(tokenize(name)):
+                insort(self._keys, (token, product_id))
+                # Tokens of renamed products linger until the next rebuild; a stale
+                # correction just finds no rows.
+                self._fuzzy.add(token, weight + 1)
+
+    def remove(self, product_id: int) -> None:
+        with self._lock:
+            self._remove_locked(product_id)
+
+    def _remove_locked(self, product_id: int) -> None:
+        entry = self._products.pop(product_id, None)
+        if entry is None:
+            return
+        for token in set(tokenize(entry[0])):
+            pos = bisect_left(self._keys, (token, product_id))
+            if pos < len(self._keys) and self._keys[pos] == (token, product_id):
+                del self._keys[pos]
+
+    def search(self, query: str, limit: int, fuzzy: bool = True) -> list[tuple[int, str]]:
+        self._ensure_fresh()
+        tokens = tokenize(query)
+        if limit <= 0:
+            return []
+        if not tokens:
+            with self._lock:
+                matches = [(weight, name, pid) for pid, (name, weight) in self._products.items()]
+            return self._top(matches, limit)
+        # Scan the slice of the most selective (longest) token, then require the rest.
+        lead = max(tokens, key=len)
+        others = list(tokens)
+        others.remove(lead)
+        with self._lock:
+            keys, products = self._keys, self._products
+            pos = bisect_left(keys, (lead, 0))
+            candidates: set[int] = set()
+            while pos < len(keys) and keys[pos][0].startswith(lead):
+                candidates.add(keys[pos][1])
+                pos += 1
+            matches: list[tuple[int, str, int]] = []
+            for pid in candidates:
+                name, weight = products[pid]
+                if others:
+                    name_tokens = tokenize(name)
+                    if not all(any(nt.startswith(t) for nt in name_tokens) for t in others):
+                        continue
+                matches.append((weight, name, pid))
+        if not matches and fuzzy:
+            corrected = self.correct_query(query)
+            return self.search(corrected, limit, fuzzy=False) if corrected else []
+        return self._top(matches, limit)
+
+    def correct_query(self, query: str) -> str | None:
+        """Query with misspelled tokens replaced by their nearest indexed token, or None."""
+        self._ensure_fresh()
+        budget = int(current_app.config.get("FUZZY_SEARCH_BUDGET_MS", 25)) / 1000
+        with self._lock:
+            corrected = self._fuzzy.correct_tokens(tokenize(query), budget)
+        return " ".join(corrected) if corrected else None
+
+    @staticmethod
+    def _top(matches: list[tuple[int, str, int]], limit: int) -> list[tuple[int, str]]:
+        best = heapq.nsmallest(limit, matches, key=lambda m: (-m[0], m[1].lower(), m[2]))
+        return [(pid, name) for _, name, pid in best]
+
+    def _ensure_fresh(self) -> None:
+        # Other workers apply their own admin edits; a periodic rebuild picks those up.
+        refresh_seconds = int(current_app.config.get("AUTOCOMPLETE_REFRESH_SECONDS", 300))
+        built_at = self._built_at
+        if built_at is not None and time.monotonic() - built_at <= refresh_seconds:
+            return
+        # One request rebuilds; concurrent ones keep serving the current index, and only
+        # wait when there is none yet.
+        if not self._build_lock.acquire(blocking=built_at is None):
+            return
+        try:
+            if self._built_at == built_at:
+                self.build()
+        finally:
+            self._build_lock.release()
+
+
+autocomplete_index = AutocompleteIndex()
+
+
+def warm_autocomplete_index(app) -> None:
+    """Build the index at worker startup; fall back to a lazy build if the DB is not ready."""
+    with app.app_context():
+        try:
+            autocomplete_index.build()
+        except SQLAlchemyError:
+            db.session.rollback()
+            app.logger.warning("Autocomplete index not built at startup; it will build on first use")
@@ -0,0 +1,148 @@
+"""Delta-sync feed: products whose catalog data or stock changed after a watermark."""
+
+from __future__ import annotations
+import base64
+import binascii
+import json
+from datetime import datetime, timedelta
+from typing import NamedTuple
+from sqlalchemy import Subquery, func, select, tuple_, union_all
+from app.extensions import db
+from app.middleware.error_handler import DomainError
+from app.models import Inventory, Product
+from app.schemas.catalog import ProductResponse
+from .mappers import map_product_rows, stock_columns
+
+
+# updated_at is stamped at transaction start, so a change may commit up to this long after
+# readers have passed its timestamp; incremental readers re-read this much history.
+SYNC_OVERLAP = timedelta(seconds=60)
+# Delivered-but-unsettled changes a watermark remembers; beyond this the feed waits for
+# them to settle instead of growing the watermark.
+MAX_UNSETTLED = 100
+_EPOCH = datetime(1970, 1, 1)
+
+Position = tuple[datetime, int]
+
+
+class Watermark(NamedTuple):
+    """Feed position: everything up to ``settled`` was delivered, plus ``unsettled`` changes past it."""
+
+    settled: Position | None
+    unsettled: frozenset[Position]
+
+
+def _micros(value: datetime) -> int:
+    return (value - _EPOCH) // timedelta(microseconds=1)
+
+
+def encode_watermark(watermark: Watermark) -> str:
+    payload = {"u": sorted([product_id, _micros(changed_at)] for changed_at, product_id in watermark.unsettled)}
+    if watermark.settled is not None:
+        payload.update({"t": watermark.settled[0].isoformat(), "id": watermark.settled[1]})
+    raw = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_watermark(watermark: str) -> Watermark:
+    try:
+        padded = watermark + "=" * (-len(watermark) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        settled = (datetime.fromisoformat(payload["t"]), int(payload["id"])) if "t" in payload else None
+        unsettled = frozenset(
+            (_EPOCH + timedelta(microseconds=int(micros)), int(product_id))
+            for product_id, micros in payload.get("u", [])
+        )
+        return Watermark(settled, unsettled)
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError) as exc:
+        raise DomainError("INVALID_WATERMARK", "Watermark is malformed", status_code=400) from exc
+
+
+def latest_changes(not_before: datetime | None) -> Subquery:
+    """(product_id, changed_at) for products whose row or inventory changed at or after not_before."""
+    product_changes = select(Product.id.label("product_id"), Product.updated_at.label("changed_at"))
+    inventory_changes = select(
+        Inventory.product_id.label("product_id"), Inventory.updated_at.label("changed_at")
+    )
+    if not_before is not None:
+        # Coarse range filters first so both index scans stay narrow.
+        product_changes = product_changes.where(Product.updated_at >= not_before)
+        inventory_changes = inventory_changes.where(Inventory.updated_at >= not_before)
+    touched = union_all(product_changes, inventory_changes).subquery()
+    return (
+        select(touched.c.product_id, func.max(touched.c.changed_at).label("changed_at"))
+        .group_by(touched.c.product_id)
+        .subquery()
+    )
+
+
+def _settled_before() -> datetime | None:
+    """Changes older than this have all committed.
+
+    A still-open transaction began less than SYNC_OVERLAP ago, so after the newest change
+    already visible minus SYNC_OVERLAP. Two index-backed max() lookups.
+    """
+    row = db.session.execute(
+        select(
+            select(func.max(Product.updated_at)).scalar_subquery(),
+            select(func.max(Inventory.updated_at)).scalar_subquery(),
+        )
+    ).one()
+    stamps = [value for value in row if value is not None]
+    return max(stamps) - SYNC_OVERLAP if stamps else None
+
+
+def changes_since(
+    watermark: str | None, branch_id: int | None, limit: int
+) -> tuple[list[ProductResponse], str | None, bool]:
+    """Products changed after ``watermark``, oldest change first.
+
+    A product's change time is the later of its own updated_at and its newest inventory
+    row, so price edits, stock movements and deactivations (is_active=false) all surface.
+    Returns (items, next watermark, has_more); with no watermark the feed starts from
+    the beginning, which doubles as the initial full sync.
+
+    updated_at is the transaction start time, so a change can commit after a client has
+    read past it. The watermark therefore only moves past settled changes (see
+    ``_settled_before``); newer ones are delivered at once but re-read on the next call,
+    which skips those already delivered by their (changed_at, id).
+    """
+    since = decode_watermark(watermark) if watermark else Watermark(None, frozenset())
+    latest = latest_changes(since.settled[0] if since.settled is not None else None)
+    position = tuple_(latest.c.changed_at, latest.c.product_id)
+    stmt = (
+        select(Product, *stock_columns(branch_id), latest.c.changed_at)
+        .join(latest, latest.c.product_id == Product.id)
+        .order_by(latest.c.changed_at, latest.c.product_id)
+        .limit(limit + len(since.unsettled) + 1)
+    )
+    if since.settled is not None:
+        stmt = stmt.where(position > since.settled)
+    rows = db.session.execute(stmt).all()
+    settled_before = _settled_before()
+
+    page = []
+    settled, unsettled = since.settled, set(since.unsettled)
+    advancing, has_more = True, False
+    for row in rows:
+        key = (row[4], row[0].id)
+        is_settled = settled_before is not None and key[0] < settled_before
+        if key not in since.unsettled:
+            if len(page) == limit:
+                has_more = True
+                break
+            if not is_settled and len(unsettled) >= MAX_UNSETTLED:
+                # Deliver the rest once they settle and the watermark can drop them.
+                break
+            page.append(row)
+        if advancing and is_settled:
+            settled = key
+        else:
+            advancing = False
+            unsettled.add(key)
+    if settled is not None:
+        unsettled = {key for key in unsettled if key > settled}
+    if settled is None and not unsettled:
+        return [], watermark, False
+    items = map_product_rows([row[:4] for row in page], branch_id)
+    return items, encode_watermark(Watermark(settled, frozenset(unsettled))), has_more
@@ -0,0 +1,295 @@
+"""Optional in-process columnar engine for attribute-only catalog searches.
+
+Enabled with CATALOG_SEARCH_ENGINE=columnar. Product attributes live in typed ``array``
+columns indexed by a stable position, and set-valued attributes (active, organic, per
+category, in stock per branch) are bitsets held as Python ints, so filters combine with
+C-level ``&``. Sorting walks a precomputed position order and tests the filter mask, and
+only the final page of ids is hydrated from the database.
+
+The engine resyncs incrementally from the catalog change feed whenever the catalog cache
+generation moves (local commits or cross-worker invalidations) and rebuilds fully every
+CATALOG_COLUMNAR_REBUILD_SECONDS as a backstop.
+"""
+
+from __future__ import annotations
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Iterable
+from flask import current_app
+from sqlalchemy import func, select
+from app.extensions import db
+from app.models import Inventory, Product
+from app.services.catalog_cache import catalog_cache
+from .changes import SYNC_OVERLAP, latest_changes
+from .pagination import SORTS
+
+# Name sorts stay in SQL: the database collation orders mixed case and Hebrew differently
+# from Python's codepoint order.
+_SORT_COLUMNS = {"id": Product.id, "price": Product.price, "updated_at": Product.updated_at}
+
+
+def _cents(price: Decimal | float | None) -> int:
+    return int((Decimal(str(price or 0)) * 100).to_integral_value())
+
+
+def _epoch(value: datetime | None) -> float:
+    if value is None:
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _bitset(positions: Iterable[int], size: int) -> int:
+    buffer = bytearray((size + 7) // 8)
+    for pos in positions:
+        buffer[pos >> 3] |= 1 << (pos & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _with_bit(mask: int, pos: int, flag: bool) -> int:
+    return mask | (1 << pos) if flag else mask & ~(1 << pos)
+
+
+class ColumnarCatalog:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._pos: dict[int, int] = {}
+        self._ids = array("q")
+        self._category = array("q")
+        self._price = array("q")
+        self._updated = array("d")
+        self._active = 0
+        self._organic = 0
+        self._by_category: dict[int, int] = {}
+        self._in_stock: dict[int, int] = {}
+        self._in_stock_anywhere = 0
+        self._orders: dict[str, array] = {}
+        self._sorted_prices = array("q")
+        self._synced_through: datetime | None = None
+        self._generation: int | None = None
+        self._built_at: float | None = None
+
+    @property
+    def size(self) -> int:
+        return len(self._ids)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._reset()
+
+    # -- loading -----------------------------------------------------------------------
+
+    def build(self) -> None:
+        """Full load: every product plus the branches where each has stock."""
+        generation = catalog_cache.generation
+        products = db.session.execute(
+            select(
+                Product.id, Product.category_id, Product.price,
+                Product.is_organic, Product.is_active, Product.updated_at,
+            ).order_by(Product.id)
+        ).all()
+        stock = db.session.execute(
+            select(Inventory.product_id, Inventory.branch_id).where(Inventory.available_quantity > 0)
+        ).all()
+        latest = latest_changes(None)
+        synced_through = db.session.scalar(select(func.max(latest.c.changed_at)))
+
+        with self._lock:
+            self._reset()
+            for pid, category_id, price, _, _, updated_at in products:
+                self._pos[pid] = len(self._ids)
+                self._ids.append(pid)
+                self._category.append(category_id)
+                self._price.append(_cents(price))
+                self._updated.append(_epoch(updated_at))
+            size = len(self._ids)
+            self._active = _bitset((self._pos[row[0]] for row in products if row[4]), size)
+            self._organic = _bitset((self._pos[row[0]] for row in products if row[3]), size)
+            per_category: dict[int, list[int]] = {}
+            for row in products:
+                per_category.setdefault(row[1], []).append(self._pos[row[0]])
+            self._by_category = {cid: _bitset(positions, size) for cid, positions in per_category.items()}
+            per_branch: dict[int, list[int]] = {}
+            for pid, branch_id in stock:
+                if pid in self._pos:
+                    per_branch.setdefault(branch_id, []).append(self._pos[pid])
+            self._in_stock = {bid: _bitset(positions, size) for bid, positions in per_branch.items()}
+            self._in_stock_anywhere = 0
+            for mask in self._in_stock.values():
+                self._in_stock_anywhere |= mask
+            self._synced_through = synced_through
+            self._generation = generation
+            self._built_at = time.monotonic()
+
+    def sync(self) -> int:
+        """Apply products changed since the last sync; returns how many were re-read."""
+        generation = catalog_cache.generation
+        since = self._synced_through - SYNC_OVERLAP if self._synced_through else None
+        latest = latest_changes(since)
+        changed = db.session.execute(select(latest.c.product_id, latest.c.changed_at)).all()
+        if changed:
+            self._apply([row[0] for row in changed])
+        with self._lock:
+            newest = max((row[1] for row in changed), default=None)
+            if newest is not None and (self._synced_through is None or newest > self._synced_through):
+                self._synced_through = newest
+            self._generation = generation
+        return len(changed)
+
+    def _apply(self, product_ids: list[int]) -> None:
+        products = db.session.execute(
+            select(
+                Product.id, Product.category_id, Product.price,
+                Product.is_organic, Product.is_active, Product.updated_at,
+            ).where(Product.id.in_(product_ids))
+        ).all()
+        stocked: dict[int, set[int]] = {pid: set() for pid in product_ids}
+        for pid, branch_id in db.session.execute(
+            select(Inventory.product_id, Inventory.branch_id).where(
+                Inventory.product_id.in_(product_ids), Inventory.available_quantity > 0
+            )
+        ):
+            stocked[pid].add(branch_id)
+
+        with self._lock:
+            found = {row[0] for row in products}
+            for pid in product_ids:
+                if pid not in found and pid in self._pos:
+                    self._active = _with_bit(self._active, self._pos[pid], False)
+            for pid, category_id, price, is_organic, is_active, updated_at in products:
+                pos = self._pos.get(pid)
+                if pos is None:
+                    pos = self._pos[pid] = len(self._ids)
+                    self._ids.append(pid)
+                    self._category.append(category_id)
+                    self._price.append(0)
+                    self._updated.append(0.0)
+                previous_category = self._category[pos]
+                if previous_category != category_id and previous_category in self._by_category:
+                    self._by_category[previous_category] = _with_bit(self._by_category[previous_category], pos, False)
+                self._category[pos] = category_id
+                self._by_category[category_id] = _with_bit(self._by_category.get(category_id, 0), pos, True)
+                self._price[pos] = _cents(price)
+                self._updated[pos] = _epoch(updated_at)
+                self._active = _with_bit(self._active, pos, bool(is_active))
+                self._organic = _with_bit(self._organic, pos, bool(is_organic))
+                branches = stocked.get(pid, set())
+                for branch_id in set(self._in_stock) | branches:
+                    self._in_stock[branch_id] = _with_bit(self._in_stock.get(branch_id, 0), pos, branch_id in branches)
+                self._in_stock_anywhere = _with_bit(self._in_stock_anywhere, pos, bool(branches))
+            self._orders = {}
+
+    def _ensure_fresh(self) -> None:
+        rebuild_seconds = int(current_app.config.get("CATALOG_COLUMNAR_REBUILD_SECONDS", 600))
+        built_at = self._built_at
+        due = built_at is None or time.monotonic() - built_at > rebuild_seconds
+        if not due and self._generation == catalog_cache.generation:
+            return
+        # One request refreshes at a time. During a periodic rebuild the others keep
+        # serving the current arrays; incremental syncs are short, so callers wait for
+        # them and see writes committed before their request.
+        if not self._refresh_lock.acquire(blocking=built_at is None or not due):
+            return
+        try:
+            built_at = self._built_at
+            if built_at is None or time.monotonic() - built_at > rebuild_seconds:
+                self.build()
+            elif self._generation != catalog_cache.generation:
+                self.sync()
+        finally:
+            self._refresh_lock.release()
+
+    # -- querying ----------------------------------------------------------------------
+
+    def _order(self, key: str) -> array:
+        order = self._orders.get(key)
+        if order is None:
+            positions = range(len(self._ids))
+            if key == "price":
+                order = array("q", sorted(positions, key=lambda p: (self._price[p], self._ids[p])))
+                self._sorted_prices = array("q", (self._price[p] for p in order))
+            elif key == "updated_at":
+                order = array("q", sorted(positions, key=lambda p: (self._updated[p], self._ids[p])))
+            else:
+                order = array("q", sorted(positions, key=lambda p: self._ids[p]))
+            self._orders[key] = order
+        return order
+
+    @staticmethod
+    def supports(sort: str) -> bool:
+        """Whether ``search`` orders this sort exactly like the SQL path."""
+        column = SORTS[sort][0]
+        return any(column is candidate for candidate in _SORT_COLUMNS.values())
+
+    def search(
+        self,
+        category_id: int | None,
+        in_stock: bool | None,
+        branch_id: int | None,
+        min_price: float | None,
+        max_price: float | None,
+        organic_only: bool | None,
+        sort: str,
+        limit: int,
+        offset: int,
+    ) -> tuple[list[int], int]:
+        """Page of product ids plus the total match count, ordered like the SQL path.
+
+        Only for sorts ``supports`` accepts.
+        """
+        self._ensure_fresh()
+        column, descending = SORTS[sort]
+        sort_key = next(key for key, candidate in _SORT_COLUMNS.items() if candidate is column)
+        with self._lock:
+            size = len(self._ids)
+            mask = self._active
+            if category_id:
+                mask &= self._by_category.get(category_id, 0)
+            if organic_only:
+                mask &= self._organic
+            if in_stock is not None:
+                stocked = self._in_stock.get(branch_id, 0) if branch_id else self._in_stock_anywhere
+                mask = mask & stocked if in_stock else mask & ~stocked
+            if min_price is not None or max_price is not None:
+                by_price = self._order("price")
+                low = bisect_left(self._sorted_prices, math.ceil(Decimal(str(min_price)) * 100)) if min_price is not None else 0
+                high = (
+                    bisect_right(self._sorted_prices, math.floor(Decimal(str(max_price)) * 100))
+                    if max_price is not None
+                    else size
+                )
+                mask &= _bitset(by_price[low:high], size)
+            total = mask.bit_count()
+            if total <= offset:
+                return [], total
+            bits = mask.to_bytes((size + 7) // 8, "little")
+            order = self._order(sort_key)
+            walk = reversed(order) if descending else order
+            page: list[int] = []
+            skip = offset
+            for pos in walk:
+                if bits[pos >> 3] >> (pos & 7) & 1:
+                    if skip:
+                        skip -= 1
+                        continue
+                    page.append(self._ids[pos])
+                    if len(page) == limit:
+                        break
+            return page, total
+
+
+columnar_catalog = ColumnarCatalog()
+
+
+def columnar_enabled() -> bool:
+    return current_app.config.get("CATALOG_SEARCH_ENGINE", "sql") == "columnar"
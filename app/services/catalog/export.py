@@ -0,0 +1,82 @@
+"""Full active-catalog export as gzip-compressed NDJSON, streamed with flat memory."""
+
+from __future__ import annotations
+import json
+import zlib
+from decimal import Decimal
+from itertools import groupby
+from typing import Any, Iterator
+from sqlalchemy import select
+from app.extensions import db
+from app.models import Inventory, Product
+
+EXPORT_BATCH_ROWS = 1000
+# Compress in ~64 KiB slices; zlib emits output once its own window fills.
+_FLUSH_BYTES = 64 * 1024
+_PRODUCT_COLUMNS = (
+    Product.id, Product.sku, Product.name, Product.category_id, Product.price, Product.old_price,
+    Product.unit, Product.is_organic, Product.image_url, Product.description, Product.nutritional_info,
+    Product.updated_at,
+)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Unserializable export value: {type(value).__name__}")
+
+
+def iter_catalog_ndjson() -> Iterator[bytes]:
+    """One JSON line per active product with per-branch and total stock.
+
+    Products and their inventory rows are read as plain tuples in product order through a
+    server-side cursor (yield_per), then folded per product, so no more than one batch is
+    held in memory regardless of catalog size.
+    """
+    stmt = (
+        select(
+            *_PRODUCT_COLUMNS,
+            Inventory.branch_id,
+            Inventory.available_quantity,
+            Inventory.reserved_quantity,
+        )
+        .outerjoin(Inventory, Inventory.product_id == Product.id)
+        .where(Product.is_active.is_(True))
+        .order_by(Product.id, Inventory.branch_id)
+        .execution_options(yield_per=EXPORT_BATCH_ROWS)
+    )
+    width = len(_PRODUCT_COLUMNS)
+    names = [column.key for column in _PRODUCT_COLUMNS]
+    result = db.session.execute(stmt)
+    try:
+        for _, rows in groupby(result, key=lambda row: row[0]):
+            rows = list(rows)
+            record = dict(zip(names, rows[0][:width]))
+            stock = [
+                {"branch_id": branch_id, "available_quantity": available, "reserved_quantity": reserved}
+                for branch_id, available, reserved in (row[width:] for row in rows)
+                if branch_id is not None
+            ]
+            record["stock"] = stock
+            record["total_available"] = sum(entry["available_quantity"] for entry in stock)
+            yield (json.dumps(record, default=_json_default, separators=(",", ":")) + "\n").encode("utf-8")
+    finally:
+        result.close()
+
+
+def iter_gzip(chunks: Iterator[bytes]) -> Iterator[bytes]:
+    """Gzip a byte stream incrementally (single gzip member, suitable for Content-Encoding)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending: list[bytes] = []
+    size = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        size += len(chunk)
+        if size >= _FLUSH_BYTES:
+            out = compressor.compress(b"".join(pending))
+            pending, size = [], 0
+            if out:
+                yield out
+    yield compressor.compress(b"".join(pending)) + compressor.flush()
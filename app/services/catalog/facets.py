@@ -0,0 +1,67 @@
+"""Facet counts for catalog search, computed in one grouped query over the filtered base."""
+
+from __future__ import annotations
+from decimal import Decimal
+from sqlalchemy import Select, case, func, select
+from app.extensions import db
+from app.schemas.catalog import CategoryFacet, OrganicFacet, PriceBucketFacet, SearchFacets
+
+FACETS = ("category", "organic", "price")
+# Upper bounds of the fixed price buckets; the last bucket is open-ended.
+PRICE_BUCKET_EDGES = (Decimal("10"), Decimal("25"), Decimal("50"), Decimal("100"))
+
+
+def parse_facets(raw: str | None) -> tuple[str, ...]:
+    if not raw:
+        return ()
+    requested = {name.strip() for name in raw.split(",")}
+    return tuple(name for name in FACETS if name in requested)
+
+
+def compute_facets(base: Select, facets: tuple[str, ...]) -> SearchFacets:
+    """Group the filtered products by every requested dimension at once, then fold per facet.
+
+    The grouped result has at most categories x 2 x buckets rows, so folding in Python is
+    cheap and keeps the query portable (no GROUPING SETS on SQLite).
+    """
+    filtered = base.subquery()
+    dimensions = []
+    if "category" in facets:
+        dimensions.append(filtered.c.category_id.label("category_id"))
+    if "organic" in facets:
+        dimensions.append(filtered.c.is_organic.label("is_organic"))
+    if "price" in facets:
+        bucket = case(
+            *[(filtered.c.price < edge, index) for index, edge in enumerate(PRICE_BUCKET_EDGES)],
+            else_=len(PRICE_BUCKET_EDGES),
+        )
+        dimensions.append(bucket.label("price_bucket"))
+    if not dimensions:
+        return SearchFacets()
+    rows = db.session.execute(
+        select(*dimensions, func.count().label("count")).group_by(*dimensions)
+    ).mappings().all()
+
+    result = SearchFacets()
+    if "category" in facets:
+        per_category: dict[int, int] = {}
+        for row in rows:
+            per_category[row["category_id"]] = per_category.get(row["category_id"], 0) + row["count"]
+        result.category = [
+            CategoryFacet(category_id=category_id, count=count)
+            for category_id, count in sorted(per_category.items(), key=lambda item: (-item[1], item[0]))
+        ]
+    if "organic" in facets:
+        organic = sum(row["count"] for row in rows if row["is_organic"])
+        result.organic = OrganicFacet(organic=organic, non_organic=sum(row["count"] for row in rows) - organic)
+    if "price" in facets:
+        counts = [0] * (len(PRICE_BUCKET_EDGES) + 1)
+        for row in rows:
+            counts[row["price_bucket"]] += row["count"]
+        lower_bounds = (Decimal("0"),) + PRICE_BUCKET_EDGES
+        upper_bounds = PRICE_BUCKET_EDGES + (None,)
+        result.price = [
+            PriceBucketFacet(min=low, max=high, count=count)
+            for low, high, count in zip(lower_bounds, upper_bounds, counts)
+        ]
+    return result
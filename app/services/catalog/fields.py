@@ -0,0 +1,42 @@
+"""Sparse fieldsets (``fields=``) for catalog product payloads."""
+
+from __future__ import annotations
+from sqlalchemy.orm import load_only
+from app.middleware.error_handler import DomainError
+from app.models import Product
+from app.schemas.catalog import ProductResponse
+
+PRODUCT_FIELDS = frozenset(ProductResponse.model_fields)
+# Response keys backed directly by a products column; the rest come from stock_columns().
+PRODUCT_COLUMN_FIELDS = (
+    "id", "name", "sku", "price", "old_price", "unit", "nutritional_info", "is_organic",
+    "bin_location", "image_url", "description", "category_id", "is_active",
+)
+# Always loaded: id keys the payload, is_active is checked before exposing a product.
+_REQUIRED_COLUMNS = ("id", "is_active")
+
+
+def parse_fields(raw: str | None) -> frozenset[str] | None:
+    """Requested product keys (always including id); None means the full ProductResponse."""
+    if not raw:
+        return None
+    requested = {name.strip() for name in raw.split(",") if name.strip()}
+    unknown = sorted(requested - PRODUCT_FIELDS)
+    if unknown:
+        raise DomainError(
+            "BAD_REQUEST",
+            "Unknown product fields requested",
+            status_code=400,
+            details={"fields": ", ".join(unknown)},
+        )
+    return frozenset(requested | {"id"})
+
+
+def product_load_options(fields: frozenset[str] | None, *extra_columns) -> list:
+    """load_only() for the columns a sparse response needs; unrequested columns stay deferred."""
+    if fields is None:
+        return []
+    names = dict.fromkeys([*_REQUIRED_COLUMNS, *(name for name in PRODUCT_COLUMN_FIELDS if name in fields)])
+    columns = [getattr(Product, name) for name in names]
+    columns.extend(column for column in extra_columns if column.key not in names)
+    return [load_only(*columns)]
@@ -0,0 +1,102 @@
+"""Typo correction for product search via a SymSpell-style deletion dictionary."""
+
+from __future__ import annotations
+import time
+from collections import defaultdict
+
+# Deletes are generated from this many leading characters only (the SymSpell prefix
+# trick); it bounds the dictionary to a few dozen entries per token.
+PREFIX_LENGTH = 7
+MIN_TOKEN_LENGTH = 3
+
+
+def max_distance_for(token: str, max_distance: int) -> int:
+    """Short words tolerate fewer edits, otherwise almost anything matches."""
+    if len(token) < MIN_TOKEN_LENGTH:
+        return 0
+    return min(max_distance, 1 if len(token) <= 4 else 2)
+
+
+def _deletes(word: str, distance: int) -> set[str]:
+    variants = {word}
+    frontier = {word}
+    for _ in range(distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - variants
+        variants |= frontier
+    return variants
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 as soon as it must exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2: list[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+class FuzzyTokenIndex:
+    """Vocabulary of name tokens with their deletion variants, for nearest-token lookups."""
+
+    def __init__(self, max_distance: int = 2) -> None:
+        self.max_distance = max_distance
+        self._weights: dict[str, int] = {}
+        self._deletes: dict[str, list[str]] = defaultdict(list)
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._weights
+
+    def add(self, token: str, weight: int = 0) -> None:
+        if token in self._weights:
+            self._weights[token] += weight
+            return
+        self._weights[token] = weight
+        if len(token) < MIN_TOKEN_LENGTH:
+            return
+        for variant in _deletes(token[:PREFIX_LENGTH], self.max_distance):
+            self._deletes[variant].append(token)
+
+    def correct(self, token: str, deadline: float | None = None) -> str | None:
+        """Closest known token (then most popular), or None; gives up at ``deadline``."""
+        if token in self._weights:
+            return token
+        limit = max_distance_for(token, self.max_distance)
+        if not limit:
+            return None
+        best: tuple[int, int, str] | None = None
+        seen: set[str] = set()
+        for variant in _deletes(token[:PREFIX_LENGTH], limit):
+            for candidate in self._deletes.get(variant, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(token, candidate, limit)
+                if distance > limit:
+                    continue
+                rank = (distance, -self._weights[candidate], candidate)
+                if best is None or rank < best:
+                    best = rank
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+        return best[2] if best else None
+
+    def correct_tokens(self, tokens: list[str], budget_seconds: float) -> list[str] | None:
+        """Corrected token list when at least one token changed, else None."""
+        deadline = time.perf_counter() + budget_seconds
+        corrected = []
+        for token in tokens:
+            if time.perf_counter() > deadline:
+                corrected.append(token)
+                continue
+            corrected.append(self.correct(token, deadline) or token)
+        return corrected if corrected != tokens else None
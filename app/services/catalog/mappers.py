@@ -1,9 +1,11 @@
 from __future__ import annotations
-from typing import Sequence
-from sqlalchemy import select
+from typing import Any, NamedTuple, Sequence
+from sqlalchemy import Row, exists, func, literal, select
 from app.extensions import db
-from app.models import Category, Inventory, Product
+from app.models import Category, Inventory, Product, ProductStockSummary
 from app.schemas.catalog import CategoryResponse, ProductResponse
+from app.services.stock_summary_service import delivery_branch_id
+from .fields import PRODUCT_COLUMN_FIELDS
 
 
 def to_category_response(category: Category) -> CategoryResponse:
@@ -33,16 +35,88 @@ def matches_stock(product: Product, branch_id: int | None, desired: bool) -> boo
     return (quantity > 0) == desired
 
 
-def to_product_response(product: Product, branch_id: int | None) -> ProductResponse:
+class ProductStock(NamedTuple):
+    """Stock figures for one product, as projected by stock_columns()."""
+
+    total_available: int
+    in_stock_anywhere: bool
+    branch_available_quantity: int | None
+
+
+def stock_columns(branch_id: int | None) -> list[Any]:
+    """Stock columns to add to a select(Product), read from product_stock_summary by primary key."""
+    def summary(column):
+        return (
+            select(column)
+            .where(ProductStockSummary.product_id == Product.id)
+            .correlate(Product)
+            .scalar_subquery()
+        )
+
+    total = func.coalesce(summary(ProductStockSummary.total_available), 0)
+    anywhere = func.coalesce(summary(ProductStockSummary.branches_in_stock), 0) > 0
+    if branch_id and branch_id == delivery_branch_id():
+        branch = func.coalesce(summary(ProductStockSummary.delivery_available), 0)
+    elif branch_id:
+        branch = (
+            select(Inventory.available_quantity)
+            .where(Inventory.product_id == Product.id, Inventory.branch_id == branch_id)
+            .correlate(Product)
+            .scalar_subquery()
+        )
+    else:
+        branch = literal(None)
+    return [
+        total.label("total_available"),
+        anywhere.label("in_stock_anywhere"),
+        branch.label("branch_available_quantity"),
+    ]
+
+
+def in_stock_predicate(branch_id: int | None):
+    """Availability filter; the summary table answers "anywhere" and the delivery branch."""
+    if branch_id and branch_id != delivery_branch_id():
+        return exists().where(
+            Inventory.product_id == Product.id,
+            Inventory.branch_id == branch_id,
+            Inventory.available_quantity > 0,
+        )
+    column = ProductStockSummary.delivery_available if branch_id else ProductStockSummary.branches_in_stock
+    return exists().where(ProductStockSummary.product_id == Product.id, column > 0)
+
+
+def _stock_from_inventory(product: Product, branch_id: int | None) -> ProductStock:
     load_inventory(product)
+    branch_quantity = None
+    if branch_id:
+        row = next((i for i in product.inventory if i.branch_id == branch_id), None)
+        branch_quantity = row.available_quantity if row else 0
+    return ProductStock(
+        total_available=sum(i.available_quantity for i in product.inventory),
+        in_stock_anywhere=any(i.available_quantity > 0 for i in product.inventory),
+        branch_available_quantity=branch_quantity,
+    )
+
+
+def _stock_values(stock: ProductStock, branch_id: int | None) -> dict[str, Any]:
     branch_available: bool | None = None
     branch_available_quantity: int | None = None
-    row = None
     if branch_id:
-        row = next((i for i in product.inventory if i.branch_id == branch_id), None)
-        branch_available = bool(row and row.available_quantity > 0)
-        branch_available_quantity = row.available_quantity if row else 0
-    total_available = sum(i.available_quantity for i in product.inventory)
+        branch_available_quantity = stock.branch_available_quantity or 0
+        branch_available = branch_available_quantity > 0
+    return {
+        "in_stock_anywhere": stock.in_stock_anywhere,
+        "in_stock_for_branch": branch_available,
+        "available_quantity": stock.total_available,
+        "branch_available_quantity": branch_available_quantity,
+    }
+
+
+def to_product_response(
+    product: Product, branch_id: int | None, stock: ProductStock | None = None
+) -> ProductResponse:
+    if stock is None:
+        stock = _stock_from_inventory(product, branch_id)
     return ProductResponse(
         id=product.id,
         name=product.name,
@@ -57,12 +131,35 @@ def to_product_response(product: Product, branch_id: int | None) -> ProductRespo
         description=product.description,
         category_id=product.category_id,
         is_active=product.is_active,
-        in_stock_anywhere=any(i.available_quantity > 0 for i in product.inventory),
-        in_stock_for_branch=branch_available,
-        available_quantity=total_available,
-        branch_available_quantity=branch_available_quantity,
+        **_stock_values(stock, branch_id),
     )
 
 
+def to_product_fields(
+    product: Product, branch_id: int | None, stock: ProductStock, fields: frozenset[str]
+) -> dict[str, Any]:
+    """Sparse payload with only the requested keys; reads no attribute outside ``fields``."""
+    values = {name: getattr(product, name) for name in PRODUCT_COLUMN_FIELDS if name in fields}
+    values.update((name, value) for name, value in _stock_values(stock, branch_id).items() if name in fields)
+    return values
+
+
 def map_products(items: Sequence[Product], branch_id: int | None) -> list[ProductResponse]:
     return [to_product_response(item, branch_id) for item in items]
+
+
+def map_product_rows(
+    rows: Sequence[Row], branch_id: int | None, fields: frozenset[str] | None = None
+) -> list[ProductResponse] | list[dict[str, Any]]:
+    """Map (Product, total_available, in_stock_anywhere, branch_available_quantity) rows.
+
+    With ``fields`` the items are plain dicts restricted to those keys (see fields.parse_fields).
+    """
+    items = []
+    for product, total, anywhere, branch_quantity in rows:
+        stock = ProductStock(int(total or 0), bool(anywhere), branch_quantity)
+        if fields is None:
+            items.append(to_product_response(product, branch_id, stock))
+        else:
+            items.append(to_product_fields(product, branch_id, stock, fields))
+    return items
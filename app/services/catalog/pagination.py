@@ -0,0 +1,87 @@
+"""Sort resolution and keyset (cursor) pagination for catalog listings."""
+
+from __future__ import annotations
+import base64
+import binascii
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any
+from sqlalchemy import Select, tuple_
+from app.middleware.error_handler import DomainError
+from app.models import Product
+
+# sort key -> (column, descending). Short aliases are what the public query schema accepts.
+SORTS: dict[str, tuple[Any, bool]] = {
+    "price_asc": (Product.price, False),
+    "price_desc": (Product.price, True),
+    "name_asc": (Product.name, False),
+    "name_desc": (Product.name, True),
+    "updated_at_desc": (Product.updated_at, True),
+    "id_desc": (Product.id, True),
+}
+SORT_ALIASES = {"price": "price_asc", "name": "name_asc", "date": "updated_at_desc"}
+DEFAULT_SORT = "id_desc"
+
+
+def resolve_sort(sort: str | None) -> str | None:
+    """Normalise a requested sort to a key of SORTS; None when no explicit sort was given."""
+    if not sort:
+        return None
+    sort = SORT_ALIASES.get(sort, sort)
+    return sort if sort in SORTS else None
+
+
+def apply_order(stmt: Select, sort: str) -> Select:
+    column, descending = SORTS[sort]
+    if column is Product.id:
+        return stmt.order_by(Product.id.desc() if descending else Product.id.asc())
+    if descending:
+        return stmt.order_by(column.desc(), Product.id.desc())
+    return stmt.order_by(column.asc(), Product.id.asc())
+
+
+def apply_keyset(stmt: Select, sort: str, cursor: str | None) -> Select:
+    """Order by the sort key with id as tie-breaker and seek past the cursor position."""
+    stmt = apply_order(stmt, sort)
+    if not cursor:
+        return stmt
+    value, last_id = decode_cursor(cursor, sort)
+    column, descending = SORTS[sort]
+    if column is Product.id:
+        return stmt.where(Product.id < last_id if descending else Product.id > last_id)
+    position = tuple_(column, Product.id)
+    return stmt.where(position < (value, last_id) if descending else position > (value, last_id))
+
+
+def encode_cursor(sort: str, product: Product) -> str:
+    column, _ = SORTS[sort]
+    value = getattr(product, column.key)
+    if isinstance(value, Decimal):
+        value = str(value)
+    elif isinstance(value, datetime):
+        value = value.isoformat()
+    raw = json.dumps({"s": sort, "v": value, "id": product.id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        last_id = int(payload["id"])
+        value = payload["v"]
+        cursor_sort = payload["s"]
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError) as exc:
+        raise DomainError("INVALID_CURSOR", "Cursor is malformed", status_code=400) from exc
+    if cursor_sort != sort:
+        raise DomainError("INVALID_CURSOR", "Cursor does not match the requested sort", status_code=400)
+    column, _ = SORTS[sort]
+    try:
+        if column is Product.price:
+            value = Decimal(value)
+        elif column is Product.updated_at:
+            value = datetime.fromisoformat(value)
+    except (ValueError, TypeError, ArithmeticError) as exc:
+        raise DomainError("INVALID_CURSOR", "Cursor is malformed", status_code=400) from exc
+    return value, last_id
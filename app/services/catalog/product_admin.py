@@ -8,6 +8,7 @@ from app.middleware.error_handler import DomainError
 from app.models import Category, Product
 from app.schemas.catalog import ProductResponse
 from app.services.audit_service import AuditService
+from .autocomplete import autocomplete_index
 from .mappers import to_product_response
 
 
@@ -51,6 +52,7 @@ def create_product(
     AuditService.log_event(
         entity_type="product", action="CREATE", entity_id=product.id
     )
+    autocomplete_index.upsert(product.id, product.name, product.is_active)
     return to_product_response(product, None)
 
 
@@ -102,6 +104,7 @@ def update_product(
             "description": product.description,
         },
     )
+    autocomplete_index.upsert(product.id, product.name, product.is_active)
     return to_product_response(product, None)
 
 
@@ -121,4 +124,5 @@ def toggle_product(product_id: int, active: bool) -> ProductResponse:
         entity_id=product.id,
         new_value={"is_active": active},
     )
+    autocomplete_index.upsert(product.id, product.name, product.is_active)
     return to_product_response(product, None)
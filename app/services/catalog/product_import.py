@@ -0,0 +1,203 @@
+"""Bulk product import from CSV or NDJSON, streamed and upserted by SKU in chunks."""
+
+from __future__ import annotations
+import csv
+import io
+import json
+from itertools import islice
+from typing import IO, Any, Iterator
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+from app.extensions import db
+from app.middleware.error_handler import DomainError
+from app.models import Category, Product
+from app.schemas.catalog import ProductImportRow
+from app.services.audit_service import AuditService
+from app.services.catalog_cache import mark_catalog_changed
+from app.services.shared_queries import SharedOperations
+from .autocomplete import autocomplete_index
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_CHUNK_ROWS = 1000
+# Row-level error details returned to the caller; counts stay exact beyond this.
+MAX_ERROR_DETAILS = 100
+_REQUIRED_COLUMNS = ("name", "price", "category_id")
+# Written only when a row supplies them, so a sparse feed leaves existing values alone.
+_OPTIONAL_COLUMNS = ("description", "unit", "is_organic")
+
+
+def detect_format(requested: str | None, filename: str | None) -> str:
+    fmt = (requested or "").lower()
+    if not fmt and filename:
+        extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        fmt = {"csv": "csv", "ndjson": "ndjson", "jsonl": "ndjson"}.get(extension, "")
+    if fmt not in IMPORT_FORMATS:
+        raise DomainError(
+            "UNSUPPORTED_FORMAT",
+            "Import files must be CSV or NDJSON.",
+            status_code=400,
+            details={"formats": list(IMPORT_FORMATS)},
+        )
+    return fmt
+
+
+def _iter_records(stream: IO[bytes], fmt: str) -> Iterator[tuple[int, Any]]:
+    """(row_number, raw record) pairs, decoded lazily from the upload stream."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for row_number, row in enumerate(csv.DictReader(text), 1):
+            # Empty cells mean "not given", so optional fields fall back to their defaults.
+            yield row_number, {key: value for key, value in row.items() if key and value not in ("", None)}
+        return
+    row_number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as exc:
+            yield row_number, exc
+
+
+def _describe(exc: ValidationError) -> str:
+    first = exc.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+class _ImportSummary:
+    def __init__(self) -> None:
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.chunks = 0
+        self.errors: list[dict[str, Any]] = []
+
+    def fail(self, row_number: int, sku: Any, error: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_ERROR_DETAILS:
+            self.errors.append({"row_number": row_number, "sku": sku, "error": error})
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "chunks": self.chunks,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def import_products(stream: IO[bytes], fmt: str, actor_user_id: int | None) -> dict[str, Any]:
+    """Validate and upsert products chunk by chunk; each chunk commits on its own."""
+    summary = _ImportSummary()
+    records = _iter_records(stream, fmt)
+    while chunk := list(islice(records, IMPORT_CHUNK_ROWS)):
+        summary.chunks += 1
+        summary.rows += len(chunk)
+        _import_chunk(chunk, summary, actor_user_id)
+    return summary.as_dict()
+
+
+def _validate(chunk: list[tuple[int, Any]], summary: _ImportSummary) -> dict[str, tuple[int, ProductImportRow]]:
+    valid: dict[str, tuple[int, ProductImportRow]] = {}
+    for row_number, record in chunk:
+        if isinstance(record, Exception):
+            summary.fail(row_number, None, f"Invalid JSON: {record}")
+            continue
+        if not isinstance(record, dict):
+            summary.fail(row_number, None, "Each record must be an object")
+            continue
+        try:
+            row = ProductImportRow.model_validate(record)
+        except ValidationError as exc:
+            summary.fail(row_number, record.get("sku"), _describe(exc))
+            continue
+        # A SKU repeated within a chunk keeps its last row; ON CONFLICT cannot touch a row twice.
+        valid.pop(row.sku, None)
+        valid[row.sku] = (row_number, row)
+    return valid
+
+
+def _resolve_categories(rows: list[ProductImportRow]) -> tuple[dict[str, int], set[int]]:
+    """Category ids by lower-cased name, and which referenced ids exist, in two queries."""
+    names = {row.category.strip().lower() for row in rows if row.category_id is None}
+    ids = {row.category_id for row in rows if row.category_id is not None}
+    by_name: dict[str, int] = {}
+    if names:
+        for category_id, name in db.session.execute(
+            select(Category.id, func.lower(Category.name))
+            .where(func.lower(Category.name).in_(names))
+            .order_by(Category.id)
+        ):
+            by_name.setdefault(name, category_id)
+    known_ids = set(db.session.scalars(select(Category.id).where(Category.id.in_(ids))).all()) if ids else set()
+    return by_name, known_ids
+
+
+def _upsert(values: list[dict[str, Any]]) -> None:
+    """One upsert per set of supplied columns (at most eight), each updating only those."""
+    groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+    for value in values:
+        groups.setdefault(tuple(name for name in _OPTIONAL_COLUMNS if name in value), []).append(value)
+    for optional, rows in groups.items():
+        stmt = SharedOperations.dialect_insert(Product.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["sku"],
+            set_={
+                **{name: getattr(stmt.excluded, name) for name in _REQUIRED_COLUMNS + optional},
+                "updated_at": func.now(),
+            },
+        )
+        db.session.connection().execute(stmt, rows)
+
+
+def _import_chunk(chunk: list[tuple[int, Any]], summary: _ImportSummary, actor_user_id: int | None) -> None:
+    first_row, last_row = chunk[0][0], chunk[-1][0]
+    failed_before = summary.failed
+    valid = _validate(chunk, summary)
+    by_name, known_ids = _resolve_categories([row for _, row in valid.values()])
+
+    values = []
+    for sku, (row_number, row) in valid.items():
+        category_id = row.category_id if row.category_id is not None else by_name.get(row.category.strip().lower())
+        if category_id is None or (row.category_id is not None and category_id not in known_ids):
+            summary.fail(row_number, sku, "Category not found")
+            continue
+        value = {"sku": sku, "name": row.name, "price": row.price, "category_id": category_id}
+        value.update({name: getattr(row, name) for name in _OPTIONAL_COLUMNS if name in row.model_fields_set})
+        values.append(value)
+
+    session = db.session
+    skus = [value["sku"] for value in values]
+    try:
+        existing = set(session.scalars(select(Product.sku).where(Product.sku.in_(skus))).all()) if skus else set()
+        if values:
+            _upsert(values)
+            mark_catalog_changed(session)
+        created, updated = len(values) - len(existing), len(existing)
+        AuditService.log_event(
+            entity_type="product",
+            action="BULK_IMPORT",
+            actor_user_id=actor_user_id,
+            new_value={"created": created, "updated": updated, "failed": summary.failed - failed_before},
+            context={"chunk": summary.chunks, "first_row": first_row, "last_row": last_row},
+        )
+        session.commit()
+    except SQLAlchemyError as exc:
+        session.rollback()
+        for value in values:
+            summary.fail(valid[value["sku"]][0], value["sku"], f"Chunk {summary.chunks} not saved: {exc.__class__.__name__}")
+        return
+    summary.created += created
+    summary.updated += updated
+    if skus:
+        for product_id, name, is_active in session.execute(
+            select(Product.id, Product.name, Product.is_active).where(Product.sku.in_(skus))
+        ):
+            autocomplete_index.upsert(product_id, name, is_active)
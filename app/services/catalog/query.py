@@ -1,54 +1,138 @@
 from __future__ import annotations
-from sqlalchemy import select, func, exists
-from sqlalchemy.orm import selectinload
+from sqlalchemy import Select, case, select, func
+from sqlalchemy.sql.elements import ColumnElement
 from app.extensions import db
 from app.middleware.error_handler import DomainError
-from app.models import Category, Inventory, Product
-from app.schemas.catalog import AutocompleteItem, AutocompleteResponse, CategoryResponse, ProductResponse
-from .mappers import map_products, to_category_response, to_product_response
+from app.models import Category, Product, ProductStockSummary, RelatedProduct
+from app.services.catalog_cache import cached_query
+from app.schemas.catalog import AutocompleteItem, AutocompleteResponse, CategorySummaryResponse, ProductResponse, SearchFacets
+from .mappers import in_stock_predicate, map_product_rows, stock_columns, to_category_response
+from .autocomplete import autocomplete_index
+from .changes import changes_since
+from .columnar import columnar_catalog, columnar_enabled
+from .facets import compute_facets
+from .fields import product_load_options
+from .pagination import DEFAULT_SORT, SORTS, apply_keyset, apply_order, encode_cursor, resolve_sort
+from .search import apply_search
 
 
 class CatalogQueryService:
     @staticmethod
-    def list_categories(limit: int, offset: int) -> tuple[list[CategoryResponse], int]:
+    @cached_query
+    def list_categories(limit: int, offset: int) -> tuple[list[CategorySummaryResponse], int]:
         stmt = select(Category).where(Category.is_active.is_(True)).offset(offset).limit(limit)
         categories = db.session.execute(stmt).scalars().all()
         total = db.session.scalar(select(func.count()).select_from(Category).where(Category.is_active.is_(True)))
-        return ([to_category_response(c) for c in categories], total or 0)
+        counts = CatalogQueryService._category_counts([c.id for c in categories])
+        items = [
+            CategorySummaryResponse(
+                **to_category_response(c).model_dump(),
+                product_count=counts.get(c.id, (0, 0))[0],
+                in_stock_count=counts.get(c.id, (0, 0))[1],
+            )
+            for c in categories
+        ]
+        return items, total or 0
+
+    @staticmethod
+    def _category_counts(category_ids: list[int]) -> dict[int, tuple[int, int]]:
+        """Active and in-stock product counts per category, in one grouped query."""
+        if not category_ids:
+            return {}
+        in_stock = func.coalesce(ProductStockSummary.branches_in_stock, 0) > 0
+        rows = db.session.execute(
+            select(
+                Product.category_id,
+                func.count(Product.id),
+                func.coalesce(func.sum(case((in_stock, 1), else_=0)), 0),
+            )
+            .outerjoin(ProductStockSummary, ProductStockSummary.product_id == Product.id)
+            .where(Product.category_id.in_(category_ids), Product.is_active.is_(True))
+            .group_by(Product.category_id)
+        ).all()
+        return {category_id: (products, stocked) for category_id, products, stocked in rows}
 
     @staticmethod
+    @cached_query
     def get_category_products(
         category_id: int,
         branch_id: int | None,
         limit: int,
         offset: int,
+        fields: frozenset[str] | None = None,
     ) -> tuple[list[ProductResponse], int]:
+        base = CatalogQueryService._category_base(category_id)
         stmt = (
-            select(Product)
-            .where(Product.category_id == category_id)
-            .where(Product.is_active.is_(True))
-            .options(selectinload(Product.inventory).selectinload(Inventory.branch))
+            base.add_columns(*stock_columns(branch_id))
+            .options(*product_load_options(fields))
             .offset(offset)
             .limit(limit)
         )
-        products = db.session.execute(stmt).scalars().all()
-        total = db.session.scalar(
-            select(func.count())
-            .select_from(Product)
+        rows = db.session.execute(stmt).all()
+        total = db.session.scalar(select(func.count()).select_from(base.subquery()))
+        return map_product_rows(rows, branch_id, fields), total or 0
+
+    @staticmethod
+    @cached_query
+    def get_category_products_after(
+        category_id: int,
+        branch_id: int | None,
+        limit: int,
+        cursor: str | None,
+        include_total: bool = False,
+        fields: frozenset[str] | None = None,
+    ) -> tuple[list[ProductResponse], int | None, str | None]:
+        """Keyset-paginated variant; the count query only runs when include_total is set."""
+        base = CatalogQueryService._category_base(category_id)
+        return CatalogQueryService._keyset_page(
+            base, DEFAULT_SORT, branch_id, limit, cursor, include_total, fields
+        )
+
+    @staticmethod
+    def _category_base(category_id: int) -> Select:
+        return (
+            select(Product)
             .where(Product.category_id == category_id)
             .where(Product.is_active.is_(True))
         )
-        return map_products(products, branch_id), total or 0
 
     @staticmethod
-    def get_product(product_id: int, branch_id: int | None) -> ProductResponse:
-        stmt = select(Product).where(Product.id == product_id).options(selectinload(Product.inventory).selectinload(Inventory.branch))
-        product = db.session.execute(stmt).scalar_one_or_none()
-        if not product or not product.is_active:
+    @cached_query
+    def get_product(
+        product_id: int, branch_id: int | None, fields: frozenset[str] | None = None
+    ) -> ProductResponse:
+        stmt = (
+            select(Product, *stock_columns(branch_id))
+            .where(Product.id == product_id)
+            .options(*product_load_options(fields))
+        )
+        row = db.session.execute(stmt).one_or_none()
+        if not row or not row[0].is_active:
             raise DomainError("NOT_FOUND", "Product not found", status_code=404)
-        return to_product_response(product, branch_id)
+        return map_product_rows([row], branch_id, fields)[0]
 
     @staticmethod
+    @cached_query
+    def get_products(
+        product_ids: tuple[int, ...], branch_id: int | None, fields: frozenset[str] | None = None
+    ) -> tuple[list[ProductResponse], list[int]]:
+        """Resolve many products in one query, in request order.
+
+        Returns the products and the requested ids that are unknown or inactive.
+        """
+        stmt = (
+            select(Product, *stock_columns(branch_id))
+            .where(Product.id.in_(set(product_ids)))
+            .where(Product.is_active.is_(True))
+            .options(*product_load_options(fields))
+        )
+        rows = db.session.execute(stmt).all()
+        found = dict(zip((row[0].id for row in rows), map_product_rows(rows, branch_id, fields)))
+        requested = list(dict.fromkeys(product_ids))
+        return [found[pid] for pid in requested if pid in found], [pid for pid in requested if pid not in found]
+
+    @staticmethod
+    @cached_query
     def search_products(
         query: str | None,
         category_id: int | None,
@@ -60,10 +144,125 @@ class CatalogQueryService:
         max_price: float | None = None,
         organic_only: bool | None = None,
         sort: str | None = None,
+        fields: frozenset[str] | None = None,
     ) -> tuple[list[ProductResponse], int]:
+        sort_key = resolve_sort(sort)
+        if not query and columnar_enabled() and columnar_catalog.supports(sort_key or DEFAULT_SORT):
+            # Attribute-only search: filter and order in memory, hydrate just the page.
+            ids, total = columnar_catalog.search(
+                category_id, in_stock, branch_id, min_price, max_price, organic_only,
+                sort_key or DEFAULT_SORT, limit, offset,
+            )
+            items, _ = CatalogQueryService.get_products(tuple(ids), branch_id, fields)
+            return items, total
+        base, relevance = CatalogQueryService._search_base(
+            query, category_id, in_stock, branch_id, min_price, max_price, organic_only
+        )
+        if sort_key:
+            ordered = apply_order(base, sort_key)
+        elif relevance is not None:
+            ordered = base.order_by(relevance.desc(), Product.id.desc())
+        else:
+            ordered = apply_order(base, DEFAULT_SORT)
+        stmt = (
+            ordered.add_columns(*stock_columns(branch_id))
+            .options(*product_load_options(fields))
+            .offset(offset)
+            .limit(limit)
+        )
+        rows = db.session.execute(stmt).all()
+        count_stmt = select(func.count()).select_from(base.subquery())
+        total = db.session.scalar(count_stmt)
+        if not total and query and not offset:
+            # Zero hits usually means a typo; retry once with the nearest indexed tokens.
+            corrected = CatalogQueryService.corrected_query(
+                query, category_id, in_stock, branch_id, min_price, max_price, organic_only
+            )
+            if corrected:
+                return CatalogQueryService.search_products(
+                    corrected, category_id, in_stock, branch_id, limit, offset,
+                    min_price, max_price, organic_only, sort, fields,
+                )
+        return map_product_rows(rows, branch_id, fields), total or 0
+
+    @staticmethod
+    @cached_query
+    def corrected_query(
+        query: str | None,
+        category_id: int | None,
+        in_stock: bool | None,
+        branch_id: int | None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        organic_only: bool | None = None,
+    ) -> str | None:
+        """The spelling-corrected query search_products runs instead when query matches nothing."""
+        if not query:
+            return None
+        base, _ = CatalogQueryService._search_base(
+            query, category_id, in_stock, branch_id, min_price, max_price, organic_only
+        )
+        if db.session.scalar(select(base.exists())):
+            return None
+        return autocomplete_index.correct_query(query)
+
+    @staticmethod
+    @cached_query
+    def search_products_after(
+        query: str | None,
+        category_id: int | None,
+        in_stock: bool | None,
+        branch_id: int | None,
+        limit: int,
+        cursor: str | None,
+        min_price: float | None = None,
+        max_price: float | None = None,
+        organic_only: bool | None = None,
+        sort: str | None = None,
+        include_total: bool = False,
+        fields: frozenset[str] | None = None,
+    ) -> tuple[list[ProductResponse], int | None, str | None]:
+        """Keyset-paginated search. Relevance ordering is not seekable, so the default is newest id first."""
+        base, _ = CatalogQueryService._search_base(
+            query, category_id, in_stock, branch_id, min_price, max_price, organic_only
+        )
+        sort_key = resolve_sort(sort) or DEFAULT_SORT
+        return CatalogQueryService._keyset_page(
+            base, sort_key, branch_id, limit, cursor, include_total, fields
+        )
+
+    @staticmethod
+    @cached_query
+    def search_facets(
+        query: str | None,
+        category_id: int | None,
+        in_stock: bool | None,
+        branch_id: int | None,
+        facets: tuple[str, ...],
+        min_price: float | None = None,
+        max_price: float | None = None,
+        organic_only: bool | None = None,
+    ) -> SearchFacets:
+        """Facet counts over exactly the rows search_products filters to, in one grouped query."""
+        base, _ = CatalogQueryService._search_base(
+            query, category_id, in_stock, branch_id, min_price, max_price, organic_only
+        )
+        return compute_facets(base, facets)
+
+    @staticmethod
+    def _search_base(
+        query: str | None,
+        category_id: int | None,
+        in_stock: bool | None,
+        branch_id: int | None,
+        min_price: float | None,
+        max_price: float | None,
+        organic_only: bool | None,
+    ) -> tuple[Select, ColumnElement | None]:
         base = select(Product).where(Product.is_active.is_(True))
+        relevance = None
         if query:
-            base = base.where(Product.name.ilike(f"%{query}%"))
+            base, relevance = apply_search(base, query)
         if category_id:
             base = base.where(Product.category_id == category_id)
         if min_price is not None:
@@ -73,51 +272,75 @@ class CatalogQueryService:
         if organic_only:
             base = base.where(Product.is_organic.is_(True))
         if in_stock is not None:
-            stock_match = (
-                select(Inventory.id)
-                .where(Inventory.product_id == Product.id)
-                .where(Inventory.available_quantity > 0)
-            )
-            if branch_id:
-                stock_match = stock_match.where(Inventory.branch_id == branch_id)
-            predicate = exists(stock_match)
-            base = base.where(predicate if in_stock else ~predicate)
-        # Sorting
-        if sort == "price_asc":
-            base = base.order_by(Product.price.asc())
-        elif sort == "price_desc":
-            base = base.order_by(Product.price.desc())
-        elif sort == "updated_at_desc":
-            base = base.order_by(Product.updated_at.desc())
-        elif sort == "name_asc":
-            base = base.order_by(Product.name.asc())
-        elif sort == "name_desc":
-            base = base.order_by(Product.name.desc())
-        else:
-            base = base.order_by(Product.id.desc())
-        stmt = base.options(selectinload(Product.inventory).selectinload(Inventory.branch)).offset(offset).limit(limit)
-        products = db.session.execute(stmt).scalars().all()
-        count_stmt = select(func.count()).select_from(base.subquery())
-        total = db.session.scalar(count_stmt)
-        return map_products(products, branch_id), total or 0
+            base = base.where(in_stock_predicate(branch_id) if in_stock else ~in_stock_predicate(branch_id))
+        return base, relevance
+
+    @staticmethod
+    def _keyset_page(
+        base: Select,
+        sort: str,
+        branch_id: int | None,
+        limit: int,
+        cursor: str | None,
+        include_total: bool,
+        fields: frozenset[str] | None = None,
+    ) -> tuple[list[ProductResponse], int | None, str | None]:
+        # Fetch one extra row to learn whether another page exists without counting.
+        stmt = (
+            apply_keyset(base, sort, cursor)
+            .add_columns(*stock_columns(branch_id))
+            .options(*product_load_options(fields, SORTS[sort][0]))
+            .limit(limit + 1)
+        )
+        rows = db.session.execute(stmt).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, rows[-1][0])
+        total = None
+        if include_total:
+            total = db.session.scalar(select(func.count()).select_from(base.subquery())) or 0
+        return map_product_rows(rows, branch_id, fields), total, next_cursor
 
     @staticmethod
-    def featured_products(limit: int, branch_id: int | None) -> list[ProductResponse]:
+    @cached_query
+    def featured_products(
+        limit: int, branch_id: int | None, fields: frozenset[str] | None = None
+    ) -> list[ProductResponse]:
         stmt = (
             select(Product)
             .where(Product.is_active.is_(True))
             .order_by(Product.updated_at.desc(), Product.id.desc())
             .limit(limit)
-            .options(selectinload(Product.inventory).selectinload(Inventory.branch))
+            .add_columns(*stock_columns(branch_id))
+            .options(*product_load_options(fields))
         )
-        products = db.session.execute(stmt).scalars().all()
-        return map_products(products, branch_id)
+        rows = db.session.execute(stmt).all()
+        return map_product_rows(rows, branch_id, fields)
+
+    @staticmethod
+    @cached_query
+    def related_products(
+        product_id: int, branch_id: int | None, limit: int, fields: frozenset[str] | None = None
+    ) -> list[ProductResponse]:
+        """Precomputed frequently-bought-together neighbours, strongest first."""
+        related_ids = db.session.scalars(
+            select(RelatedProduct.related_product_id)
+            .where(RelatedProduct.product_id == product_id)
+            .order_by(RelatedProduct.rank)
+            .limit(limit)
+        ).all()
+        items, _ = CatalogQueryService.get_products(tuple(related_ids), branch_id, fields)
+        return items
+
+    @staticmethod
+    def changes(
+        watermark: str | None, branch_id: int | None, limit: int
+    ) -> tuple[list[ProductResponse], str | None, bool]:
+        return changes_since(watermark, branch_id, limit)
 
     @staticmethod
     def autocomplete(query: str | None, limit: int) -> AutocompleteResponse:
-        stmt = select(Product).where(Product.is_active.is_(True))
-        if query:
-            stmt = stmt.where(Product.name.ilike(f"%{query}%"))
-        products = db.session.execute(stmt.limit(limit)).scalars().all()
-        items = [AutocompleteItem(id=p.id, name=p.name) for p in products]
+        matches = autocomplete_index.search(query or "", limit)
+        items = [AutocompleteItem(id=pid, name=name) for pid, name in matches]
         return AutocompleteResponse(total=len(items), limit=limit, offset=0, items=items)
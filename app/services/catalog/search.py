@@ -0,0 +1,54 @@
+"""Product search backends (PostgreSQL tsvector + pg_trgm, SQLite FTS5)."""
+
+from __future__ import annotations
+import re
+from sqlalchemy import Select, column, func, literal_column, or_, select, table
+from sqlalchemy.sql.elements import ColumnElement
+from app.extensions import db
+from app.models import Product
+from app.models.product import PRODUCT_FTS_TABLE, PRODUCT_SEARCH_DOCUMENT
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# FTS5 trigram tokenizer cannot match terms shorter than three characters.
+_TRIGRAM_MIN_LENGTH = 3
+
+
+def tokenize(query: str) -> list[str]:
+    return [token.lower() for token in _TOKEN_RE.findall(query)]
+
+
+def apply_search(stmt: Select, query: str) -> tuple[Select, ColumnElement | None]:
+    """Restrict stmt to products matching query; return it with a relevance column (higher is better)."""
+    tokens = tokenize(query)
+    if not tokens:
+        return stmt.where(Product.name.ilike(f"%{query}%")), None
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "postgresql":
+        return _apply_postgres(stmt, query, tokens)
+    if dialect == "sqlite" and all(len(t) >= _TRIGRAM_MIN_LENGTH for t in tokens):
+        return _apply_sqlite(stmt, tokens)
+    return stmt.where(Product.name.ilike(f"%{query}%")), None
+
+
+def _apply_postgres(stmt: Select, query: str, tokens: list[str]) -> tuple[Select, ColumnElement]:
+    # Prefix-match every token so keystroke-driven searches hit partial words.
+    ts_query = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{t}:*" for t in tokens))
+    document = literal_column(PRODUCT_SEARCH_DOCUMENT)
+    # The ILIKE branch is served by the gin_trgm_ops index on products.name.
+    stmt = stmt.where(or_(document.op("@@")(ts_query), Product.name.ilike(f"%{query}%")))
+    relevance = func.ts_rank(document, ts_query) + func.similarity(Product.name, query)
+    return stmt, relevance
+
+
+def _apply_sqlite(stmt: Select, tokens: list[str]) -> tuple[Select, ColumnElement]:
+    fts = table(PRODUCT_FTS_TABLE, column("rowid"))
+    fts_ref = literal_column(PRODUCT_FTS_TABLE)
+    match_expr = " ".join('"{}"'.format(t.replace('"', '""')) for t in tokens)
+    matches = (
+        select(fts.c.rowid.label("product_id"), (-func.bm25(fts_ref)).label("relevance"))
+        .select_from(fts)
+        .where(fts_ref.op("MATCH")(match_expr))
+        .subquery("product_search")
+    )
+    stmt = stmt.join(matches, matches.c.product_id == Product.id)
+    return stmt, matches.c.relevance
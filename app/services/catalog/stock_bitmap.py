@@ -0,0 +1,268 @@
+"""Per-branch in-stock bitmaps indexed by product id, for O(1) availability checks.
+
+Each branch has a ``bytearray`` where bit ``product_id`` is set while that branch has
+available stock, plus one "anywhere" bitmap. Cart validators answer "in stock" from a set
+bit without querying inventory; a clear bit may be stale, so ``has_stock`` confirms it
+with one indexed read before a cart line is rejected. Anything that must be exact
+(quantities, row locks at checkout) reads the database. The catalog ``in_stock`` filter
+stays in SQL: it is one predicate of a paginated, counted query.
+
+Membership tests never touch the database once the bitmaps are built:
+
+* Inventory writes committed by this worker set their bits right after commit, from the
+  flush hook and from Core counter updates (``queue_stock_change``).
+* A background thread per worker resyncs from the catalog change feed when the catalog
+  cache generation moves (writes from other workers), or on every poll with the ``none``
+  invalidation backend, which never reports other workers' writes. It rebuilds fully
+  every STOCK_BITMAP_REBUILD_SECONDS.
+
+Until the first build, or with STOCK_BITMAP_REBUILD_SECONDS=0, ``in_stock`` answers from
+one indexed lookup instead. Hard-deleted inventory rows never reach the change feed, so
+their bits linger until the next rebuild; callers treat a set bit as "worth a database
+read", never as a quantity.
+"""
+
+from __future__ import annotations
+import os
+import threading
+import time
+from datetime import datetime
+from itertools import chain
+from typing import Iterable
+from flask import Flask, current_app
+from sqlalchemy import event, exists, func, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.extensions import db
+from app.models import Inventory
+from app.services.catalog_cache import catalog_cache
+from .changes import SYNC_OVERLAP, latest_changes
+
+# How often the background thread checks for other workers' writes.
+REFRESH_POLL_SECONDS = 1.0
+_PENDING_KEY = "stock_bitmap_pending"
+
+StockChange = tuple[int, int, bool]
+
+
+def _set_bit(bits: bytearray, product_id: int, flag: bool) -> None:
+    index = product_id >> 3
+    if index >= len(bits):
+        if not flag:
+            return
+        bits.extend(bytes(index + 1 - len(bits)))
+    if flag:
+        bits[index] |= 1 << (product_id & 7)
+    else:
+        bits[index] &= ~(1 << (product_id & 7)) & 0xFF
+
+
+def _test_bit(bits: bytearray | None, product_id: int) -> bool:
+    if bits is None:
+        return False
+    index = product_id >> 3
+    return index < len(bits) and bool(bits[index] >> (product_id & 7) & 1)
+
+
+def _rebuild_seconds(app: Flask) -> int:
+    return int(app.config.get("STOCK_BITMAP_REBUILD_SECONDS", 600))
+
+
+class StockBitmap:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._refresher_pid: int | None = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._branches: dict[int, bytearray] = {}
+        self._anywhere = bytearray()
+        self._synced_through: datetime | None = None
+        self._generation: int | None = None
+        self._built_at: float | None = None
+        # Local changes committed while a build is reading; replayed onto its result.
+        self._building: list[StockChange] | None = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._reset()
+
+    @property
+    def ready(self) -> bool:
+        """Built; until then ``in_stock`` reads the database."""
+        return self._built_at is not None
+
+    def build(self) -> None:
+        """Full load of every (product, branch) pair with available stock."""
+        with self._lock:
+            self._building = []
+        try:
+            generation = catalog_cache.generation
+            rows = db.session.execute(
+                select(Inventory.product_id, Inventory.branch_id).where(Inventory.available_quantity > 0)
+            ).all()
+            synced_through = db.session.scalar(select(func.max(latest_changes(None).c.changed_at)))
+        except BaseException:
+            with self._lock:
+                self._building = None
+            raise
+        with self._lock:
+            replay = self._building or []
+            self._reset()
+            for product_id, branch_id in rows:
+                _set_bit(self._branches.setdefault(branch_id, bytearray()), product_id, True)
+                _set_bit(self._anywhere, product_id, True)
+            self._synced_through = synced_through
+            self._generation = generation
+            self._built_at = time.monotonic()
+            self._apply(replay)
+
+    def sync(self) -> int:
+        """Re-read stock of products changed since the last sync; returns how many."""
+        generation = catalog_cache.generation
+        with self._lock:
+            synced_through = self._synced_through
+        since = synced_through - SYNC_OVERLAP if synced_through else None
+        latest = latest_changes(since)
+        changed = db.session.execute(select(latest.c.product_id, latest.c.changed_at)).all()
+        product_ids = [row[0] for row in changed]
+        stocked: dict[int, set[int]] = {pid: set() for pid in product_ids}
+        if product_ids:
+            for product_id, branch_id in db.session.execute(
+                select(Inventory.product_id, Inventory.branch_id).where(
+                    Inventory.product_id.in_(product_ids), Inventory.available_quantity > 0
+                )
+            ):
+                stocked[product_id].add(branch_id)
+        with self._lock:
+            for product_id, branches in stocked.items():
+                for branch_id in set(self._branches) | branches:
+                    _set_bit(self._branches.setdefault(branch_id, bytearray()), product_id, branch_id in branches)
+                _set_bit(self._anywhere, product_id, bool(branches))
+            newest = max((row[1] for row in changed), default=None)
+            if newest is not None and (self._synced_through is None or newest > self._synced_through):
+                self._synced_through = newest
+            self._generation = generation
+        return len(changed)
+
+    def apply(self, changes: Iterable[StockChange]) -> None:
+        """Set bits for committed (product_id, branch_id, in_stock) changes."""
+        with self._lock:
+            changes = list(changes)
+            if self._building is not None:
+                self._building.extend(changes)
+            if self._built_at is not None:
+                self._apply(changes)
+
+    def _apply(self, changes: list[StockChange]) -> None:
+        for product_id, branch_id, flag in changes:
+            _set_bit(self._branches.setdefault(branch_id, bytearray()), product_id, flag)
+            anywhere = flag or any(_test_bit(bits, product_id) for bits in self._branches.values())
+            _set_bit(self._anywhere, product_id, anywhere)
+
+    def refresh(self, app: Flask) -> None:
+        """One background step: rebuild when due, else resync if another worker wrote."""
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > _rebuild_seconds(app):
+            self.build()
+        elif catalog_cache.backend == "none" or self._generation != catalog_cache.generation:
+            self.sync()
+
+    def in_stock(self, product_id: int, branch_id: int | None = None) -> bool:
+        """Whether the branch (or any branch when None) has available stock of the product.
+
+        The bit as last synced; it may lag other workers' writes in either direction.
+        """
+        self._start_refresher()
+        if self._built_at is None:
+            return _read_in_stock(product_id, branch_id)
+        with self._lock:
+            bits = self._branches.get(branch_id) if branch_id else self._anywhere
+            return _test_bit(bits, product_id)
+
+    def has_stock(self, product_id: int, branch_id: int | None = None) -> bool:
+        """Like ``in_stock``, but a clear bit is confirmed with the database before saying no."""
+        if self.in_stock(product_id, branch_id):
+            return True
+        return self._built_at is not None and _read_in_stock(product_id, branch_id)
+
+    def _start_refresher(self) -> None:
+        if self._refresher_pid == os.getpid():
+            return
+        app = current_app._get_current_object()
+        if _rebuild_seconds(app) <= 0:
+            return
+        with self._lock:
+            # Started lazily so each forked worker gets its own thread.
+            if self._refresher_pid == os.getpid():
+                return
+            self._refresher_pid = os.getpid()
+        threading.Thread(target=self._run, args=(app,), name="stock-bitmap-refresher", daemon=True).start()
+
+    def _run(self, app: Flask) -> None:
+        while True:
+            with app.app_context():
+                try:
+                    self.refresh(app)
+                except Exception:  # noqa: BLE001 - keep refreshing through DB restarts
+                    app.logger.warning("Stock bitmap refresh failed; retrying", exc_info=True)
+                finally:
+                    db.session.remove()
+            time.sleep(REFRESH_POLL_SECONDS)
+
+
+def _read_in_stock(product_id: int, branch_id: int | None) -> bool:
+    # Inventory rather than the summary: bulk ORM updates do not refresh the summary.
+    stocked = exists().where(Inventory.product_id == product_id, Inventory.available_quantity > 0)
+    if branch_id is not None:
+        stocked = stocked.where(Inventory.branch_id == branch_id)
+    return bool(db.session.scalar(select(stocked)))
+
+
+stock_bitmap = StockBitmap()
+
+
+def queue_stock_change(session: Session, product_id: int, branch_id: int, available_quantity: int) -> None:
+    """Record an inventory write made with a Core statement; its bit is set on commit."""
+    session.info.setdefault(_PENDING_KEY, []).append((product_id, branch_id, available_quantity > 0))
+
+
+def _track_flush(session: Session, _flush_context) -> None:
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, Inventory) and obj.product_id is not None and obj.branch_id is not None:
+            queue_stock_change(session, obj.product_id, obj.branch_id, obj.available_quantity or 0)
+    for obj in session.deleted:
+        if isinstance(obj, Inventory) and obj.product_id is not None and obj.branch_id is not None:
+            queue_stock_change(session, obj.product_id, obj.branch_id, 0)
+
+
+def _after_commit(session: Session) -> None:
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        stock_bitmap.apply(changes)
+
+
+def _after_transaction_end(session: Session, transaction) -> None:
+    # Rolled back: nothing was committed. A rolled-back savepoint inside a committed
+    # transaction may leave stale entries; the background sync corrects them.
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+
+
+def init_stock_bitmap(app: Flask) -> None:
+    """Register the write hooks and build at worker startup when enabled."""
+    for name, listener in (
+        ("after_flush", _track_flush),
+        ("after_commit", _after_commit),
+        ("after_transaction_end", _after_transaction_end),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
+    if _rebuild_seconds(app) <= 0:
+        return
+    with app.app_context():
+        try:
+            stock_bitmap.build()
+        except SQLAlchemyError:
+            db.session.rollback()
+            app.logger.warning("Stock bitmap not built at startup; the background refresher will build it")
@@ -0,0 +1,28 @@
+"""Catalog version stamp used for HTTP validators and cache keys."""
+
+from __future__ import annotations
+from datetime import datetime
+from typing import NamedTuple
+from sqlalchemy import select
+from app.extensions import db
+from app.models import CatalogRevision
+from app.services.catalog_cache import cached_query
+
+
+class CatalogVersion(NamedTuple):
+    stamp: str
+    last_modified: datetime | None
+
+
+@cached_query
+def catalog_version() -> CatalogVersion:
+    """The catalog_revision counter, bumped by every committing catalog write; one primary-key read.
+
+    Inventory writes that change catalog-visible stock bump it too; reservations alone do not.
+    """
+    row = db.session.execute(
+        select(CatalogRevision.version, CatalogRevision.changed_at).where(CatalogRevision.id == 1)
+    ).first()
+    if row is None:
+        return CatalogVersion(stamp="0", last_modified=None)
+    return CatalogVersion(stamp=str(row.version), last_modified=row.changed_at)
@@ -0,0 +1,353 @@
+"""Process-local cache for catalog reads, invalidated across workers on catalog writes.
+
+Each gunicorn worker keeps its own LRU + TTL cache. Any committed change to products,
+categories or stock clears it locally and is broadcast to the other workers:
+
+* ``postgres`` - ``pg_notify`` inside the writing transaction (delivered on commit only)
+  and a LISTEN thread per worker.
+* ``file`` - the writer touches CATALOG_CACHE_INVALIDATION_FILE; readers compare its mtime.
+* ``none`` - local invalidation only; other workers converge within the TTL.
+
+Writes that only move ``reserved_quantity`` (cart reservations) are not catalog changes;
+no catalog read shows reservations.
+
+Every committing catalog change also bumps the single ``catalog_revision`` row inside its
+own transaction, right before commit. The counter is ordered by commit, unlike
+``updated_at`` stamps taken at transaction start, so HTTP validators built on it move
+even when a long transaction commits rows older than the newest stamp.
+
+Concurrent misses for the same key inside a worker share one load (single-flight), so an
+expiry during a traffic spike costs one query instead of one per waiting request.
+"""
+
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from datetime import datetime, timezone
+from itertools import chain
+from typing import Any, Callable
+
+from flask import Flask
+from sqlalchemy import case, event, insert, inspect, text, update
+from sqlalchemy.orm import Session
+
+from app.models import CatalogRevision, Category, Inventory, Product, ProductStockSummary
+
+NOTIFY_CHANNEL = "catalog_invalidation"
+_CATALOG_MODELS = (Product, Category, Inventory, ProductStockSummary)
+# Inventory columns no catalog read shows; writes touching only these are not catalog changes.
+_RESERVATION_COLUMNS = frozenset({"reserved_quantity", "updated_at"})
+# Execution option marking an Inventory UPDATE that only moves reserved_quantity.
+RESERVATION_ONLY = "reservation_only"
+_PENDING_KEY = "catalog_cache_pending"
+_NOTIFIED_KEY = "catalog_cache_notified"
+_MISSING = object()
+# A waiter stops waiting on a stuck leader after this long and loads on its own.
+SINGLE_FLIGHT_WAIT_SECONDS = 30.0
+
+
+class _Flight:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key onto one in-flight computation."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[tuple, _Flight] = {}
+        self.coalesced = 0
+
+    def do(self, key: tuple, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+        if not leader:
+            if not flight.done.wait(SINGLE_FLIGHT_WAIT_SECONDS):
+                return loader()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = loader()
+            return flight.value
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+
+class CatalogCache:
+    def __init__(self) -> None:
+        self._lock = threading.RLock()
+        self._entries: OrderedDict[tuple, tuple[float, Any]] = OrderedDict()
+        self._generation = 0
+        self.max_entries = 0
+        self.ttl_seconds = 0.0
+        self.backend = "none"
+        self._dsn: str | None = None
+        self._file_path: str | None = None
+        self._file_mtime: int | None = None
+        self._listener_pid: int | None = None
+        self._logger = None
+        self._single_flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    @property
+    def size(self) -> int:
+        return len(self._entries)
+
+    @property
+    def generation(self) -> int:
+        """Bumped on every invalidation; derived in-process indexes compare it to resync."""
+        self._poll_invalidations()
+        return self._generation
+
+    def configure(self, app: Flask) -> None:
+        self.max_entries = int(app.config.get("CATALOG_CACHE_MAX_ENTRIES", 2048))
+        self.ttl_seconds = float(app.config.get("CATALOG_CACHE_TTL_SECONDS", 30))
+        self._file_path = app.config.get("CATALOG_CACHE_INVALIDATION_FILE") or None
+        self._logger = app.logger
+        url = app.config.get("SQLALCHEMY_DATABASE_URI", "")
+        backend = (app.config.get("CATALOG_CACHE_INVALIDATION") or "auto").lower()
+        if backend == "auto":
+            if url.startswith("postgresql"):
+                backend = "postgres"
+            else:
+                backend = "file" if self._file_path else "none"
+        if backend == "postgres":
+            # LISTEN runs on a plain psycopg (v3) connection, whatever driver SQLAlchemy uses.
+            from sqlalchemy.engine import make_url
+
+            self._dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        if backend == "file" and not self._file_path:
+            raise RuntimeError("CATALOG_CACHE_INVALIDATION=file requires CATALOG_CACHE_INVALIDATION_FILE")
+        self.backend = backend
+        self._file_mtime = self._read_file_mtime()
+        self.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.backend,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self._single_flight.coalesced,
+            "generation": self._generation,
+        }
+
+    def get_or_load(self, key: tuple, loader: Callable[[], Any]) -> Any:
+        """Cached value for key; on a miss, concurrent callers share a single load."""
+        if not self.enabled:
+            return self._single_flight.do((self._generation, key), loader)
+        self._poll_invalidations()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            generation = self._generation
+        # The generation is part of the flight key so callers arriving after an
+        # invalidation never join a load that started before it.
+        value = self._single_flight.do((generation, key), loader)
+        with self._lock:
+            # Skip the store if an invalidation landed while loading; the value may predate it.
+            if generation == self._generation:
+                self._entries[key] = (now + self.ttl_seconds, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def publish(self, session: Session) -> None:
+        """Queue a cross-worker invalidation in the session's transaction (postgres only)."""
+        if self.backend == "postgres":
+            session.connection().execute(text("SELECT pg_notify(:channel, '')"), {"channel": NOTIFY_CHANNEL})
+
+    def committed(self) -> None:
+        """A catalog change committed in this worker: clear now and signal the file backend."""
+        self.clear()
+        if self.backend == "file" and self._file_path:
+            with open(self._file_path, "a", encoding="utf-8"):
+                pass
+            os.utime(self._file_path)
+            self._file_mtime = self._read_file_mtime()
+
+    def _poll_invalidations(self) -> None:
+        if self.backend == "file":
+            mtime = self._read_file_mtime()
+            if mtime != self._file_mtime:
+                self._file_mtime = mtime
+                self.clear()
+        elif self.backend == "postgres" and self._listener_pid != os.getpid():
+            self._start_listener()
+
+    def _read_file_mtime(self) -> int | None:
+        if not self._file_path:
+            return None
+        try:
+            return os.stat(self._file_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _start_listener(self) -> None:
+        with self._lock:
+            # Started lazily so each forked worker gets its own thread and connection.
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+        threading.Thread(target=self._listen, name="catalog-cache-listener", daemon=True).start()
+
+    def _listen(self) -> None:
+        import psycopg
+
+        backoff = 1.0
+        while True:
+            try:
+                with psycopg.connect(self._dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                    # Anything committed while disconnected was missed.
+                    self.clear()
+                    backoff = 1.0
+                    for _ in conn.notifies():
+                        self.clear()
+            except Exception:  # noqa: BLE001 - keep listening through DB restarts
+                if self._logger:
+                    self._logger.warning("Catalog cache listener disconnected; retrying in %.0fs", backoff)
+            self.clear()
+            time.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+
+catalog_cache = CatalogCache()
+
+
+def cached_query(view: Callable) -> Callable:
+    """Cache a CatalogQueryService read keyed by its arguments. Results are shared; do not mutate."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = (view.__qualname__, args, tuple(sorted(kwargs.items())))
+        return catalog_cache.get_or_load(key, lambda: view(*args, **kwargs))
+
+    return wrapper
+
+
+def mark_catalog_changed(session: Session) -> None:
+    """Flag the current transaction as a catalog write; for Core statements that bypass flush."""
+    session.info[_PENDING_KEY] = True
+    if not session.info.get(_NOTIFIED_KEY):
+        session.info[_NOTIFIED_KEY] = True
+        catalog_cache.publish(session)
+
+
+def is_reservation_only(obj: Any) -> bool:
+    """Whether a dirty Inventory instance changed nothing but its reservation (during flush)."""
+    state = inspect(obj)
+    return {attr.key for attr in state.attrs if attr.history.has_changes()} <= _RESERVATION_COLUMNS
+
+
+def _track_flush(session: Session, _flush_context) -> None:
+    if any(isinstance(obj, _CATALOG_MODELS) for obj in chain(session.new, session.deleted)) or any(
+        isinstance(obj, _CATALOG_MODELS) and not (isinstance(obj, Inventory) and is_reservation_only(obj))
+        for obj in session.dirty
+    ):
+        mark_catalog_changed(session)
+
+
+def _track_bulk_statements(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    if orm_execute_state.execution_options.get(RESERVATION_ONLY):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and issubclass(mapper.class_, _CATALOG_MODELS):
+        mark_catalog_changed(orm_execute_state.session)
+
+
+def _bump_revision(session: Session) -> None:
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    bumped = session.execute(
+        update(CatalogRevision)
+        .where(CatalogRevision.id == 1)
+        .values(
+            version=CatalogRevision.version + 1,
+            # Never moves backwards, whatever order the writers' clocks were read in.
+            changed_at=case((CatalogRevision.changed_at > now, CatalogRevision.changed_at), else_=now),
+        )
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not bumped:
+        session.execute(insert(CatalogRevision).values(id=1, version=1, changed_at=now))
+
+
+def _before_commit(session: Session) -> None:
+    # Flush first: changes still pending would only be seen by commit's own flush.
+    session.flush()
+    if session.info.get(_PENDING_KEY):
+        # Taken last, so the revision row stays locked only for the commit itself.
+        _bump_revision(session)
+
+
+def _after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, False)
+    session.info.pop(_NOTIFIED_KEY, None)
+    if pending:
+        catalog_cache.committed()
+
+
+def _after_soft_rollback(session: Session, _previous_transaction) -> None:
+    # A rolled-back savepoint discards its NOTIFY; re-send on the next change.
+    session.info.pop(_NOTIFIED_KEY, None)
+
+
+def _after_transaction_end(session: Session, transaction) -> None:
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+        session.info.pop(_NOTIFIED_KEY, None)
+
+
+def init_catalog_cache(app: Flask) -> None:
+    catalog_cache.configure(app)
+    for name, listener in (
+        ("after_flush", _track_flush),
+        ("do_orm_execute", _track_bulk_statements),
+        ("before_commit", _before_commit),
+        ("after_commit", _after_commit),
+        ("after_soft_rollback", _after_soft_rollback),
+        ("after_transaction_end", _after_transaction_end),
+    ):
+        if not event.contains(Session, name, listener):
+            event.listen(Session, name, listener)
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from app.extensions import db
 from app.middleware.error_handler import DomainError
-from app.models import Inventory
+from app.models import CartItem, Inventory
 from app.schemas.checkout import MissingItem
 from app.services.audit_service import AuditService
+from app.services.cart.validators import get_delivery_source_branch_id
+from app.services.inventory_reservation_service import InventoryReservationService
 
 
 class CheckoutInventoryManager:
@@ -29,13 +31,10 @@ class CheckoutInventoryManager:
 
     def missing_items(self, cart_items, inv_map=None) -> list[MissingItem]:
         missing: list[MissingItem] = []
+        if inv_map is None:
+            inv_map = self._stocked_inventory(cart_items)
         for item in cart_items:
-            if inv_map is None:
-                inv_row = db.session.execute(
-                    select(Inventory).where(Inventory.product_id == item.product_id, Inventory.branch_id == self.branch_id)
-                ).scalar_one_or_none()
-            else:
-                inv_row = inv_map.get((item.product_id, self.branch_id))
+            inv_row = inv_map.get((item.product_id, self.branch_id))
             available = inv_row.available_quantity if inv_row else 0
             if available < item.quantity:
                 missing.append(
@@ -47,32 +46,71 @@ class CheckoutInventoryManager:
                 )
         return missing
 
+    def _stocked_inventory(self, cart_items) -> dict[tuple[int, int], Inventory]:
+        """Unlocked inventory rows for preview, in one query; missing items are reported from these."""
+        rows = db.session.execute(
+            select(Inventory).where(
+                Inventory.product_id.in_([item.product_id for item in cart_items]),
+                Inventory.branch_id == self.branch_id,
+            )
+        ).scalars()
+        return {(inv.product_id, inv.branch_id): inv for inv in rows}
+
     def decrement_inventory(self, cart_items, inv_map) -> None:
+        """Take cart quantities out of the locked rows and release the cart's reservations.
+
+        Reservations were taken at the delivery branch, whichever branch fulfils the
+        order, and are released there; the released lines stop holding stock so the
+        expiry sweeper and cart deletes do not release them again. When the order is
+        fulfilled from the delivery branch both moves are one UPDATE.
+        """
+        quantities: dict[int, int] = {}
+        held: dict[int, int] = {}
+        held_ids: list[int] = []
         for item in cart_items:
-            key = (item.product_id, self.branch_id)
-            inv_row = inv_map.get(key)
-            if not inv_row:
-                continue
-            if inv_row.available_quantity < item.quantity:
+            if (item.product_id, self.branch_id) in inv_map:
+                quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+            # Lines whose reservation already expired have nothing left to release.
+            if item.reserved_until is not None:
+                held[item.product_id] = held.get(item.product_id, 0) + item.quantity
+                held_ids.append(item.id)
+        for product_id, quantity in quantities.items():
+            inv_row = inv_map[(product_id, self.branch_id)]
+            if inv_row.available_quantity < quantity:
                 raise DomainError(
                     "INSUFFICIENT_STOCK",
-                    f"Not enough stock for product {item.product_id}",
+                    f"Not enough stock for product {product_id}",
                     status_code=400,
                 )
-            old_value = {
-                "available_quantity": inv_row.available_quantity,
-                "reserved_quantity": inv_row.reserved_quantity,
-            }
-            inv_row.available_quantity -= item.quantity
-            inv_row.reserved_quantity = max(0, inv_row.reserved_quantity - item.quantity)
-            db.session.add(inv_row)
+        released = {pid: -qty for pid, qty in held.items()}
+        taken = {pid: -qty for pid, qty in quantities.items()}
+        reservation_branch_id = get_delivery_source_branch_id() if held else self.branch_id
+        if reservation_branch_id == self.branch_id:
+            InventoryReservationService.adjust(self.branch_id, reserved=released, available=taken)
+        else:
+            InventoryReservationService.adjust(reservation_branch_id, reserved=released)
+            InventoryReservationService.adjust(self.branch_id, available=taken)
+        if held_ids:
+            db.session.execute(
+                update(CartItem)
+                .where(CartItem.id.in_(held_ids))
+                .values(reserved_until=None)
+                .execution_options(synchronize_session=False)
+            )
+        for product_id, quantity in quantities.items():
+            # The rows are locked, so the values read before the UPDATE are exact.
+            inv_row = inv_map[(product_id, self.branch_id)]
+            released_here = held.get(product_id, 0) if reservation_branch_id == self.branch_id else 0
             AuditService.log_event(
                 entity_type="inventory",
                 action="DECREMENT",
                 entity_id=inv_row.id,
-                old_value=old_value,
-                new_value={
+                old_value={
                     "available_quantity": inv_row.available_quantity,
                     "reserved_quantity": inv_row.reserved_quantity,
                 },
+                new_value={
+                    "available_quantity": inv_row.available_quantity - quantity,
+                    "reserved_quantity": max(0, inv_row.reserved_quantity - released_here),
+                },
             )
@@ -0,0 +1,80 @@
+"""Atomic inventory counter updates shared by cart, checkout and order cancellation."""
+
+from __future__ import annotations
+from typing import Mapping
+from sqlalchemy import Update, case, func, update
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Inventory
+from app.services.catalog.stock_bitmap import queue_stock_change
+from app.services.catalog_cache import RESERVATION_ONLY
+from app.services.stock_summary_service import StockSummaryService
+
+
+def _per_product(deltas: Mapping[int, int]):
+    return case({product_id: delta for product_id, delta in deltas.items()}, value=Inventory.product_id, else_=0)
+
+
+def _at_least_zero(session: Session, expr):
+    # GREATEST on PostgreSQL; SQLite spells the two-argument form max().
+    if session.get_bind().dialect.name == "sqlite":
+        return func.max(0, expr)
+    return func.greatest(0, expr)
+
+
+class InventoryReservationService:
+    @staticmethod
+    def statement(
+        branch_id: int,
+        reserved: Mapping[int, int] | None = None,
+        available: Mapping[int, int] | None = None,
+        session: Session | None = None,
+    ) -> Update:
+        """One UPDATE adding per-product deltas to a branch's counters.
+
+        ``reserved`` is clamped at zero; ``available`` is applied as given, so callers
+        either hold the row locks or add their own WHERE guard. The row is never read
+        into Python, so concurrent writers cannot lose each other's deltas. A statement
+        that only moves reservations is not a catalog change by itself.
+        """
+        session = session or db.session
+        reserved = dict(reserved or {})
+        available = dict(available or {})
+        values = {}
+        if reserved:
+            values["reserved_quantity"] = _at_least_zero(session, Inventory.reserved_quantity + _per_product(reserved))
+        if available:
+            values["available_quantity"] = Inventory.available_quantity + _per_product(available)
+        else:
+            # Keep updated_at: it feeds the change feed, which must not report reservations.
+            values["updated_at"] = Inventory.updated_at
+        return (
+            update(Inventory)
+            .where(Inventory.branch_id == branch_id, Inventory.product_id.in_(sorted(set(reserved) | set(available))))
+            .values(**values)
+            .execution_options(synchronize_session=False, **{RESERVATION_ONLY: not available})
+        )
+
+    @staticmethod
+    def adjust(
+        branch_id: int,
+        reserved: Mapping[int, int] | None = None,
+        available: Mapping[int, int] | None = None,
+        session: Session | None = None,
+    ) -> set[int]:
+        """Apply the deltas in a single statement; returns products that had a row at the branch."""
+        session = session or db.session
+        reserved = {pid: delta for pid, delta in (reserved or {}).items() if delta}
+        available = {pid: delta for pid, delta in (available or {}).items() if delta}
+        if not reserved and not available:
+            return set()
+        stmt = InventoryReservationService.statement(branch_id, reserved, available, session)
+        rows = session.execute(stmt.returning(Inventory.product_id, Inventory.available_quantity)).all()
+        product_ids = {product_id for product_id, _ in rows}
+        if available:
+            for product_id, available_quantity in rows:
+                queue_stock_change(session, product_id, branch_id, available_quantity)
+        # Core UPDATEs skip the flush hook that keeps the summary in step.
+        StockSummaryService.refresh(product_ids, session, reservations_only=not available)
+        return product_ids
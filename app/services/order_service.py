@@ -8,10 +8,11 @@ from sqlalchemy.orm import selectinload
 
 from app.extensions import db
 from app.middleware.error_handler import DomainError
-from app.models import Inventory, Order
+from app.models import Order
 from app.models.enums import OrderStatus
 from app.schemas.orders import CancelOrderResponse, OrderItemResponse, OrderResponse
 from app.services.audit_service import AuditService
+from app.services.inventory_reservation_service import InventoryReservationService
 
 class OrderService:
     @staticmethod
@@ -60,20 +61,10 @@ class OrderService:
 
         # Restore inventory for each item if we know the fulfillment branch.
         if order.branch_id:
-            product_ids = [item.product_id for item in order.items]
-            inv_rows = session.execute(
-                select(Inventory)
-                .where(
-                    Inventory.branch_id == order.branch_id,
-                    Inventory.product_id.in_(product_ids),
-                )
-                .with_for_update()
-            ).scalars().all()
-            inv_map = {row.product_id: row for row in inv_rows}
+            restored: dict[int, int] = {}
             for item in order.items:
-                inv = inv_map.get(item.product_id)
-                if inv is not None:
-                    inv.available_quantity += item.quantity
+                restored[item.product_id] = restored.get(item.product_id, 0) + item.quantity
+            InventoryReservationService.adjust(order.branch_id, available=restored, session=session)
 
         AuditService.log_event(
             entity_type="order",
@@ -0,0 +1,176 @@
+"""Offline job building "frequently bought together" neighbours from order_items."""
+
+from __future__ import annotations
+from collections import Counter
+from datetime import datetime, timedelta
+from itertools import combinations, groupby
+from flask import current_app
+from sqlalchemy import delete, exists, func, or_, select
+from app.extensions import db
+from app.models import (
+    CoPurchaseOrder, JobWatermark, Order, OrderItem, OrderStatus, Product, ProductCoPurchase, RelatedProduct,
+)
+from app.services.catalog_cache import mark_catalog_changed
+from app.services.shared_queries import SharedOperations
+
+JOB_NAME = "related_products"
+# Bound the pair explosion of very large baskets (n items -> n*(n-1)/2 pairs).
+MAX_PRODUCTS_PER_ORDER = 100
+_TOP_K_CHUNK = 500
+# Order ids are assigned at insert, not commit: a checkout may commit after a run has
+# moved past its id. Each run re-scans orders created this long before the watermark
+# order and skips the ones co_purchase_orders already records.
+RESCAN_WINDOW = timedelta(minutes=30)
+
+
+class RelatedProductsService:
+    @staticmethod
+    def rebuild(full: bool = False, batch_orders: int = 5000) -> dict[str, int]:
+        """Fold orders committed since the last run into the co-purchase matrix.
+
+        Each batch adds its pair counts with one ON CONFLICT upsert, recomputes top-K only
+        for the products it touched, records its orders and advances the watermark in the
+        same transaction, so an interrupted run resumes where it stopped. Orders below the
+        watermark id but inside RESCAN_WINDOW are picked up if they committed late.
+        ``full`` starts from scratch.
+        """
+        session = db.session
+        if full:
+            session.execute(delete(RelatedProduct))
+            session.execute(delete(ProductCoPurchase))
+            session.execute(delete(CoPurchaseOrder))
+            session.execute(delete(JobWatermark).where(JobWatermark.name == JOB_NAME))
+            session.commit()
+        top_k = int(current_app.config.get("RELATED_PRODUCTS_TOP_K", 20))
+        last_id = session.scalar(select(JobWatermark.last_id).where(JobWatermark.name == JOB_NAME)) or 0
+        rescan_from = RelatedProductsService._rescan_from(last_id)
+        orders_seen = 0
+        products_touched = 0
+        while True:
+            last_id = session.scalar(select(JobWatermark.last_id).where(JobWatermark.name == JOB_NAME)) or 0
+            new = Order.id > last_id
+            if rescan_from is not None:
+                new = or_(new, Order.created_at >= rescan_from)
+            order_ids = session.scalars(
+                select(Order.id)
+                .where(
+                    new,
+                    Order.status != OrderStatus.CANCELED,
+                    ~exists().where(CoPurchaseOrder.order_id == Order.id),
+                )
+                .order_by(Order.id)
+                .limit(batch_orders)
+            ).all()
+            if not order_ids:
+                break
+            pairs = RelatedProductsService._count_pairs(order_ids)
+            touched = {product_id for pair in pairs for product_id in pair}
+            # order_items keeps product ids of products deleted since; those cannot be referenced.
+            touched = set(session.scalars(select(Product.id).where(Product.id.in_(touched))).all()) if touched else set()
+            pairs = Counter({pair: count for pair, count in pairs.items() if pair[0] in touched and pair[1] in touched})
+            RelatedProductsService._add_pairs(pairs)
+            RelatedProductsService._refresh_top_k(sorted(touched), top_k)
+            session.execute(CoPurchaseOrder.__table__.insert(), [{"order_id": order_id} for order_id in order_ids])
+            RelatedProductsService._advance(max(last_id, order_ids[-1]))
+            if touched:
+                # Cached related-product reads are dropped once the batch commits.
+                mark_catalog_changed(session)
+            session.commit()
+            orders_seen += len(order_ids)
+            products_touched += len(touched)
+        RelatedProductsService._prune_processed()
+        return {"orders": orders_seen, "products": products_touched}
+
+    @staticmethod
+    def _rescan_from(last_id: int) -> datetime | None:
+        anchor = db.session.scalar(select(Order.created_at).where(Order.id == last_id)) if last_id else None
+        return anchor - RESCAN_WINDOW if anchor is not None else None
+
+    @staticmethod
+    def _prune_processed() -> None:
+        """Drop markers no future re-scan can reach, keeping co_purchase_orders small.
+
+        created_at is not monotonic in id, so a later watermark order may be slightly
+        older; markers are kept for one extra window to cover that.
+        """
+        session = db.session
+        last_id = session.scalar(select(JobWatermark.last_id).where(JobWatermark.name == JOB_NAME)) or 0
+        rescan_from = RelatedProductsService._rescan_from(last_id)
+        if rescan_from is None:
+            return
+        session.execute(
+            delete(CoPurchaseOrder).where(
+                CoPurchaseOrder.order_id.in_(
+                    select(Order.id).where(Order.id <= last_id, Order.created_at < rescan_from - RESCAN_WINDOW)
+                )
+            )
+        )
+        session.commit()
+
+    @staticmethod
+    def _count_pairs(order_ids: list[int]) -> Counter:
+        """Sparse pair counts for a batch; each unordered pair is counted once per order."""
+        rows = db.session.execute(
+            select(OrderItem.order_id, OrderItem.product_id)
+            .where(OrderItem.order_id.in_(order_ids))
+            .distinct()
+            .order_by(OrderItem.order_id, OrderItem.product_id)
+        ).all()
+        pairs: Counter = Counter()
+        for _, items in groupby(rows, key=lambda row: row[0]):
+            basket = [row[1] for row in items][:MAX_PRODUCTS_PER_ORDER]
+            pairs.update(combinations(basket, 2))
+        return pairs
+
+    @staticmethod
+    def _add_pairs(pairs: Counter) -> None:
+        if not pairs:
+            return
+        values = []
+        for (first, second), count in pairs.items():
+            values.append({"product_id": first, "related_product_id": second, "orders_count": count})
+            values.append({"product_id": second, "related_product_id": first, "orders_count": count})
+        table = ProductCoPurchase.__table__
+        stmt = SharedOperations.dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["product_id", "related_product_id"],
+            set_={"orders_count": table.c.orders_count + stmt.excluded.orders_count},
+        )
+        db.session.connection().execute(stmt, values)
+
+    @staticmethod
+    def _refresh_top_k(product_ids: list[int], top_k: int) -> None:
+        """Replace related_products rows for product_ids with their top_k strongest pairs."""
+        for start in range(0, len(product_ids), _TOP_K_CHUNK):
+            chunk = product_ids[start:start + _TOP_K_CHUNK]
+            ranked = (
+                select(
+                    ProductCoPurchase.product_id,
+                    ProductCoPurchase.related_product_id,
+                    func.row_number()
+                    .over(
+                        partition_by=ProductCoPurchase.product_id,
+                        order_by=(ProductCoPurchase.orders_count.desc(), ProductCoPurchase.related_product_id),
+                    )
+                    .label("rank"),
+                    ProductCoPurchase.orders_count.label("score"),
+                )
+                .where(ProductCoPurchase.product_id.in_(chunk))
+                .subquery()
+            )
+            db.session.execute(delete(RelatedProduct).where(RelatedProduct.product_id.in_(chunk)))
+            db.session.execute(
+                RelatedProduct.__table__.insert().from_select(
+                    ["product_id", "related_product_id", "rank", "score"],
+                    select(ranked).where(ranked.c.rank <= top_k),
+                )
+            )
+
+    @staticmethod
+    def _advance(last_id: int) -> None:
+        table = JobWatermark.__table__
+        stmt = SharedOperations.dialect_insert(table).values(name=JOB_NAME, last_id=last_id)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["name"], set_={"last_id": stmt.excluded.last_id, "updated_at": func.now()}
+        )
+        db.session.execute(stmt)
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 from sqlalchemy import select, func
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import IntegrityError
 from app.extensions import db
 from app.middleware.error_handler import DomainError
@@ -95,6 +97,13 @@ class SharedOperations:
         
         return rows, total or 0
 
+    @staticmethod
+    def dialect_insert(table):
+        """INSERT construct for the bound dialect, exposing on_conflict_do_update/do_nothing."""
+        if db.session.get_bind().dialect.name == "sqlite":
+            return sqlite_insert(table)
+        return postgresql_insert(table)
+
     @staticmethod
     def build_filtered_query(base_query, conditions: dict):
         for check_fn, where_clause in conditions.values():
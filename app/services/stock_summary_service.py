@@ -0,0 +1,134 @@
+"""Maintenance of the product_stock_summary read model."""
+
+from __future__ import annotations
+from itertools import chain
+from typing import Iterable
+from flask import current_app, has_app_context
+from sqlalchemy import case, event, func, or_, select, true
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models import Inventory, Product, ProductStockSummary
+from app.services.catalog_cache import is_reservation_only, mark_catalog_changed
+from app.services.shared_queries import SharedOperations
+
+
+def delivery_branch_id() -> int | None:
+    if not has_app_context():
+        return None
+    try:
+        return int(current_app.config.get("DELIVERY_SOURCE_BRANCH_ID", ""))
+    except ValueError:
+        return None
+
+
+class StockSummaryService:
+    @staticmethod
+    def refresh(product_ids: Iterable[int], session: Session | None = None, reservations_only: bool = False) -> None:
+        """Recompute summary rows for product_ids inside the caller's transaction.
+
+        ``reservations_only`` is for writes that moved nothing but reserved_quantity (cart
+        reservations and their release): only total_reserved is recomputed, updated_at is
+        kept, and the catalog is not marked changed, since no catalog read shows it.
+
+        Each row is recomputed from every branch's inventory, so the products are locked
+        first: a concurrent write to another branch of the same product then waits for
+        this transaction and recomputes from a snapshot that includes it, instead of
+        overwriting the row with a sum that misses this write.
+        """
+        ids = sorted(set(product_ids))
+        if not ids:
+            return
+        session = session or db.session
+        session.connection().execute(StockSummaryService.lock_statement(ids))
+        if reservations_only:
+            StockSummaryService._refresh_reserved(session, ids)
+        elif StockSummaryService._upsert(session, Product.id.in_(ids)):
+            mark_catalog_changed(session)
+
+    @staticmethod
+    def lock_statement(ids: list[int]):
+        # FOR NO KEY UPDATE: serialises summary writers without blocking inserts that
+        # reference the product.
+        return select(Product.id).where(Product.id.in_(ids)).order_by(Product.id).with_for_update(key_share=True)
+
+    @staticmethod
+    def rebuild() -> int:
+        """Recompute every summary row; run after bulk loads or a DELIVERY_SOURCE_BRANCH_ID change."""
+        session = db.session
+        session.execute(ProductStockSummary.__table__.delete())
+        StockSummaryService._upsert(session, None)
+        session.commit()
+        return session.scalar(select(func.count()).select_from(ProductStockSummary)) or 0
+
+    @staticmethod
+    def _refresh_reserved(session: Session, ids: list[int]) -> None:
+        table = ProductStockSummary.__table__
+        total = (
+            select(func.coalesce(func.sum(Inventory.reserved_quantity), 0))
+            .where(Inventory.product_id == table.c.product_id)
+            .scalar_subquery()
+        )
+        session.connection().execute(
+            table.update()
+            .where(table.c.product_id.in_(ids), table.c.total_reserved.is_distinct_from(total))
+            # Keep updated_at: it is the catalog version stamp.
+            .values(total_reserved=total, updated_at=table.c.updated_at)
+        )
+
+    @staticmethod
+    def _upsert(session: Session, product_filter) -> bool:
+        """Write summary rows that differ from inventory; True if any row was written.
+
+        Rows already in step are left alone, so neither updated_at (the catalog version
+        stamp) nor the catalog cache moves for a write that changed nothing visible.
+        """
+        branch_id = delivery_branch_id()
+        delivery = (
+            func.sum(case((Inventory.branch_id == branch_id, Inventory.available_quantity), else_=0))
+            if branch_id is not None
+            else func.sum(0)
+        )
+        source = (
+            select(
+                Product.id,
+                func.coalesce(func.sum(Inventory.available_quantity), 0),
+                func.coalesce(func.sum(Inventory.reserved_quantity), 0),
+                func.count(case((Inventory.available_quantity > 0, 1))),
+                func.coalesce(delivery, 0),
+            )
+            .outerjoin(Inventory, Inventory.product_id == Product.id)
+            .group_by(Product.id)
+        )
+        # SQLite needs a WHERE clause to parse INSERT ... SELECT ... ON CONFLICT unambiguously.
+        source = source.where(product_filter if product_filter is not None else true())
+        columns = ["product_id", "total_available", "total_reserved", "branches_in_stock", "delivery_available"]
+        table = ProductStockSummary.__table__
+        stmt = SharedOperations.dialect_insert(table).from_select(columns, source)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["product_id"],
+            set_={
+                **{name: getattr(stmt.excluded, name) for name in columns[1:]},
+                "updated_at": func.now(),
+            },
+            where=or_(*(table.c[name].is_distinct_from(stmt.excluded[name]) for name in columns[1:])),
+        )
+        return session.connection().execute(stmt.returning(table.c.product_id)).first() is not None
+
+
+def _sync_inventory_changes(session: Session, _flush_context) -> None:
+    # ORM writes to Inventory (cart, checkout, cancellation, stock requests, admin edits,
+    # bulk upload) all pass through flush, so the summary stays in the same transaction.
+    changed = [
+        obj
+        for obj in chain(session.new, session.dirty, session.deleted)
+        if isinstance(obj, Inventory) and obj.product_id is not None
+    ]
+    if changed:
+        reservations_only = all(obj in session.dirty and is_reservation_only(obj) for obj in changed)
+        StockSummaryService.refresh({obj.product_id for obj in changed}, session, reservations_only)
+
+
+def register_stock_summary_sync() -> None:
+    if not event.contains(Session, "after_flush", _sync_inventory_changes):
+        event.listen(Session, "after_flush", _sync_inventory_changes)
@@ -109,3 +109,105 @@ class TestProductManagement:
             assert response.status_code == 200
             data = response.get_json()["data"]
             assert data["name"] == "Updated Product"
+
+
+def test_export_streams_gzip_ndjson_with_branch_stock(test_app, auth_header, create_user_with_role, session, product_with_inventory):
+    """Admin export should stream every active product with its per-branch stock."""
+    import gzip
+    import json
+    from app.models import Inventory
+
+    product, _, other_branch = product_with_inventory
+    other_branch_id = other_branch.id
+    session.add(Inventory(product_id=product.id, branch_id=other_branch_id, available_quantity=3))
+    session.add(Product(name="Retired", sku="EXP-OLD", price="1.00", category_id=product.category_id, is_active=False))
+    session.commit()
+
+    admin_headers = auth_header(create_user_with_role(role=Role.ADMIN))
+    customer_headers = auth_header(create_user_with_role(role=Role.CUSTOMER))
+    with test_app.test_client() as client:
+        assert client.get("/api/v1/admin/products/export", headers=customer_headers).status_code == 403
+        response = client.get("/api/v1/admin/products/export", headers=admin_headers)
+        assert response.status_code == 200
+        assert response.is_streamed
+        assert response.headers["Content-Encoding"] == "gzip"
+        lines = gzip.decompress(response.get_data()).decode("utf-8").splitlines()
+
+    records = {record["sku"]: record for record in map(json.loads, lines)}
+    assert "EXP-OLD" not in records
+    milk = records["SKU1"]
+    assert milk["price"] == "10.00"
+    assert milk["total_available"] == 4
+    assert [s["branch_id"] for s in milk["stock"]] == sorted([1, other_branch_id])
+
+
+def test_import_upserts_products_by_sku_in_chunks(test_app, auth_header, create_user_with_role, session, monkeypatch):
+    """CSV import should create new SKUs, update existing ones and report bad rows."""
+    import io
+    import json
+    from app.models import Audit
+    from app.services.catalog import product_import
+
+    monkeypatch.setattr(product_import, "IMPORT_CHUNK_ROWS", 2)
+    category = Category(name="Produce", description="Fresh")
+    session.add(category)
+    session.flush()
+    session.add(Product(
+        name="Old Apple", sku="IMP-1", price="1.00", category_id=category.id, description="Crisp", unit="kg",
+    ))
+    session.commit()
+    category_id = category.id
+
+    csv_body = (
+        "sku,name,price,category,category_id,is_organic\n"
+        "IMP-1,Green Apple,2.50,produce,,true\n"
+        "IMP-2,Pear,3.00,,{cid},\n"
+        "IMP-3,Plum,-1,Produce,,\n"
+        "IMP-4,Kiwi,4.00,Nowhere,,\n"
+        "IMP-5,Banana,1.20,PRODUCE,,\n"
+    ).format(cid=category_id)
+    headers = auth_header(create_user_with_role(role=Role.ADMIN))
+    with test_app.test_client() as client:
+        response = client.post(
+            "/api/v1/admin/products/import",
+            data={"file": (io.BytesIO(csv_body.encode("utf-8")), "feed.csv")},
+            headers=headers,
+            content_type="multipart/form-data",
+        )
+        assert response.status_code == 200
+        summary = response.get_json()["data"]
+        assert (summary["rows"], summary["created"], summary["updated"], summary["failed"]) == (5, 2, 1, 2)
+        assert summary["chunks"] == 3
+        assert {error["sku"] for error in summary["errors"]} == {"IMP-3", "IMP-4"}
+
+        # Fields a row leaves out keep their stored values.
+        ndjson_body = "\n".join([
+            json.dumps({"sku": "IMP-2", "name": "Pear", "price": "2.75", "category_id": category_id}),
+            json.dumps({"sku": "IMP-1", "name": "Green Apple", "price": "2.60", "category_id": category_id}),
+            "not json",
+        ]) + "\n"
+        response = client.post(
+            "/api/v1/admin/products/import?format=ndjson",
+            data={"file": (io.BytesIO(ndjson_body.encode("utf-8")), "feed.txt")},
+            headers=headers,
+            content_type="multipart/form-data",
+        )
+        assert response.get_json()["data"]["updated"] == 2
+        assert response.get_json()["data"]["failed"] == 1
+
+        response = client.post(
+            "/api/v1/admin/products/import",
+            data={"file": (io.BytesIO(b"x"), "feed.xlsx")},
+            headers=headers,
+            content_type="multipart/form-data",
+        )
+        assert response.status_code == 400
+
+    session.expire_all()
+    products = {p.sku: p for p in session.query(Product).filter(Product.sku.like("IMP-%"))}
+    assert set(products) == {"IMP-1", "IMP-2", "IMP-5"}
+    apple = products["IMP-1"]
+    assert (apple.name, str(apple.price), apple.is_organic) == ("Green Apple", "2.60", True)
+    assert (apple.description, apple.unit) == ("Crisp", "kg")
+    assert str(products["IMP-2"].price) == "2.75"
+    assert session.query(Audit).filter(Audit.action == "BULK_IMPORT").count() == 5
@@ -29,3 +29,175 @@ def test_cart_add_fails_when_out_of_stock(session, users):
     with pytest.raises(DomainError) as exc:
         CartService.add_item(user.id, product.id, 1)
     assert exc.value.code == "OUT_OF_STOCK_ANYWHERE"
+
+
+def test_cart_add_reserves_stock_in_few_statements(session, users, product_with_inventory, count_statements):
+    from app.models import Inventory, ProductStockSummary
+
+    user_id = users[0].id
+    product, inv, _ = product_with_inventory
+    product_id, inv_id = product.id, inv.id
+    inv.available_quantity = 3
+    session.commit()
+    CartService.add_item(user_id, product_id, 1)
+
+    with count_statements() as statements:
+        cart = CartService.add_item(user_id, product_id, 1)
+
+    assert [(i.product_id, i.quantity) for i in cart.items] == [(product_id, 2)]
+    # cart + line lookup, reserve UPDATE, summary lock + upsert, line UPDATE, audit INSERT, response
+    assert len(statements) <= 7, statements
+    session.expire_all()
+    assert session.get(Inventory, inv_id).reserved_quantity == 2
+    assert session.get(ProductStockSummary, product_id).total_reserved == 2
+
+    with pytest.raises(DomainError) as exc:
+        CartService.add_item(user_id, product_id, 2)
+    assert exc.value.code == "OUT_OF_STOCK_DELIVERY_BRANCH"
+    session.rollback()
+    session.get(Product, product_id).is_active = False
+    session.commit()
+    with pytest.raises(DomainError) as exc:
+        CartService.add_item(user_id, product_id, 1)
+    assert exc.value.code == "PRODUCT_INACTIVE"
+
+
+def test_idle_cart_reservations_expire(session, users, product_with_inventory):
+    from datetime import timedelta
+    from app.models import Cart, CartItem, CartStatus, Inventory
+    from app.services.cart.stock import utcnow
+    from app.services.cart_reservation_service import CartReservationService
+
+    user_id = users[0].id
+    product, inv, _ = product_with_inventory
+    product_id, inv_id = product.id, inv.id
+    inv.available_quantity = 5
+    session.commit()
+    cart_id = CartService.add_item(user_id, product_id, 2).id
+
+    assert CartReservationService.expire_idle_carts() == {"carts": 0, "items": 0}
+    later = utcnow() + timedelta(days=1)
+    assert CartReservationService.expire_idle_carts(batch_size=1, now=later) == {"carts": 1, "items": 1}
+    assert CartReservationService.expire_idle_carts(now=later) == {"carts": 0, "items": 0}
+    session.expire_all()
+    assert session.get(Cart, cart_id).status == CartStatus.ABANDONED
+    assert session.get(Inventory, inv_id).reserved_quantity == 0
+    assert session.query(CartItem).filter_by(cart_id=cart_id).one().reserved_until is None
+
+    cart = CartService.add_item(user_id, product_id, 1)
+    assert cart.items[0].quantity == 3
+    session.expire_all()
+    assert session.get(Cart, cart_id).status == CartStatus.ACTIVE
+    assert session.get(Inventory, inv_id).reserved_quantity == 3
+
+
+def test_cart_read_does_not_load_products_per_item(session, users, product_with_inventory, count_statements):
+    from decimal import Decimal
+    from app.models import Cart, CartItem
+
+    user_id = users[0].id
+    category_id = product_with_inventory[0].category_id
+    cart = Cart(user_id=user_id)
+    session.add(cart)
+    products = [Product(name=f"Item {i}", sku=f"N1-{i}", price="2.00", category_id=category_id) for i in range(40)]
+    session.add_all(products)
+    session.flush()
+    session.add_all(
+        CartItem(cart_id=cart.id, product_id=p.id, quantity=1, unit_price=Decimal("2.00")) for p in products
+    )
+    session.commit()
+    session.expunge_all()
+
+    with count_statements() as statements:
+        response = CartService.get_cart(user_id)
+
+    assert len(response.items) == 40
+    assert response.items[0].product_name == "Item 0"
+    assert response.total_amount == Decimal("80.00")
+    assert len(statements) == 2, statements
+
+
+def test_cart_bulk_add_reports_per_line_results(session, users, product_with_inventory, count_statements):
+    from sqlalchemy import select
+    from app.models import Audit, Inventory
+    from app.schemas.cart import CartItemUpsertRequest
+    from app.services.catalog.stock_bitmap import stock_bitmap
+
+    user_id = users[0].id
+    product, inv, _ = product_with_inventory
+    product_id, inv_id, warehouse_id = product.id, inv.id, inv.branch_id
+    inv.available_quantity = 10
+    extras = [Product(name=f"Bulk {i}", sku=f"BLK-{i}", price="3.00", category_id=product.category_id) for i in range(3)]
+    session.add_all(extras)
+    session.flush()
+    stocked, inactive, empty = (p.id for p in extras)
+    extras[1].is_active = False
+    session.add(Inventory(product_id=stocked, branch_id=warehouse_id, available_quantity=2, reserved_quantity=0))
+    session.commit()
+    CartService.add_item(user_id, product_id, 1)
+    stock_bitmap.build()
+
+    lines = [
+        CartItemUpsertRequest(product_id=product_id, quantity=2),
+        CartItemUpsertRequest(product_id=stocked, quantity=2),
+        CartItemUpsertRequest(product_id=inactive, quantity=1),
+        CartItemUpsertRequest(product_id=empty, quantity=1),
+        CartItemUpsertRequest(product_id=product_id, quantity=1),
+        CartItemUpsertRequest(product_id=empty + 1000, quantity=1),
+    ]
+    with count_statements() as statements:
+        result = CartService.add_items(user_id, lines)
+
+    assert [(r.product_id, r.quantity, r.added, r.error_code) for r in result.results] == [
+        (product_id, 3, True, None),
+        (stocked, 2, True, None),
+        (inactive, 1, False, "PRODUCT_INACTIVE"),
+        (empty, 1, False, "OUT_OF_STOCK_ANYWHERE"),
+        (empty + 1000, 1, False, "NOT_FOUND"),
+    ]
+    assert {(i.product_id, i.quantity) for i in result.cart.items} == {(product_id, 4), (stocked, 2)}
+    # cart lookup, grouped check, out-of-stock confirm, reserve UPDATE, summary lock + upsert,
+    # line UPDATE, line INSERT, audit, response
+    assert len(statements) <= 10, statements
+    session.expire_all()
+    assert session.get(Inventory, inv_id).reserved_quantity == 4
+    audits = session.scalars(select(Audit).where(Audit.action == "ADD_ITEMS")).all()
+    assert len(audits) == 1
+    assert audits[0].new_value["rejected"] == 3
+
+    # Repeated lines each pass the schema limit but merge past it: rejected, nothing reserved.
+    lines = [CartItemUpsertRequest(product_id=stocked, quantity=5000), CartItemUpsertRequest(product_id=stocked, quantity=5000)]
+    result = CartService.add_items(user_id, lines)
+    assert [(r.added, r.error_code) for r in result.results] == [(False, "QUANTITY_LIMIT")]
+    with pytest.raises(DomainError) as exc:
+        CartService.add_item(user_id, stocked, 9999)
+    assert exc.value.code == "QUANTITY_LIMIT"
+    session.expire_all()
+    assert session.scalar(select(Inventory.reserved_quantity).where(Inventory.product_id == stocked)) == 2
+
+
+def test_cart_delete_and_clear_release_only_held_lines(session, users, product_with_inventory):
+    from sqlalchemy import update
+    from app.models import CartItem, Inventory
+
+    (first, second), (product, inv, _) = users, product_with_inventory
+    first_id, second_id, product_id, inv_id = first.id, second.id, product.id, inv.id
+    inv.available_quantity = 5
+    session.commit()
+    held = CartService.add_item(first_id, product_id, 2)
+    other = CartService.add_item(second_id, product_id, 1)
+
+    # The sweeper released the first line before the customer deleted it.
+    session.execute(update(CartItem).where(CartItem.cart_id == held.id).values(reserved_until=None))
+    session.execute(update(Inventory).where(Inventory.id == inv_id).values(reserved_quantity=1))
+    session.commit()
+    assert CartService.delete_item(first_id, held.id, held.items[0].id).items == []
+    session.expire_all()
+    assert session.get(Inventory, inv_id).reserved_quantity == 1
+
+    assert CartService.clear_cart(second_id, other.id).items == []
+    session.expire_all()
+    assert session.get(Inventory, inv_id).reserved_quantity == 0
+    with pytest.raises(DomainError) as exc:
+        CartService.clear_cart(first_id, other.id)
+    assert exc.value.code == "NOT_FOUND"
@@ -1,3 +1,4 @@
+import os
 import pytest
 
 from app.middleware.error_handler import DomainError
@@ -36,3 +37,409 @@ def test_search_in_stock_filters_by_branch(session, product_with_inventory):
     )
     assert total_empty == 0
     assert items_empty == []
+
+
+def test_search_matches_name_and_description(session):
+    category = CatalogAdminService.create_category("Bakery", None)
+    bread = CatalogAdminService.create_product(
+        name="Sourdough Bread", sku="BRD1", price="12.00", category_id=category.id, description=None
+    )
+    cake = CatalogAdminService.create_product(
+        name="Carrot Cake", sku="CAK1", price="30.00", category_id=category.id,
+        description="Moist cake baked with sourdough starter",
+    )
+    items, total = CatalogQueryService.search_products(
+        query="sourdough", category_id=None, in_stock=None, branch_id=None, limit=10, offset=0
+    )
+    assert total == 2
+    assert {p.id for p in items} == {bread.id, cake.id}
+
+    items, total = CatalogQueryService.search_products(
+        query="carr", category_id=None, in_stock=None, branch_id=None, limit=10, offset=0
+    )
+    assert [p.id for p in items] == [cake.id]
+
+    CatalogAdminService.update_product(cake.id, "Lemon Cake", None, None, None, None)
+    items, total = CatalogQueryService.search_products(
+        query="carr", category_id=None, in_stock=None, branch_id=None, limit=10, offset=0
+    )
+    assert total == 0
+
+
+def test_autocomplete_uses_prefix_index(session):
+    from app.services.catalog.autocomplete import autocomplete_index
+
+    category = CatalogAdminService.create_category("Produce", None)
+    autocomplete_index.build()
+    apple = CatalogAdminService.create_product(
+        name="Green Apple", sku="APL1", price="3.00", category_id=category.id, description=None
+    )
+    CatalogAdminService.create_product(
+        name="Apricot Jam", sku="APR1", price="9.00", category_id=category.id, description=None
+    )
+
+    result = CatalogQueryService.autocomplete("ap", limit=10)
+    assert {item.name for item in result.items} >= {"Green Apple", "Apricot Jam"}
+    result = CatalogQueryService.autocomplete("green app", limit=10)
+    assert [item.id for item in result.items] == [apple.id]
+
+    CatalogAdminService.toggle_product(apple.id, active=False)
+    result = CatalogQueryService.autocomplete("apple", limit=10)
+    assert result.items == []
+    autocomplete_index.reset()
+
+
+def test_stale_index_rebuilds_once_while_serving_the_old_one(test_app, monkeypatch):
+    import threading
+    import time
+    from app.services.catalog.autocomplete import AutocompleteIndex
+    from app.services.catalog.columnar import ColumnarCatalog
+
+    for index in (AutocompleteIndex(), ColumnarCatalog()):
+        builds, started, release = [], threading.Event(), threading.Event()
+
+        def slow_build(index=index, builds=builds, started=started, release=release):
+            builds.append(1)
+            started.set()
+            release.wait(5)
+            index._built_at = time.monotonic()
+
+        monkeypatch.setattr(index, "build", slow_build)
+        index._built_at = 0.0  # built long ago: stale
+
+        def refresh(index=index):
+            with test_app.app_context():
+                index._ensure_fresh()
+
+        rebuilding = threading.Thread(target=refresh)
+        rebuilding.start()
+        assert started.wait(5)
+        # The other requests do not queue behind the rebuild, nor start their own.
+        for _ in range(3):
+            refresh()
+        release.set()
+        rebuilding.join(5)
+        assert builds == [1], type(index).__name__
+
+
+def test_product_stock_projection_aggregates_branches(session, product_with_inventory):
+    from app.models import Inventory
+
+    product, inv, other_branch = product_with_inventory
+    inv.available_quantity = 4
+    session.add(Inventory(product_id=product.id, branch_id=other_branch.id, available_quantity=0))
+    session.commit()
+
+    detail = CatalogQueryService.get_product(product.id, branch_id=other_branch.id)
+    assert detail.available_quantity == 4
+    assert detail.in_stock_anywhere is True
+    assert detail.in_stock_for_branch is False
+    assert detail.branch_available_quantity == 0
+
+    items, _ = CatalogQueryService.search_products(
+        query=None, category_id=product.category_id, in_stock=None, branch_id=inv.branch_id, limit=10, offset=0
+    )
+    assert [(p.id, p.branch_available_quantity) for p in items] == [(product.id, 4)]
+
+
+
+def test_list_categories_includes_product_counts(session, product_with_inventory):
+    product, _, _ = product_with_inventory
+    CatalogAdminService.create_product(
+        name="Cream", sku="CRM1", price="6.00", category_id=product.category_id, description=None
+    )
+    retired = CatalogAdminService.create_product(
+        name="Kefir", sku="KEF1", price="7.00", category_id=product.category_id, description=None
+    )
+    CatalogAdminService.toggle_product(retired.id, False)
+    empty = CatalogAdminService.create_category("Empty Shelf", None)
+
+    categories, _ = CatalogQueryService.list_categories(50, 0)
+    counts = {c.id: (c.product_count, c.in_stock_count) for c in categories}
+    assert counts[product.category_id] == (2, 1)
+    assert counts[empty.id] == (0, 0)
+
+def test_catalog_reads_are_cached_until_a_catalog_write_commits(session, product_with_inventory, tmp_path):
+    from app.services.catalog_cache import catalog_cache
+
+    product, inv, _ = product_with_inventory
+    first = CatalogQueryService.get_product(product.id, 1)
+    assert CatalogQueryService.get_product(product.id, 1) is first
+
+    inv.available_quantity = 7
+    session.commit()
+    refreshed = CatalogQueryService.get_product(product.id, 1)
+    assert refreshed is not first
+    assert refreshed.branch_available_quantity == 7
+
+    # A write committed by another worker is seen through the shared invalidation file.
+    marker = tmp_path / "catalog.invalidate"
+    marker.touch()
+    catalog_cache.backend, catalog_cache._file_path = "file", str(marker)
+    try:
+        catalog_cache._file_mtime = catalog_cache._read_file_mtime()
+        cached = CatalogQueryService.get_product(product.id, 1)
+        assert CatalogQueryService.get_product(product.id, 1) is cached
+        os.utime(marker, ns=(0, marker.stat().st_mtime_ns + 1_000_000))
+        assert CatalogQueryService.get_product(product.id, 1) is not cached
+    finally:
+        catalog_cache.backend, catalog_cache._file_path = "none", None
+
+
+def test_cart_reservations_are_not_catalog_changes(session, users, product_with_inventory):
+    from datetime import datetime
+    from app.models import Inventory, ProductStockSummary
+    from app.services.cart_service import CartService
+    from app.services.catalog.version import catalog_version
+    from app.services.catalog_cache import catalog_cache
+
+    user_id = users[0].id
+    product, inv, _ = product_with_inventory
+    product_id, inv_id = product.id, inv.id
+    # Reservations must not show up in the change feed, which reads inventory.updated_at.
+    changed_at = datetime(2020, 1, 1)
+    inv.available_quantity, inv.updated_at = 5, changed_at
+    session.commit()
+    stamp = catalog_version().stamp
+    generation = catalog_cache.generation
+
+    cart = CartService.add_item(user_id, product_id, 2)
+    session.expire_all()
+    assert session.get(Inventory, inv_id).updated_at == changed_at
+    session.get(Inventory, inv_id).reserved_quantity = 3
+    session.commit()
+    assert catalog_cache.generation == generation
+    assert catalog_version().stamp == stamp
+    assert session.get(ProductStockSummary, product_id).total_reserved == 3
+
+    CartService.update_item(user_id, cart.id, cart.items[0].id, 1)
+    session.get(Inventory, inv_id).available_quantity = 4
+    session.commit()
+    assert catalog_cache.generation != generation
+    assert session.get(ProductStockSummary, product_id).total_available == 4
+
+
+def test_columnar_engine_matches_sql_search(session, test_app, product_with_inventory):
+    from app.models import Category, Inventory, Product
+    from app.services.catalog.columnar import columnar_catalog
+    from app.services.catalog_cache import catalog_cache
+
+    milk, _, other_branch = product_with_inventory
+    category = Category(name="Columnar")
+    session.add(category)
+    session.flush()
+    extra = [
+        Product(name=name, sku=f"COL{i}", price=price, category_id=category.id, is_organic=organic)
+        for i, (name, price, organic) in enumerate(
+            [("Apple", "3.10", True), ("banana", "0.07", False), ("Cherry", "12.00", True), ("Apple", "3.10", False)]
+        )
+    ]
+    session.add_all(extra)
+    session.flush()
+    session.add(Inventory(product_id=extra[0].id, branch_id=other_branch.id, available_quantity=2))
+    session.commit()
+
+    cases = [
+        dict(),
+        dict(category_id=category.id, sort="price_desc"),
+        dict(min_price=0.07, max_price=3.10, sort="price"),
+        dict(organic_only=True, sort="name_desc"),
+        dict(in_stock=True, sort="name"),
+        dict(in_stock=False, branch_id=other_branch.id, sort="date"),
+        dict(category_id=category.id, limit=2, offset=1, sort="name_asc"),
+    ]
+
+    def run_all():
+        results = []
+        for case in cases:
+            params = {"query": None, "category_id": None, "in_stock": None, "branch_id": None, "limit": 50, "offset": 0}
+            params.update(case)
+            items, total = CatalogQueryService.search_products(**params)
+            results.append(([item.id for item in items], total))
+        return results
+
+    expected = run_all()
+    test_app.config["CATALOG_SEARCH_ENGINE"] = "columnar"
+    try:
+        catalog_cache.clear()
+        columnar_catalog.build()
+        assert run_all() == expected
+        # Name order follows the database collation, so those sorts stay in SQL.
+        assert columnar_catalog.supports("price_asc") and not columnar_catalog.supports("name_asc")
+
+        # Incremental sync picks up committed stock and attribute changes.
+        session.add(Inventory(product_id=extra[2].id, branch_id=other_branch.id, available_quantity=5))
+        extra[1].price = "50.00"
+        session.commit()
+        columnar_pages = run_all()
+        test_app.config["CATALOG_SEARCH_ENGINE"] = "sql"
+        catalog_cache.clear()
+        assert columnar_pages == run_all()
+    finally:
+        test_app.config["CATALOG_SEARCH_ENGINE"] = "sql"
+        columnar_catalog.reset()
+
+
+def test_misspelled_queries_fall_back_to_fuzzy_matches(session):
+    from app.services.catalog.autocomplete import autocomplete_index
+    from app.services.catalog.fuzzy import FuzzyTokenIndex
+
+    category = CatalogAdminService.create_category("Sweets", None)
+    chocolate = CatalogAdminService.create_product(
+        name="Dark Chocolate", sku="CHO1", price="7.00", category_id=category.id, description=None
+    )
+    autocomplete_index.build()
+    try:
+        items, total = CatalogQueryService.search_products("chocolte", None, None, None, 10, 0)
+        assert total == 1 and items[0].id == chocolate.id
+        result = CatalogQueryService.autocomplete("drak chocolate", limit=5)
+        assert [item.id for item in result.items] == [chocolate.id]
+        items, total = CatalogQueryService.search_products("xqzvw", None, None, None, 10, 0)
+        assert (items, total) == ([], 0)
+    finally:
+        autocomplete_index.reset()
+
+    index = FuzzyTokenIndex()
+    for token, weight in [("milk", 1), ("silk", 5), ("bread", 1)]:
+        index.add(token, weight)
+    assert index.correct("mlik") == "milk"
+    assert index.correct("zilk") == "silk"
+    assert index.correct("brd") is None
+    assert index.correct_tokens(["bred", "milk"], budget_seconds=1) == ["bread", "milk"]
+
+
+def test_concurrent_identical_loads_are_coalesced():
+    import threading
+    from app.services.catalog_cache import CatalogCache
+
+    cache = CatalogCache()
+    cache.max_entries, cache.ttl_seconds = 10, 30
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return "page"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_load(("featured",), loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for _ in range(500):
+        if cache.stats()["coalesced"] == 7:
+            break
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == ["page"] * 8
+    assert len(calls) == 1
+    assert cache.stats()["coalesced"] == 7
+    assert cache.get_or_load(("featured",), loader) == "page" and cache.stats()["hits"] == 1
+
+
+def test_related_products_follow_co_purchases(session, client, users):
+    from decimal import Decimal
+    from sqlalchemy import func, select
+    from app.models import Order, OrderItem
+    from app.models.enums import FulfillmentType
+    from app.services.related_products_service import RelatedProductsService
+
+    user, _ = users
+    category = CatalogAdminService.create_category("Breakfast", None)
+    bread, butter, jam, tea = (
+        CatalogAdminService.create_product(
+            name=name, sku=f"REL{i}", price="5.00", category_id=category.id, description=None
+        ).id
+        for i, name in enumerate(("Bread", "Butter", "Jam", "Tea"))
+    )
+
+    def place(number, product_ids, order_id=None):
+        order = Order(
+            id=order_id, user_id=user.id, order_number=number, total_amount=Decimal("5.00"),
+            fulfillment_type=FulfillmentType.PICKUP,
+        )
+        session.add(order)
+        session.flush()
+        for product_id in product_ids:
+            session.add(OrderItem(
+                order_id=order.id, product_id=product_id, name="x", sku=f"S{product_id}",
+                unit_price=Decimal("5.00"), quantity=1,
+            ))
+        session.commit()
+
+    place("REL-1", [bread, butter, jam])
+    place("REL-2", [bread, butter])
+    assert RelatedProductsService.rebuild() == {"orders": 2, "products": 3}
+
+    res = client.get(f"/api/v1/catalog/products/{bread}/related")
+    assert res.status_code == 200
+    assert [p["id"] for p in res.get_json()["data"]] == [butter, jam]
+
+    place("REL-3", [bread, tea])
+    place("REL-4", [bread, tea])
+    place("REL-5", [bread, tea])
+    assert RelatedProductsService.rebuild()["orders"] == 3
+    res = client.get(f"/api/v1/catalog/products/{bread}/related?limit=2")
+    assert [p["id"] for p in res.get_json()["data"]] == [tea, butter]
+    assert RelatedProductsService.rebuild() == {"orders": 0, "products": 0}
+
+    # Order ids are taken at insert: a checkout holding a lower id can commit after a
+    # run already moved past it.
+    last_id = session.scalar(select(func.max(Order.id)))
+    place("REL-7", [butter, jam], order_id=last_id + 2)
+    assert RelatedProductsService.rebuild()["orders"] == 1
+    place("REL-6", [butter, jam], order_id=last_id + 1)
+    assert RelatedProductsService.rebuild()["orders"] == 1
+    assert RelatedProductsService.rebuild() == {"orders": 0, "products": 0}
+    res = client.get(f"/api/v1/catalog/products/{jam}/related")
+    assert [p["id"] for p in res.get_json()["data"]] == [butter, bread]
+
+    RelatedProductsService.rebuild(full=True)
+    res = client.get(f"/api/v1/catalog/products/{tea}/related")
+    assert [p["id"] for p in res.get_json()["data"]] == [bread]
+
+
+def test_stock_bitmap_follows_inventory_writes(session, product_with_inventory, count_statements):
+    from app.models import Inventory
+    from app.services.catalog.stock_bitmap import stock_bitmap
+
+    product, inv, other_branch = product_with_inventory
+    product_id, warehouse_id, other_id = product.id, inv.branch_id, other_branch.id
+    # Not built yet: answered from inventory.
+    assert stock_bitmap.in_stock(product_id, warehouse_id)
+    assert not stock_bitmap.in_stock(product_id, other_id)
+
+    stock_bitmap.build()
+    with count_statements() as statements:
+        assert stock_bitmap.in_stock(product_id, warehouse_id)
+        assert stock_bitmap.in_stock(product_id)
+        assert not stock_bitmap.in_stock(product_id, other_id)
+        assert not stock_bitmap.in_stock(product_id + 1000)
+    assert statements == []
+
+    # This worker's commits set their bits directly, with no resync on the next check.
+    inv.available_quantity = 0
+    session.add(Inventory(product_id=product_id, branch_id=other_id, available_quantity=2))
+    session.commit()
+    with count_statements() as statements:
+        assert not stock_bitmap.in_stock(product_id, warehouse_id)
+        assert stock_bitmap.in_stock(product_id, other_id)
+        assert stock_bitmap.in_stock(product_id)
+    assert statements == []
+
+    # Bulk statements bypass the hooks, as other workers' writes do; the background sync reads them.
+    session.query(Inventory).filter_by(branch_id=other_id).update({"available_quantity": 0})
+    session.commit()
+    assert stock_bitmap.in_stock(product_id)
+    stock_bitmap.sync()
+    assert not stock_bitmap.in_stock(product_id)
+
+    # A clear bit may be stale; has_stock confirms it before anything is rejected.
+    session.query(Inventory).filter_by(branch_id=warehouse_id).update({"available_quantity": 3})
+    session.commit()
+    assert not stock_bitmap.in_stock(product_id, warehouse_id)
+    assert stock_bitmap.has_stock(product_id, warehouse_id)
+    assert not stock_bitmap.has_stock(product_id, other_id)
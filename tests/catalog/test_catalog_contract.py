@@ -62,3 +62,252 @@ def test_admin_analytics_revenue_empty_returns_arrays(client, session, admin_tok
     data = resp.get_json()["data"]
     assert isinstance(data.get("labels"), list)
     assert isinstance(data.get("values"), list)
+
+def test_search_cursor_pagination_walks_all_pages(client, session):
+    from app.models import Category, Product
+
+    category = Category(name="CursorCat")
+    session.add(category)
+    session.flush()
+    for i, price in enumerate(["5.00", "5.00", "7.50", "3.25", "5.00"]):
+        session.add(Product(name=f"Cursor {i}", sku=f"CUR{i}", price=price, category_id=category.id))
+    session.commit()
+
+    seen, cursor = [], ""
+    while True:
+        resp = client.get(
+            f"/api/v1/catalog/products/search?category_id={category.id}&sort=price_asc&limit=2&cursor={cursor}"
+        )
+        assert resp.status_code == 200
+        body = resp.get_json()
+        assert "total" not in body["meta"]
+        seen.extend(body["data"])
+        cursor = body["meta"]["next_cursor"]
+        if cursor is None:
+            break
+    prices = [float(p["price"]) for p in seen]
+    assert len(seen) == 5
+    assert len({p["id"] for p in seen}) == 5
+    assert prices == sorted(prices)
+
+    resp = client.get(f"/api/v1/catalog/categories/{category.id}/products?cursor=&limit=10&include_total=true")
+    meta = resp.get_json()["meta"]
+    assert meta["total"] == 5 and meta["has_next"] is False
+
+    resp = client.get("/api/v1/catalog/products/search?cursor=not-a-cursor")
+    assert resp.status_code == 400
+    assert resp.get_json()["error"]["code"] == "INVALID_CURSOR"
+
+def test_catalog_conditional_get_returns_304_until_catalog_changes(client, session, product_with_inventory):
+    from datetime import datetime, timedelta
+
+    product, _, _ = product_with_inventory
+    url = f"/api/v1/catalog/products/{product.id}"
+    first = client.get(url)
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert "public" in first.headers["Cache-Control"]
+    assert first.headers.get("Last-Modified")
+
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+    other_query = client.get(f"{url}?branchId=1", headers={"If-None-Match": etag})
+    assert other_query.status_code == 200
+
+    product.price = 99
+    product.updated_at = datetime.utcnow() + timedelta(minutes=1)
+    session.commit()
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+    # A transaction that started earlier commits a row stamped before the newest one.
+    from app.models import Product
+
+    etag = changed.headers["ETag"]
+    session.add(Product(
+        name="Late", sku="LATE-1", price="1.00", category_id=product.category_id,
+        updated_at=datetime.utcnow() - timedelta(days=1),
+    ))
+    session.commit()
+    late = client.get(url, headers={"If-None-Match": etag})
+    assert late.status_code == 200
+    assert late.headers["ETag"] != etag
+
+def test_search_facets_count_filtered_results(client, session):
+    from app.models import Category, Product
+
+    dairy, bakery = Category(name="FacetDairy"), Category(name="FacetBakery")
+    session.add_all([dairy, bakery])
+    session.flush()
+    session.add_all([
+        Product(name="Facet milk", sku="FAC1", price="4.00", category_id=dairy.id, is_organic=True),
+        Product(name="Facet cheese", sku="FAC2", price="30.00", category_id=dairy.id),
+        Product(name="Facet bread", sku="FAC3", price="12.00", category_id=bakery.id, is_organic=True),
+        Product(name="Facet cake", sku="FAC4", price="120.00", category_id=bakery.id),
+    ])
+    session.commit()
+
+    resp = client.get("/api/v1/catalog/products/search?q=facet&limit=1&facets=category,organic,price")
+    assert resp.status_code == 200
+    facets = resp.get_json()["meta"]["facets"]
+    assert {f["category_id"]: f["count"] for f in facets["category"]} == {dairy.id: 2, bakery.id: 2}
+    assert facets["organic"] == {"organic": 2, "non_organic": 2}
+    assert [b["count"] for b in facets["price"]] == [1, 1, 1, 0, 1]
+    assert facets["price"][-1]["max"] is None
+
+    resp = client.get(f"/api/v1/catalog/products/search?q=facet&category_id={dairy.id}&facets=organic")
+    facets = resp.get_json()["meta"]["facets"]
+    assert facets == {"category": None, "organic": {"organic": 1, "non_organic": 1}, "price": None}
+
+    # A misspelled query shows the corrected query's rows; its facets count those rows too.
+    from app.services.catalog.autocomplete import autocomplete_index
+
+    autocomplete_index.build()
+    try:
+        resp = client.get("/api/v1/catalog/products/search?q=fcaet%20chese&facets=organic")
+        meta = resp.get_json()["meta"]
+        assert meta["corrected_query"] == "facet cheese"
+        assert meta["total"] == 1
+        assert meta["facets"]["organic"] == {"organic": 0, "non_organic": 1}
+    finally:
+        autocomplete_index.reset()
+
+    assert client.get("/api/v1/catalog/products/search?facets=brand").status_code == 400
+
+def test_batch_product_lookup_preserves_request_order(client, session, product_with_inventory):
+    from app.models import Product
+
+    milk, _, _ = product_with_inventory
+    bread = Product(name="Batch bread", sku="BAT1", price="6.00", category_id=milk.category_id)
+    hidden = Product(name="Batch hidden", sku="BAT2", price="6.00", category_id=milk.category_id, is_active=False)
+    session.add_all([bread, hidden])
+    session.commit()
+
+    resp = client.get(f"/api/v1/catalog/products?ids={bread.id},{milk.id},999999,{hidden.id}&branchId=1")
+    assert resp.status_code == 200
+    body = resp.get_json()
+    assert [p["id"] for p in body["data"]] == [bread.id, milk.id]
+    assert body["data"][1]["branch_available_quantity"] == 1
+    assert body["meta"]["missing"] == [999999, hidden.id]
+
+    assert client.get("/api/v1/catalog/products").status_code == 400
+    assert client.get("/api/v1/catalog/products?ids=abc").status_code == 400
+    too_many = ",".join(str(i) for i in range(1, 202))
+    assert client.get(f"/api/v1/catalog/products?ids={too_many}").status_code == 400
+
+def test_sparse_fieldsets_limit_keys_and_loaded_columns(client, session, product_with_inventory):
+    from sqlalchemy import event, inspect
+    from app.models import Product
+    from app.services.catalog import CatalogQueryService
+    from app.services.catalog.fields import parse_fields
+
+    product, _, _ = product_with_inventory
+    resp = client.get(f"/api/v1/catalog/products/{product.id}?fields=name,price,image_url,in_stock_anywhere")
+    assert resp.status_code == 200
+    assert set(resp.get_json()["data"]) == {"id", "name", "price", "image_url", "in_stock_anywhere"}
+
+    resp = client.get(f"/api/v1/catalog/categories/{product.category_id}/products?fields=name")
+    assert [set(item) for item in resp.get_json()["data"]] == [{"id", "name"}]
+
+    resp = client.get("/api/v1/catalog/products/search?q=milk&fields=name&cursor=&sort=price_asc")
+    assert all(set(item) == {"id", "name"} for item in resp.get_json()["data"])
+
+    bad = client.get(f"/api/v1/catalog/products/{product.id}?fields=name,password_hash")
+    assert bad.status_code == 400
+
+    loaded = []
+    capture = lambda target, _context: loaded.append(target)
+    session.expunge_all()
+    event.listen(Product, "load", capture)
+    try:
+        CatalogQueryService.get_product(product.id, None, parse_fields("name,price"))
+    finally:
+        event.remove(Product, "load", capture)
+    assert {"nutritional_info", "description", "bin_location"} <= inspect(loaded[0]).unloaded
+
+def test_catalog_changes_feed_returns_rows_after_watermark(client, session):
+    from datetime import datetime, timedelta
+    from app.models import Category, Inventory, Product
+
+    start = datetime(2030, 1, 1)
+    category = Category(name="DeltaCat")
+    session.add(category)
+    session.flush()
+    products = [
+        Product(name=f"Delta {i}", sku=f"DLT{i}", price="3.00", category_id=category.id,
+                updated_at=start + timedelta(seconds=i))
+        for i in range(3)
+    ]
+    session.add_all(products)
+    session.commit()
+
+    def fetch(since=None, limit=1000):
+        query = f"?limit={limit}" + (f"&since={since}" if since else "")
+        body = client.get(f"/api/v1/catalog/changes{query}").get_json()
+        return body["data"], body["meta"]
+
+    # Initial sync pages through everything and ends on the newest change.
+    watermark, seen = None, []
+    while True:
+        items, meta = fetch(watermark, limit=2)
+        seen.extend(item["id"] for item in items)
+        watermark = meta["watermark"]
+        if not meta["has_more"]:
+            break
+    assert seen[-3:] == [p.id for p in products]
+    assert fetch(watermark)[0] == []
+
+    products[0].price = "2.50"
+    products[0].updated_at = start + timedelta(minutes=5)
+    products[2].is_active = False
+    products[2].updated_at = start + timedelta(minutes=6)
+    session.add(Inventory(product_id=products[1].id, branch_id=1, available_quantity=4,
+                          updated_at=start + timedelta(minutes=7)))
+    session.commit()
+
+    items, meta = fetch(watermark)
+    assert [item["id"] for item in items] == [products[0].id, products[2].id, products[1].id]
+    assert items[1]["is_active"] is False
+    assert items[2]["available_quantity"] == 4
+    watermark = meta["watermark"]
+    assert fetch(watermark)[0] == []
+
+    # A transaction that started before the last delivered change commits afterwards.
+    late = Product(name="Delta late", sku="DLT9", price="3.00", category_id=category.id,
+                   updated_at=start + timedelta(minutes=6, seconds=30))
+    session.add(late)
+    session.commit()
+    items, meta = fetch(watermark)
+    assert [item["id"] for item in items] == [late.id]
+    assert fetch(meta["watermark"])[0] == []
+
+    assert client.get("/api/v1/catalog/changes?since=garbage").status_code == 400
+
+def test_hot_catalog_pages_are_served_from_encoded_bytes(client, session, product_with_inventory, monkeypatch):
+    from datetime import datetime, timedelta
+    from app.services.catalog import CatalogQueryService
+
+    product, _, _ = product_with_inventory
+    first = client.get("/api/v1/catalog/products/featured?limit=5")
+    assert first.status_code == 200
+
+    def fail(*_args, **_kwargs):
+        raise AssertionError("view should not run for a cached page")
+
+    monkeypatch.setattr(CatalogQueryService, "featured_products", staticmethod(fail))
+    repeat = client.get("/api/v1/catalog/products/featured?limit=5")
+    assert repeat.status_code == 200
+    assert repeat.data == first.data
+    assert repeat.headers["ETag"] == first.headers["ETag"]
+    monkeypatch.undo()
+
+    product.name = "Renamed milk"
+    product.updated_at = datetime.utcnow() + timedelta(minutes=1)
+    session.commit()
+    fresh = client.get("/api/v1/catalog/products/featured?limit=5")
+    assert "Renamed milk" in fresh.get_data(as_text=True)
@@ -191,3 +191,39 @@ def test_checkout_saves_payment_preferences(session, test_app, users):
         select(Audit).where(Audit.entity_type == "payment_preferences")
     ).scalars().all()
     assert audit_rows
+
+def test_checkout_releases_cart_hold_once(session, users, product_with_inventory, monkeypatch):
+    from datetime import timedelta
+    from sqlalchemy import update
+    from app.models import Inventory
+    from app.services.cart import stock
+    from app.services.cart_reservation_service import CartReservationService
+    from app.services.cart_service import CartService
+
+    (buyer, other), (product, inv, pickup_branch) = users, product_with_inventory
+    buyer_id, other_id, product_id, inv_id = buyer.id, other.id, product.id, inv.id
+    inv.available_quantity = 5
+    session.add(Inventory(product_id=product_id, branch_id=pickup_branch.id, available_quantity=5, reserved_quantity=0))
+    session.commit()
+    cart_id = CartService.add_item(buyer_id, product_id, 2).id
+    CartService.add_item(other_id, product_id, 1)
+    # The other cart's hold outlives the sweep below.
+    session.execute(
+        update(CartItem).where(CartItem.cart_id != cart_id).values(reserved_until=stock.utcnow() + timedelta(days=1))
+    )
+    session.commit()
+    monkeypatch.setattr(PaymentService, "charge", lambda *_a, **_k: "ref-hold")
+
+    # Pickup elsewhere: the hold taken at the delivery branch is still released there.
+    cart = session.get(Cart, cart_id)
+    CheckoutService.confirm(
+        _cart_payload(cart, fulfillment=FulfillmentType.PICKUP, branch_id=pickup_branch.id),
+        idempotency_key="hold-key",
+    )
+    session.expire_all()
+    assert session.get(Inventory, inv_id).reserved_quantity == 1
+    assert session.scalars(select(CartItem.reserved_until).where(CartItem.cart_id == cart_id)).all() == [None]
+
+    CartReservationService.expire_idle_carts(now=stock.utcnow() + timedelta(hours=2))
+    session.expire_all()
+    assert session.get(Inventory, inv_id).reserved_quantity == 1
@@ -1,5 +1,6 @@
 import sys
 import secrets
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import time
 
@@ -19,6 +20,8 @@ from app.config import AppConfig
 from app.extensions import db
 from app.models import Base, Branch, Category, DeliverySlot, Inventory, Product, User
 from app.models.enums import Role
+from app.services.catalog_cache import catalog_cache
+from app.services.catalog.stock_bitmap import stock_bitmap
 
 @pytest.fixture
 def client(test_app):
@@ -71,6 +74,8 @@ def test_app():
         DATABASE_URL="sqlite:///:memory:",
         JWT_SECRET_KEY="test",
         DELIVERY_SOURCE_BRANCH_ID=str(warehouse_id),
+        # No background refresher against the in-memory DB; tests build bitmaps explicitly.
+        STOCK_BITMAP_REBUILD_SECONDS=0,
     )
     app = create_app(cfg)
     app.config["TESTING"] = True
@@ -115,6 +120,32 @@ def session(test_app):
             transaction.rollback()
             connection.close()
             db.session = original_session
+            # The rollback above bypasses commit hooks; drop reads cached from this test's data.
+            catalog_cache.clear()
+            stock_bitmap.reset()
+
+
+@pytest.fixture
+def count_statements(session):
+    """``with count_statements() as statements:`` collects the SQL run inside the block.
+
+    Savepoint statements from the test transaction are left out.
+    """
+    @contextmanager
+    def _count():
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            if not statement.upper().startswith(("SAVEPOINT", "RELEASE")):
+                statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    return _count
 
 
 @pytest.fixture
@@ -17,3 +17,84 @@ def test_inventory_update_changes_quantities(session, product_with_inventory):
     assert updated.reserved_quantity == 1
     # ensure response carries names from relationships
     assert updated.product_name and updated.branch_name
+
+
+def test_stock_summary_follows_inventory_writes(session, product_with_inventory):
+    from app.models import Inventory, ProductStockSummary
+    from app.services.stock_summary_service import StockSummaryService
+
+    product, inv, other_branch = product_with_inventory
+    InventoryService.update_inventory(inv.id, InventoryUpdateRequest(available_quantity=5, reserved_quantity=2))
+    session.add(Inventory(product_id=product.id, branch_id=other_branch.id, available_quantity=3))
+    session.commit()
+
+    summary = session.get(ProductStockSummary, product.id)
+    session.refresh(summary)
+    assert (summary.total_available, summary.total_reserved) == (8, 2)
+    assert (summary.branches_in_stock, summary.delivery_available) == (2, 5)
+
+    session.query(ProductStockSummary).delete()
+    session.commit()
+    assert StockSummaryService.rebuild() >= 1
+    rebuilt = session.get(ProductStockSummary, product.id)
+    assert (rebuilt.total_available, rebuilt.delivery_available) == (8, 5)
+
+
+def test_stock_summary_writers_lock_the_product_before_recomputing(session, product_with_inventory, count_statements):
+    from sqlalchemy.dialects import postgresql
+    from sqlalchemy.orm import Session
+    from app.models import Branch, Inventory, ProductStockSummary
+    from app.services.stock_summary_service import StockSummaryService
+
+    product, inv, other_branch = product_with_inventory
+    product_id, warehouse_id, other_id = product.id, inv.branch_id, other_branch.id
+    third = Branch(name="Third", address="Street 3")
+    session.add(third)
+    session.commit()
+    third_id = third.id
+
+    # Two writers on different branches of one product, both in flight at once. The test
+    # database shares one connection, so they end in reverse order.
+    connection = session.connection()
+    first, second = (Session(bind=connection, join_transaction_mode="create_savepoint") for _ in range(2))
+    first.add(Inventory(product_id=product_id, branch_id=other_id, available_quantity=3))
+    first.flush()
+    with count_statements() as statements:
+        second.add(Inventory(product_id=product_id, branch_id=third_id, available_quantity=4))
+        second.flush()
+    second.commit()
+    first.commit()
+
+    summary_writes = [i for i, sql in enumerate(statements) if "product_stock_summary" in sql]
+    locks = [i for i, sql in enumerate(statements) if sql.lstrip().upper().startswith("SELECT PRODUCTS.ID")]
+    assert locks and summary_writes and locks[0] < summary_writes[0], statements
+    lock_sql = str(StockSummaryService.lock_statement([product_id]).compile(dialect=postgresql.dialect()))
+    assert "FOR NO KEY UPDATE" in lock_sql
+    summary = session.get(ProductStockSummary, product_id)
+    session.refresh(summary)
+    assert (summary.total_available, summary.branches_in_stock) == (1 + 3 + 4, 3)
+
+
+def test_reservation_adjust_is_batched_and_clamped(session, product_with_inventory):
+    from app.models import Inventory, Product, ProductStockSummary
+    from app.services.inventory_reservation_service import InventoryReservationService
+
+    product, inv, _ = product_with_inventory
+    other = Product(name="Cheese", sku="SKU2", price="20.00", category_id=product.category_id)
+    session.add(other)
+    session.flush()
+    session.add(Inventory(product_id=other.id, branch_id=inv.branch_id, available_quantity=5, reserved_quantity=1))
+    session.commit()
+    product_id, other_id, branch_id = product.id, other.id, inv.branch_id
+
+    touched = InventoryReservationService.adjust(
+        branch_id, reserved={product_id: 2, other_id: -3, 999999: 1}, available={other_id: -1}
+    )
+    session.commit()
+    assert touched == {product_id, other_id}
+
+    session.expire_all()
+    rows = {row.product_id: row for row in session.query(Inventory).filter_by(branch_id=branch_id)}
+    assert (rows[product_id].available_quantity, rows[product_id].reserved_quantity) == (1, 2)
+    assert (rows[other_id].available_quantity, rows[other_id].reserved_quantity) == (4, 0)
+    assert session.get(ProductStockSummary, other_id).total_available == 4
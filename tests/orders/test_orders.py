@@ -34,3 +34,38 @@ def test_order_ownership_returns_404(session, users, product_with_inventory):
     with pytest.raises(DomainError) as exc:
         OrderService.get_order(order.id, user2.id)
     assert exc.value.code == "NOT_FOUND"
+
+
+def test_cancel_order_restores_branch_inventory(session, users, product_with_inventory):
+    from app.models import Inventory
+
+    user, _ = users
+    product, inv, _ = product_with_inventory
+    order = Order(
+        user_id=user.id,
+        order_number="ORD-CANCEL",
+        total_amount=Decimal("20.00"),
+        fulfillment_type=FulfillmentType.PICKUP,
+        status=OrderStatus.CREATED,
+        branch_id=inv.branch_id,
+    )
+    session.add(order)
+    session.flush()
+    for quantity in (1, 2):
+        session.add(
+            OrderItem(
+                order_id=order.id,
+                product_id=product.id,
+                name="Milk",
+                sku="SKU1",
+                unit_price=Decimal("10.00"),
+                quantity=quantity,
+            )
+        )
+    session.commit()
+    order_id, user_id, inv_id = order.id, user.id, inv.id
+
+    OrderService.cancel_order(order_id, user_id)
+    session.expire_all()
+    assert session.get(Inventory, inv_id).available_quantity == 4
+    assert session.get(Order, order_id).status == OrderStatus.CANCELED